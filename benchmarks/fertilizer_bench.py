@@ -0,0 +1,384 @@
+# ============================================================
+# fertilizer_bench.py — Benchmark Suite for the Fertilizer Engines
+# Engines covered:
+#   - engine.final_router.generate_fertilizer_recommendation
+#   - data.smart_fertilizer_engine.SmartFertilizerEngine (cold + cached)
+#   - engine.smart_farmer_engine.SmartFarmerEngine
+#
+# Workloads are synthetic soil tests generated (seeded) for every
+# state/crop in each engine's dataset. Reported per engine:
+#   latency p50/p90/p99 (µs), throughput (calls/s),
+#   alloc_peak_kb_per_call   — peak extra traced memory during one call
+#                              (transient allocation size, tracemalloc),
+#   retained_blocks_per_call — memory blocks still alive after the call
+#                              (cache growth / leaks). This is NOT a count
+#                              of allocations made: CPython exposes no
+#                              per-call allocation counter, and blocks
+#                              freed before the call returns are not seen.
+#   peak_rss_mb              — peak RSS of the engine's own process (MB).
+#
+# Every engine runs in its own subprocess, so peak RSS belongs to
+# that engine alone (dataset load + workload), not to whatever ran
+# before it in the same process.
+#
+# Usage (from repo root):
+#   python -m benchmarks.fertilizer_bench --save-baseline
+#   python -m benchmarks.fertilizer_bench --compare        # exit 1 on regression
+#
+# Any run exits 1 if SmartFertilizerEngine cache hits are not faster
+# than the cold (computing) path.
+# ============================================================
+
+import argparse
+import gc
+import hashlib
+import json
+import os
+import platform
+import random
+import resource
+import subprocess
+import sys
+import time
+import tracemalloc
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if REPO_DIR not in sys.path:
+    sys.path.insert(0, REPO_DIR)
+
+DATA_DIR = os.path.join(REPO_DIR, "data")
+BASELINE_PATH = os.path.join(REPO_DIR, "benchmarks", "baselines", "fertilizer.json")
+
+# Files whose content defines the workload (fingerprinted into baselines)
+DATASET_FILES = [
+    "production_dataset_final_ready.json",
+    "final_hard_normalized.json",
+    "organic_rules.json",
+    "soil_fertility_thresholds.json",
+]
+
+SEASONS = ["Kharif", "Rabi", "Zaid", "Any"]
+SOILS = ["red", "black", "alluvial", "lateritic", "sandy"]
+
+# Metrics checked by --compare ("higher" = bigger is better)
+TRACKED = {"p50_us": "lower", "p99_us": "lower", "throughput_per_s": "higher"}
+
+
+# ------------------------------------------------------------
+# SYNTHETIC WORKLOADS
+# ------------------------------------------------------------
+def _soil(rng):
+    return {
+        "SN": round(rng.uniform(80, 450), 1), "SP": round(rng.uniform(3, 60), 1),
+        "SK": round(rng.uniform(60, 500), 1), "pH": round(rng.uniform(4.5, 9.2), 2),
+        "OC": round(rng.uniform(0.1, 1.5), 2), "EC": round(rng.uniform(0.1, 4.0), 2),
+        "Zn": round(rng.uniform(0.2, 2.0), 2), "Fe": round(rng.uniform(2, 12), 2),
+        "S": round(rng.uniform(5, 30), 1), "B": round(rng.uniform(0.2, 1.5), 2),
+    }
+
+
+def _organic_names(rules):
+    inputs = rules.get("organic_inputs", {})
+    return [m["name"] for m in inputs.get("manure", []) + inputs.get("oilseed_cakes", [])]
+
+
+def final_router_workload(master, n, rng):
+    pairs = [(s, c) for s, crops in master["data"].items() for c in crops]
+    organics = _organic_names(master["organic_rules"])
+    calls = []
+    for i in range(n):
+        state, crop = pairs[i % len(pairs)]
+        soil = _soil(rng)
+        soil["Soil_Type"] = rng.choice(SOILS)
+        calls.append(dict(
+            state=state, crop=crop, season=rng.choice(SEASONS), soil=soil,
+            organic_type=rng.choice(organics + ["None"]), organic_qty_kg=rng.choice([0, 500, 2000]),
+            target_yield=rng.choice([None, round(rng.uniform(10, 60), 1)]), mode="AUTO", master=master,
+        ))
+    return calls
+
+
+def smart_fertilizer_workload(engine, n, rng):
+    combos = [
+        (mode, s, c)
+        for mode in ("npk", "stcr")
+        for s in engine.get_available_states(mode)
+        for c in engine.get_available_crops(s, mode)
+    ]
+    organics = _organic_names(engine.data_organic)
+    payloads = []
+    for i in range(n):
+        mode, state, crop = combos[i % len(combos)]
+        opts = engine.get_valid_seasons_and_soils(state, crop, mode)
+        payloads.append({
+            "state": state, "crop": crop, "mode": mode,
+            "season": rng.choice(opts["seasons"] or ["kharif"]),
+            "soil_type": rng.choice(opts["soils"] or ["alluvial"]),
+            "target_yield": round(rng.uniform(10, 60), 1),
+            "soil_test": _soil(rng),
+            "organic_applied": {rng.choice(organics): rng.choice([0, 500, 2000])},
+            "irrigation_type": rng.choice(["Flood", "Drip"]),
+            "previous_crop": rng.choice(["", "legume"]),
+        })
+    return payloads
+
+
+def smart_farmer_workload(engine, n, rng):
+    pairs = [
+        (s, c) for s, crops in engine.main_data.items() if s != "regions"
+        for c in crops
+    ]
+    organics = _organic_names(engine.organic_data)
+    calls = []
+    for i in range(n):
+        state, crop = pairs[i % len(pairs)]
+        soil = _soil(rng)
+        soil["Soil_Type"] = rng.choice(["red soil", "black soil", "alluvial", "sandy"])
+        soil["Target_Yield"] = rng.choice([0, round(rng.uniform(10, 60), 1)])
+        calls.append((state, crop, rng.choice(SEASONS), soil,
+                      {"name": rng.choice(organics), "qty": rng.choice([0, 500, 2000])}))
+    return calls
+
+
+# ------------------------------------------------------------
+# MEASUREMENT
+# ------------------------------------------------------------
+def _percentile(sorted_vals, q):
+    if not sorted_vals: return 0.0
+    k = min(len(sorted_vals) - 1, max(0, int(round(q / 100.0 * (len(sorted_vals) - 1)))))
+    return sorted_vals[k]
+
+
+def _peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KB, macOS reports bytes
+    return round(peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024, 1)
+
+
+def measure(fn, calls, alloc_sample=200):
+    """Times fn(call) for every call, then samples allocations on a subset."""
+    for call in calls[: min(50, len(calls))]:  # warm-up
+        fn(call)
+
+    gc.collect()
+    latencies = []
+    t_start = time.perf_counter()
+    for call in calls:
+        t0 = time.perf_counter()
+        fn(call)
+        latencies.append(time.perf_counter() - t0)
+    wall = time.perf_counter() - t_start
+
+    # Allocation profile (tracemalloc slows calls, so it runs separately)
+    sample = calls[:alloc_sample]
+    gc.collect()
+    tracemalloc.start()
+    peak_total, blocks_total = 0, 0
+    for call in sample:
+        before = tracemalloc.take_snapshot()
+        tracemalloc.reset_peak()
+        current = tracemalloc.get_traced_memory()[0]
+        fn(call)
+        peak_total += tracemalloc.get_traced_memory()[1] - current
+        after = tracemalloc.take_snapshot()
+        # Blocks still alive after the call (caches, leaks) — not every allocation made
+        blocks_total += sum(max(s.count_diff, 0) for s in after.compare_to(before, "filename"))
+    tracemalloc.stop()
+
+    latencies.sort()
+    n = len(latencies)
+    return {
+        "calls": n,
+        "p50_us": round(_percentile(latencies, 50) * 1e6, 2),
+        "p90_us": round(_percentile(latencies, 90) * 1e6, 2),
+        "p99_us": round(_percentile(latencies, 99) * 1e6, 2),
+        "mean_us": round(sum(latencies) / n * 1e6, 2) if n else 0.0,
+        "throughput_per_s": round(n / wall, 1) if wall else 0.0,
+        "alloc_peak_kb_per_call": round(peak_total / max(len(sample), 1) / 1024, 2),
+        "retained_blocks_per_call": round(blocks_total / max(len(sample), 1), 1),
+        "peak_rss_mb": _peak_rss_mb(),
+    }
+
+
+# ------------------------------------------------------------
+# SUITE
+# ------------------------------------------------------------
+def _final_router_case(n_calls, seed):
+    from engine.data_loader import get_master_dataset
+    from engine.final_router import generate_fertilizer_recommendation
+
+    calls = final_router_workload(get_master_dataset(), n_calls, random.Random(seed))
+    return lambda kw: generate_fertilizer_recommendation(**kw), calls
+
+
+def _smart_fertilizer_engine(n_calls, seed):
+    from data.smart_fertilizer_engine import SmartFertilizerEngine
+
+    eng = SmartFertilizerEngine()
+    eng.load_all_datasets()
+    return eng, smart_fertilizer_workload(eng, n_calls, random.Random(seed))
+
+
+def _smart_fertilizer_case(n_calls, seed):
+    # Cold path: cache cleared so every call computes. Payloads are passed
+    # as-is: the engine only adds soil_type_input, which the cache key
+    # ignores, so cold and cached runs see identical requests.
+    eng, payloads = _smart_fertilizer_engine(n_calls, seed)
+
+    def cold(p):
+        eng.result_cache.clear()
+        return eng.generate_final_recommendation(p)
+    return cold, payloads
+
+
+def _smart_fertilizer_cached_case(n_calls, seed):
+    eng, payloads = _smart_fertilizer_engine(n_calls, seed)
+    for p in payloads:
+        eng.generate_final_recommendation(p)
+    return eng.generate_final_recommendation, payloads
+
+
+def _smart_farmer_case(n_calls, seed):
+    import engine.smart_farmer_engine as smart_farmer
+
+    # The engine looks for its JSONs next to itself; point it at data/
+    smart_farmer.DATA_DIR = smart_farmer.Path(DATA_DIR)
+    eng = smart_farmer.SmartFarmerEngine()
+    calls = smart_farmer_workload(eng, n_calls, random.Random(seed))
+    return lambda c: eng.recommend(*c), calls
+
+
+# Engine name -> (n_calls, seed) -> (fn, calls)
+CASES = {
+    "final_router": _final_router_case,
+    "smart_fertilizer": _smart_fertilizer_case,
+    "smart_fertilizer_cached": _smart_fertilizer_cached_case,
+    "smart_farmer": _smart_farmer_case,
+}
+ENGINES = list(CASES)
+
+
+def run_engine(name, n_calls=2000, seed=42):
+    """Measures one engine in the current process."""
+    if name not in CASES:
+        raise ValueError(f"Unknown engine '{name}' (choose from {', '.join(ENGINES)}).")
+    fn, calls = CASES[name](n_calls, seed)
+    return measure(fn, calls)
+
+
+def run_suite(n_calls=2000, seed=42, engines=None):
+    """Runs every selected engine in a fresh subprocess (isolated peak RSS)."""
+    results = {}
+    for name in engines or ENGINES:
+        out = subprocess.run(
+            [sys.executable, "-m", "benchmarks.fertilizer_bench", "--worker", name,
+             "--calls", str(n_calls), "--seed", str(seed)],
+            cwd=REPO_DIR, capture_output=True, text=True,
+        )
+        if out.returncode != 0:
+            raise RuntimeError(f"Benchmark worker for {name} failed:\n{out.stderr[-2000:]}")
+        # The worker's result is its last stdout line (engines may print before it)
+        results[name] = json.loads(out.stdout.strip().splitlines()[-1])
+    return results
+
+
+def check_cache(results):
+    """Cache hits must beat computing the answer (returns problem messages)."""
+    cold, cached = results.get("smart_fertilizer"), results.get("smart_fertilizer_cached")
+    if not cold or not cached:
+        return []
+    if cached["p50_us"] >= cold["p50_us"]:
+        return [f"smart_fertilizer_cached p50 {cached['p50_us']}µs is not faster than cold {cold['p50_us']}µs"]
+    return []
+
+
+def dataset_fingerprint():
+    h = hashlib.sha256()
+    for name in DATASET_FILES:
+        path = os.path.join(DATA_DIR, name)
+        if os.path.exists(path):
+            with open(path, "rb") as f:
+                h.update(name.encode() + f.read())
+    return h.hexdigest()[:16]
+
+
+def build_report(results, n_calls, seed):
+    return {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "calls_per_engine": n_calls,
+        "seed": seed,
+        "dataset_fingerprint": dataset_fingerprint(),
+        "results": results,
+    }
+
+
+def compare(report, baseline, tolerance):
+    """Returns a list of regression messages (empty = OK)."""
+    problems = []
+    if baseline.get("dataset_fingerprint") != report["dataset_fingerprint"]:
+        print("⚠️  Datasets changed since the baseline was recorded.")
+
+    for engine, base in baseline.get("results", {}).items():
+        cur = report["results"].get(engine)
+        if cur is None: continue
+        for metric, better in TRACKED.items():
+            old, new = base.get(metric), cur.get(metric)
+            if not old or new is None: continue
+            change = (new - old) / old
+            worse = change > tolerance if better == "lower" else change < -tolerance
+            flag = "❌" if worse else "✅"
+            print(f"{flag} {engine:<24} {metric:<18} {old:>12} → {new:>12} ({change:+.1%})")
+            if worse:
+                problems.append(f"{engine}.{metric} regressed {change:+.1%}")
+    return problems
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="SmartFert fertilizer engine benchmarks")
+    parser.add_argument("--calls", type=int, default=2000, help="Calls per engine (default 2000)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--engines", nargs="*", help="Subset of engines to run")
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="Baseline JSON path")
+    parser.add_argument("--save-baseline", action="store_true", help="Write results as the new baseline")
+    parser.add_argument("--compare", action="store_true", help="Compare against the baseline")
+    parser.add_argument("--tolerance", type=float, default=0.20, help="Allowed slowdown (default 0.20)")
+    parser.add_argument("--output", help="Also write this run's report to a JSON file")
+    parser.add_argument("--worker", help=argparse.SUPPRESS)  # internal: one engine, JSON to stdout
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(run_engine(args.worker, args.calls, args.seed)))
+        sys.exit(0)
+
+    report = build_report(run_suite(args.calls, args.seed, args.engines), args.calls, args.seed)
+    print(json.dumps(report["results"], indent=2))
+
+    cache_problems = check_cache(report["results"])
+    for problem in cache_problems:
+        print(f"❌ {problem}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(args.baseline), exist_ok=True)
+        with open(args.baseline, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"✅ Baseline saved to {args.baseline}")
+
+    if args.compare:
+        if not os.path.exists(args.baseline):
+            print(f"❌ No baseline at {args.baseline} (run with --save-baseline first)")
+            sys.exit(2)
+        with open(args.baseline) as f:
+            regressions = compare(report, json.load(f), args.tolerance)
+        if regressions:
+            print("❌ REGRESSIONS: " + "; ".join(regressions))
+            sys.exit(1)
+        print("✅ No regressions.")
+
+    if cache_problems:
+        sys.exit(1)
@@ -1,13 +1,175 @@
 import json
 import os
-import ast
+import sys
 import logging
 import math
+import threading
+import time
+import copy
+from collections import OrderedDict
+
+try:
+    from engine.equation_compiler import compile_equation, precompile_dataset
+    from engine.organic_index import build_organic_index
+except ImportError:
+    # Standalone run from inside data/ (e.g. streamlit run data/app.py)
+    sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from engine.equation_compiler import compile_equation, precompile_dataset
+    from engine.organic_index import build_organic_index
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+class FrozenDict(dict):
+    """
+    Read-only dict for cached responses shared across sessions. Still a
+    dict for readers and json / st.json; copy.deepcopy() gives a mutable dict.
+    """
+    def _readonly(self, *args, **kwargs):
+        raise TypeError("Cached recommendations are read-only; copy.deepcopy() the result to modify it.")
+
+    __setitem__ = __delitem__ = _readonly
+    clear = pop = popitem = setdefault = update = _readonly
+
+    def __deepcopy__(self, memo):
+        return {k: copy.deepcopy(v, memo) for k, v in self.items()}
+
+    def __reduce__(self):
+        return (FrozenDict, (dict(self),))
+
+
+def freeze(value):
+    """Nested dicts -> FrozenDict, lists -> tuples (other values as-is)."""
+    if isinstance(value, dict):
+        return FrozenDict((k, freeze(v)) for k, v in value.items())
+    if isinstance(value, (list, tuple)):
+        return tuple(freeze(v) for v in value)
+    return value
+
+
+_SCALAR_TYPES = frozenset({str, int, float, bool, type(None)})
+
+
+def _key_part(value):
+    """Hashable, key-order independent form of a payload value."""
+    if isinstance(value, dict):
+        return tuple(sorted([
+            (k, v if type(v) in _SCALAR_TYPES else _key_part(v))
+            for k, v in value.items() if k != "soil_type_input"
+        ]))
+    if isinstance(value, (list, tuple)):
+        return tuple([v if type(v) in _SCALAR_TYPES else _key_part(v) for v in value])
+    if isinstance(value, set):
+        return frozenset(value)
+    return value
+
+
+class RecommendationCache:
+    """
+    Thread-safe LRU + TTL cache for recommendation responses.
+    Keys are sorted tuples of the request payload fields.
+    Values are frozen once on insert (see freeze), so hits hand out the
+    stored response without copying and sessions cannot mutate it.
+    """
+    def __init__(self, maxsize=2048, ttl=3600):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._store = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    @staticmethod
+    def make_key(payload):
+        """Canonical form: sorted fields, engine-added soil_type_input removed."""
+        return _key_part(payload)
+
+    def get(self, key):
+        with self._lock:
+            item = self._store.get(key)
+            if item is None:
+                self.misses += 1
+                return None
+            created, value = item
+            if self.ttl and time.monotonic() - created > self.ttl:
+                del self._store[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._store.move_to_end(key)
+            self.hits += 1
+        return value
+
+    def put(self, key, value):
+        """Stores and returns the frozen value."""
+        value = freeze(value)
+        with self._lock:
+            self._store[key] = (time.monotonic(), value)
+            self._store.move_to_end(key)
+            while len(self._store) > self.maxsize:
+                self._store.popitem(last=False)
+                self.evictions += 1
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._store.clear()
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits, "misses": self.misses,
+                "evictions": self.evictions, "expirations": self.expirations,
+                "size": len(self._store), "maxsize": self.maxsize, "ttl": self.ttl,
+                "hit_rate": round(self.hits / total, 4) if total else 0.0,
+            }
+
+
+# Bit flags for per-crop mode availability
+MODE_BITS = {"npk": 1, "stcr": 2}
+
+
+def build_catalog(data_master):
+    """
+    Precomputes the selectbox answers for every state/crop/mode:
+      states    : {mode: sorted states}
+      crops     : {(state, mode): sorted crops}
+      options   : {(state, crop, mode): {"seasons": [...], "soils": [...]}}
+      mode_bits : {state: {crop: MODE_BITS flags}}
+    """
+    catalog = {"states": {m: [] for m in MODE_BITS}, "crops": {}, "options": {}, "mode_bits": {}}
+
+    for state, crops in data_master.items():
+        if not isinstance(crops, dict): continue
+        bits_by_crop = {}
+        for crop_name, details in crops.items():
+            if not isinstance(details, dict): continue
+            bits = 0
+            if details.get("npk_available"): bits |= MODE_BITS["npk"]
+            if details.get("stcr_available"): bits |= MODE_BITS["stcr"]
+            bits_by_crop[crop_name] = bits
+
+            npk_seasons = {e["season"] for e in details.get("npk", []) if "season" in e}
+            npk_soils = {e["soil_type"] for e in details.get("npk", []) if "soil_type" in e}
+            stcr_soils = {e["Soil_Type"] for e in details.get("stcr", []) if "Soil_Type" in e}
+            catalog["options"][(state, crop_name, "npk")] = {"seasons": sorted(npk_seasons), "soils": sorted(npk_soils)}
+            catalog["options"][(state, crop_name, "stcr")] = {"seasons": ["Any"], "soils": sorted(stcr_soils)}
+
+        catalog["mode_bits"][state] = bits_by_crop
+        for mode, bit in MODE_BITS.items():
+            catalog["crops"][(state, mode)] = sorted(c for c, b in bits_by_crop.items() if b & bit)
+            if state != "regions" and any(b & bit for b in bits_by_crop.values()):
+                catalog["states"][mode].append(state)
+
+    for mode in MODE_BITS:
+        catalog["states"][mode].sort()
+    return catalog
+
+
 class SmartFertilizerEngine:
     # --- TEXT TEMPLATES FOR MULTI-LANGUAGE COMPATIBILITY ---
     # Hum yahan keys define kar rahe hain taaki language.py inhe pakad sake
@@ -27,6 +189,8 @@ class SmartFertilizerEngine:
         self.data_organic = {}
         self.data_thresholds = {}
         self.data_stcr_fallback = {}
+        self.catalog = build_catalog({})
+        self.organic_index = build_organic_index({})
         
         # --- PATH FIX: Get directory of THIS script ---
         base_dir = os.path.dirname(os.path.abspath(__file__))
@@ -39,65 +203,65 @@ class SmartFertilizerEngine:
             "stcr_fallback": os.path.join(base_dir, "stcr_equation_constants.json")
         }
 
+        # Responses are deterministic given the payload → memoize them
+        self.result_cache = RecommendationCache()
+
+    # Parsed datasets shared by every engine instance in this process
+    _SHARED_DATA = {}
+    _SHARED_LOCK = threading.Lock()
+
     def load_all_datasets(self):
-        """Loads all 4 JSON files."""
+        """Loads all 4 JSON files (parsed once per process, then shared)."""
+        key = tuple(sorted(self.files.items()))
+        with self._SHARED_LOCK:
+            shared = self._SHARED_DATA.get(key)
+            if shared is None:
+                datasets = self._read_datasets()
+                precompile_dataset(datasets[0])
+                shared = datasets + (build_catalog(datasets[0]), build_organic_index(datasets[1]))
+                self._SHARED_DATA[key] = shared
+        (self.data_master, self.data_organic, self.data_thresholds,
+         self.data_stcr_fallback, self.catalog, self.organic_index) = shared
+        self.result_cache.clear()
+
+    def _read_datasets(self):
         try:
-            with open(self.files["master"], 'r') as f: self.data_master = json.load(f)
+            with open(self.files["master"], 'r') as f: data_master = json.load(f)
             
             with open(self.files["organic"], 'r') as f: 
-                self.data_organic = json.load(f)
-                if "organic_inputs" not in self.data_organic: raise ValueError("Schema Error: organic_rules")
+                data_organic = json.load(f)
+                if "organic_inputs" not in data_organic: raise ValueError("Schema Error: organic_rules")
 
             with open(self.files["thresholds"], 'r') as f:
-                self.data_thresholds = json.load(f)
-                if "soil_fertility_thresholds" not in self.data_thresholds: raise ValueError("Schema Error: thresholds")
+                data_thresholds = json.load(f)
+                if "soil_fertility_thresholds" not in data_thresholds: raise ValueError("Schema Error: thresholds")
 
+            data_stcr_fallback = {}
             stcr_file = self.files["stcr_fallback"]
             if os.path.exists(stcr_file):
-                with open(stcr_file, 'r') as f: self.data_stcr_fallback = json.load(f)
+                with open(stcr_file, 'r') as f: data_stcr_fallback = json.load(f)
             else:
                 logger.warning(f"STCR fallback file {stcr_file} not found.")
 
             logger.info("All datasets loaded successfully.")
+            return data_master, data_organic, data_thresholds, data_stcr_fallback
         except Exception as e:
             logger.error(f"Dataset Loading Error: {str(e)}")
             raise
 
+    # --- Selectbox helpers (served from the prebuilt catalog) ---
     def get_available_states(self, mode):
-        if not self.data_master: return []
-        available_states = []
-        for state, crops in self.data_master.items():
-            if state == "regions": continue 
-            has_mode = False
-            for crop_data in crops.values():
-                if mode == "npk" and crop_data.get("npk_available"): has_mode = True; break
-                elif mode == "stcr" and crop_data.get("stcr_available"): has_mode = True; break
-            if has_mode: available_states.append(state)
-        return sorted(available_states)
+        return list(self.catalog["states"].get(mode, []))
 
     def get_available_crops(self, state, mode):
-        if state not in self.data_master: return []
-        available_crops = []
-        crops = self.data_master[state]
-        for crop_name, details in crops.items():
-            if mode == "npk" and details.get("npk_available"): available_crops.append(crop_name)
-            elif mode == "stcr" and details.get("stcr_available"): available_crops.append(crop_name)
-        return sorted(available_crops)
+        return list(self.catalog["crops"].get((state, mode), []))
 
     def get_valid_seasons_and_soils(self, state, crop, mode):
-        results = {"seasons": set(), "soils": set()}
-        try:
-            crop_data = self.data_master.get(state, {}).get(crop, {})
-            if mode == "npk":
-                for entry in crop_data.get("npk", []):
-                    if "season" in entry: results["seasons"].add(entry["season"])
-                    if "soil_type" in entry: results["soils"].add(entry["soil_type"])
-            elif mode == "stcr":
-                for entry in crop_data.get("stcr", []):
-                    if "Soil_Type" in entry: results["soils"].add(entry["Soil_Type"])
-                results["seasons"].add("Any") 
-        except Exception: return {"seasons": [], "soils": []}
-        return {"seasons": sorted(list(results["seasons"])), "soils": sorted(list(results["soils"]))}
+        opts = self.catalog["options"].get((state, crop, mode))
+        if opts is None:
+            # Unknown state/crop: STCR still offers the "Any" season
+            return {"seasons": ["Any"] if mode == "stcr" else [], "soils": []}
+        return {"seasons": list(opts["seasons"]), "soils": list(opts["soils"])}
 
     def classify_soil_fertility(self, soil_test_input, thresholds=None):
         if thresholds is None: thresholds = self.data_thresholds.get("soil_fertility_thresholds", {})
@@ -139,16 +303,9 @@ class SmartFertilizerEngine:
         return report, deficiency_report
 
     def apply_organic_credit(self, fertilizer_dict, organic_inputs, applied_organics):
-        credit = {"N": 0.0, "P2O5": 0.0, "K2O": 0.0}
-        sources = organic_inputs.get("manure", []) + organic_inputs.get("oilseed_cakes", [])
-        
-        for org_name, applied_kg in applied_organics.items():
-            if applied_kg <= 0: continue
-            source_data = next((item for item in sources if item["name"] == org_name), None)
-            if source_data:
-                credit["N"] += (applied_kg * source_data.get("N_percent", 0)) / 100
-                credit["P2O5"] += (applied_kg * source_data.get("P2O5_percent", 0)) / 100
-                credit["K2O"] += (applied_kg * source_data.get("K2O_percent", 0)) / 100
+        # Loaded rules use the prebuilt index; anything else is indexed on the fly
+        index = self.organic_index if organic_inputs is self.data_organic.get("organic_inputs") else build_organic_index(organic_inputs)
+        credit = index.credit(applied_organics)
 
         final_dict = fertilizer_dict.copy()
         final_dict["N"] = max(0, final_dict.get("N", 0) - credit["N"])
@@ -174,6 +331,7 @@ class SmartFertilizerEngine:
         except Exception: return {"N": 0.0, "P2O5": 0.0, "K2O": 0.0}
 
     def compute_stcr_recommendation(self, state, crop, soil_type, target_yield, soil_test_values, organic_nutrients):
+        no_terms = {"N": False, "P2O5": False, "K2O": False}
         try:
             entries = self.data_master.get(state, {}).get(crop, {}).get("stcr", [])
             selected_eq = None
@@ -182,7 +340,7 @@ class SmartFertilizerEngine:
                     selected_eq = row.get("equations", {}); break
             
             if not selected_eq and entries: selected_eq = entries[0].get("equations", {})
-            if not selected_eq: return {"N": 0, "P2O5": 0, "K2O": 0}, False
+            if not selected_eq: return {"N": 0, "P2O5": 0, "K2O": 0}, no_terms
 
             context = {
                 "T": float(target_yield), "SN": float(soil_test_values.get("SN", 0)),
@@ -190,22 +348,19 @@ class SmartFertilizerEngine:
                 "ON": float(organic_nutrients.get("N", 0)), "OP": float(organic_nutrients.get("P2O5", 0)), "OK": float(organic_nutrients.get("K2O", 0))
             }
             result = {}
-            organic_terms_used = {"N": False, "P2O5": False, "K2O": False}
+            organic_terms_used = dict(no_terms)
+            organic_var = {"N": "ON", "P2O5": "OP", "K2O": "OK"}
 
+            # Equations are compiled at dataset load; this is arithmetic only
             for nutrient in ["N", "P2O5", "K2O"]:
                 eq_str = selected_eq.get(nutrient, "0")
                 if not eq_str: result[nutrient] = 0.0; continue
-                
-                if nutrient == "N" and "ON" in eq_str: organic_terms_used["N"] = True
-                if nutrient == "P2O5" and "OP" in eq_str: organic_terms_used["P2O5"] = True
-                if nutrient == "K2O" and "OK" in eq_str: organic_terms_used["K2O"] = True
-
-                safe_expr = eq_str.replace(" ", "")
-                if not set(safe_expr).issubset(set("0123456789.+-*/()TSNPOK")): result[nutrient] = 0.0; continue
-                try: result[nutrient] = max(0.0, eval(safe_expr, {"__builtins__": None}, context))
-                except Exception: result[nutrient] = 0.0
+
+                compiled = compile_equation(eq_str)
+                organic_terms_used[nutrient] = organic_var[nutrient] in compiled.organic_terms
+                result[nutrient] = max(0.0, compiled.evaluate(context))
             return result, organic_terms_used
-        except Exception: return {"N": 0.0, "P2O5": 0.0, "K2O": 0.0}, False
+        except Exception: return {"N": 0.0, "P2O5": 0.0, "K2O": 0.0}, no_terms
 
     def calculate_fertilizer_bags(self, final_dose):
         n_req = final_dose.get("N", 0); p_req = final_dose.get("P2O5", 0); k_req = final_dose.get("K2O", 0)
@@ -264,6 +419,22 @@ class SmartFertilizerEngine:
         return final_dict, advisories, adjustments_log
 
     def generate_final_recommendation(self, input_payload):
+        """
+        Memoized entry point (see RecommendationCache). The response is a
+        read-only FrozenDict shared with later identical requests.
+        """
+        key = RecommendationCache.make_key(input_payload)
+        soil_test = input_payload.setdefault("soil_test", {})
+        soil_test["soil_type_input"] = input_payload.get("soil_type", "alluvial")
+
+        cached = self.result_cache.get(key)
+        if cached is not None:
+            return cached
+
+        response = self._compute_final_recommendation(input_payload)
+        return self.result_cache.put(key, response)
+
+    def _compute_final_recommendation(self, input_payload):
         state = input_payload.get("state", "").lower().replace(" ", "_")
         crop = input_payload.get("crop", "").lower()
         mode = input_payload.get("mode", "npk")
@@ -10,15 +10,15 @@
 
 import streamlit as st
 
-from data_loader import load_master_dataset
-from final_router import generate_fertilizer_recommendation
-from bag_rounder import apply_rounding
+from engine.data_loader import get_master_dataset
+from engine.final_router import generate_fertilizer_recommendation
+from engine.bag_rounder import apply_rounding
 
 
 # ---------------------------------------------------------
-# Load MASTER once
+# Shared MASTER (loaded once per process)
 # ---------------------------------------------------------
-MASTER = load_master_dataset()
+MASTER = get_master_dataset()
 DATA = MASTER["data"]
 
 
@@ -0,0 +1,272 @@
+# ============================================================
+# bulk_pipeline.py — Batch Soil-Test → Recommendation Pipeline
+# Streams soil-test records from CSV / JSONL / Parquet in
+# chunks, runs generate_fertilizer_recommendation on each row
+# and appends results to the output file as it goes.
+# Large files are spread over a multiprocessing pool with a
+# bounded number of chunks in flight (constant memory).
+#
+# Usage:
+#   python -m engine.bulk_pipeline soil_tests.csv results.csv --workers 4
+# ============================================================
+
+import argparse
+import csv
+import json
+import math
+import os
+from collections import deque
+from multiprocessing import Pool
+
+import pandas as pd
+
+from engine.data_loader import get_master_dataset
+from engine.final_router import generate_fertilizer_recommendation
+
+# Input columns understood by the pipeline (others are ignored)
+SOIL_COLUMNS = ["SN", "SP", "SK", "pH", "OC", "EC", "Zn", "Fe", "S", "B", "Soil_Type", "Condition"]
+REQUIRED_COLUMNS = ["state", "crop"]
+
+OUTPUT_COLUMNS = [
+    "record_id", "status", "error", "state", "crop", "source_engine",
+    "N_kg_ha", "P2O5_kg_ha", "K2O_kg_ha",
+    "DAP_kg", "Urea_kg", "MOP_kg",
+    "organic_N_kg", "organic_P2O5_kg", "organic_K2O_kg",
+    "micronutrients", "advisories",
+]
+
+DEFAULT_CHUNKSIZE = 5000
+
+
+# ------------------------------------------------------------
+# INPUT READERS (chunked)
+# ------------------------------------------------------------
+def _detect_format(path):
+    ext = os.path.splitext(path)[1].lower()
+    if ext in (".jsonl", ".ndjson"): return "jsonl"
+    if ext in (".parquet", ".pq"): return "parquet"
+    return "csv"
+
+
+def iter_record_chunks(path, chunksize=DEFAULT_CHUNKSIZE):
+    """Yields DataFrames of at most `chunksize` soil-test records."""
+    fmt = _detect_format(path)
+
+    if fmt == "csv":
+        yield from pd.read_csv(path, chunksize=chunksize)
+    elif fmt == "jsonl":
+        yield from pd.read_json(path, lines=True, chunksize=chunksize)
+    else:
+        try:
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ImportError("❌ Parquet input requires 'pyarrow' (pip install pyarrow).")
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunksize):
+            yield batch.to_pandas()
+
+
+def _clean(value):
+    """NaN / empty cells -> None so the normalizers apply their defaults."""
+    if value is None: return None
+    if isinstance(value, float) and math.isnan(value): return None
+    if isinstance(value, str) and not value.strip(): return None
+    return value
+
+
+# ------------------------------------------------------------
+# PER-RECORD PROCESSING
+# ------------------------------------------------------------
+def process_record(record, master, row_number=None):
+    """Runs the engine for one record dict and returns a flat output row."""
+    rec = {k: _clean(v) for k, v in record.items()}
+    record_id = rec.get("record_id", row_number)
+    out = {c: None for c in OUTPUT_COLUMNS}
+    out.update({"record_id": record_id, "state": rec.get("state"), "crop": rec.get("crop")})
+
+    missing = [c for c in REQUIRED_COLUMNS if not rec.get(c)]
+    if missing:
+        out.update({"status": "error", "error": f"Missing required fields: {', '.join(missing)}"})
+        return out
+
+    # Soil values are normalized and clamped (clamp_soil_inputs) by the router
+    soil = {k: rec.get(k) for k in SOIL_COLUMNS}
+
+    try:
+        res = generate_fertilizer_recommendation(
+            state=rec.get("state"),
+            crop=rec.get("crop"),
+            season=rec.get("season"),
+            soil=soil,
+            organic_type=rec.get("organic_type"),
+            organic_qty_kg=float(rec.get("organic_qty_kg") or 0),
+            target_yield=rec.get("target_yield"),
+            mode=str(rec.get("mode") or "AUTO").upper(),
+            master=master,
+        )
+    except Exception as e:
+        out.update({"status": "error", "error": f"Engine failure: {e}"})
+        return out
+
+    if "error" in res:
+        out.update({"status": "error", "error": res["error"]})
+        return out
+
+    nut = res["nutrients_required_kg_ha"]
+    fert = res["fertilizers_recommended_kg_ha"]
+    org = res["organic_credit_kg"]
+    out.update({
+        "status": res["status"],
+        "state": res["meta"]["state"],
+        "crop": res["meta"]["crop"],
+        "source_engine": res["meta"]["source_engine"],
+        "N_kg_ha": round(nut["N"], 2),
+        "P2O5_kg_ha": round(nut["P2O5"], 2),
+        "K2O_kg_ha": round(nut["K2O"], 2),
+        "DAP_kg": fert.get("DAP_kg"),
+        "Urea_kg": fert.get("Urea_kg"),
+        "MOP_kg": fert.get("MOP_kg"),
+        "organic_N_kg": round(org["N"], 2),
+        "organic_P2O5_kg": round(org["P2O5"], 2),
+        "organic_K2O_kg": round(org["K2O"], 2),
+        "micronutrients": json.dumps(res["micronutrients"]),
+        "advisories": " | ".join(res["advisories"]),
+    })
+    return out
+
+
+def process_chunk(chunk, start_row=0, master=None):
+    """Processes one DataFrame chunk; returns a list of output rows."""
+    if master is None:
+        master = get_master_dataset()
+    return [
+        process_record(rec, master, row_number=start_row + i)
+        for i, rec in enumerate(chunk.to_dict("records"))
+    ]
+
+
+# Worker side: each pool process loads the shared dataset once
+def _worker_init():
+    get_master_dataset()
+
+def _worker_run(args):
+    chunk, start_row = args
+    return process_chunk(chunk, start_row)
+
+
+# ------------------------------------------------------------
+# OUTPUT WRITERS (incremental)
+# ------------------------------------------------------------
+class _CsvWriter:
+    def __init__(self, path):
+        self.f = open(path, "w", newline="", encoding="utf-8")
+        self.w = csv.DictWriter(self.f, fieldnames=OUTPUT_COLUMNS)
+        self.w.writeheader()
+
+    def write(self, rows):
+        self.w.writerows(rows)
+
+    def close(self):
+        self.f.close()
+
+
+class _JsonlWriter:
+    def __init__(self, path):
+        self.f = open(path, "w", encoding="utf-8")
+
+    def write(self, rows):
+        for row in rows:
+            self.f.write(json.dumps(row) + "\n")
+
+    def close(self):
+        self.f.close()
+
+
+class _ParquetWriter:
+    def __init__(self, path):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ImportError("❌ Parquet output requires 'pyarrow' (pip install pyarrow).")
+        self.pa = pa
+        self.path = path
+        self.writer = None
+        self.pq = pq
+
+    def write(self, rows):
+        if not rows: return
+        table = self.pa.Table.from_pandas(pd.DataFrame(rows, columns=OUTPUT_COLUMNS).astype(str), preserve_index=False)
+        if self.writer is None:
+            self.writer = self.pq.ParquetWriter(self.path, table.schema)
+        self.writer.write_table(table)
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+
+
+def _open_writer(path):
+    fmt = _detect_format(path)
+    if fmt == "jsonl": return _JsonlWriter(path)
+    if fmt == "parquet": return _ParquetWriter(path)
+    return _CsvWriter(path)
+
+
+# ------------------------------------------------------------
+# PIPELINE
+# ------------------------------------------------------------
+def run_bulk_pipeline(input_path, output_path, workers=1, chunksize=DEFAULT_CHUNKSIZE, max_pending=None):
+    """
+    Streams `input_path` through the engine into `output_path`.
+    Output rows keep input order. With workers > 1, at most
+    `max_pending` chunks (default 2 * workers) are in flight at once.
+
+    Returns a summary dict: {"rows": ..., "success": ..., "errors": ...}.
+    """
+    summary = {"rows": 0, "success": 0, "errors": 0}
+    writer = _open_writer(output_path)
+
+    def consume(rows):
+        writer.write(rows)
+        summary["rows"] += len(rows)
+        ok = sum(1 for r in rows if r["status"] == "success")
+        summary["success"] += ok
+        summary["errors"] += len(rows) - ok
+
+    try:
+        chunks = iter_record_chunks(input_path, chunksize)
+
+        if workers <= 1:
+            master = get_master_dataset()
+            start = 0
+            for chunk in chunks:
+                consume(process_chunk(chunk, start, master))
+                start += len(chunk)
+            return summary
+
+        max_pending = max_pending or 2 * workers
+        with Pool(processes=workers, initializer=_worker_init) as pool:
+            pending = deque()
+            start = 0
+            for chunk in chunks:
+                pending.append(pool.apply_async(_worker_run, ((chunk, start),)))
+                start += len(chunk)
+                if len(pending) >= max_pending:
+                    consume(pending.popleft().get())
+            while pending:
+                consume(pending.popleft().get())
+        return summary
+    finally:
+        writer.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="SmartFert bulk recommendation pipeline")
+    parser.add_argument("input", help="Soil-test file (.csv, .jsonl or .parquet)")
+    parser.add_argument("output", help="Result file (.csv, .jsonl or .parquet)")
+    parser.add_argument("--workers", type=int, default=1, help="Worker processes (default 1)")
+    parser.add_argument("--chunksize", type=int, default=DEFAULT_CHUNKSIZE, help="Rows per chunk")
+    args = parser.parse_args()
+
+    result = run_bulk_pipeline(args.input, args.output, workers=args.workers, chunksize=args.chunksize)
+    print(f"✅ DONE: {result['rows']} rows ({result['success']} success, {result['errors']} errors) → {args.output}")
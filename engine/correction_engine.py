@@ -3,6 +3,7 @@
 # FIX: Added logic to prevent double subtraction of organic
 # nutrient if the STCR equation already handles it.
 # ============================================================
+from engine.organic_index import build_organic_index
 
 def safe_num(x):
     try: return float(x)
@@ -19,22 +20,9 @@ def classify(value, thresholds):
 
 def calculate_organic_content(o_type, o_qty, master):
     """Calculates kg of N, P, K added by organic manure."""
-    organic_rules = master["organic_rules"]
-    manure = organic_rules["organic_inputs"]["manure"]
-    cakes = organic_rules["organic_inputs"]["oilseed_cakes"]
-    all_sources = manure + cakes
-
-    # Normalize name comparison
-    entry = next((m for m in all_sources if m["name"].lower().strip() == str(o_type).lower().strip()), None)
-    
-    if not entry or not o_qty:
-        return {"N": 0, "P2O5": 0, "K2O": 0}
-    
-    return {
-        "N": (entry["N_percent"] / 100) * o_qty,
-        "P2O5": (entry["P2O5_percent"] / 100) * o_qty,
-        "K2O": (entry["K2O_percent"] / 100) * o_qty
-    }
+    # Prebuilt name/alias index (see data_loader); build on the fly otherwise
+    index = master.get("organic_index") or build_organic_index(master["organic_rules"])
+    return index.single_credit(o_type, o_qty)
 
 def compute_micronutrients(soil, micro_rules):
     """Detects deficiencies based on soil tests."""
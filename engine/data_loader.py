@@ -10,6 +10,12 @@
 import json
 import os
 import sys
+import threading
+from types import MappingProxyType
+
+from engine.equation_compiler import precompile_dataset
+from engine.npk_engine import build_npk_indexes
+from engine.organic_index import build_organic_index
 
 # ------------------------------------------------------------
 # DYNAMIC PATH CONFIGURATION
@@ -27,6 +33,11 @@ PATH_SOIL = os.path.join(DATA_DIR, "soil_fertility_thresholds.json")
 # Note: Keeping the double extension as per your specific file
 PATH_STCR_CONST = os.path.join(DATA_DIR, "stcr_equation_constants.json.json")
 
+# Optional mmap snapshot (engine/dataset_store.py): set to a file path and
+# the master dataset carries a shared read-only "snapshot" view, built from
+# the JSON on first load (and rebuilt when the JSON is newer)
+SNAPSHOT_ENV = "SMARTFERT_SNAPSHOT"
+
 
 def load_json(path, required_keys=None):
     """
@@ -61,8 +72,12 @@ def load_json(path, required_keys=None):
     return data
 
 
-def load_master_dataset():
-    """Loads all SmartFert dataset components."""
+def load_master_dataset(snapshot_path=None):
+    """
+    Loads all SmartFert dataset components. With `snapshot_path` (default:
+    $SMARTFERT_SNAPSHOT) the result also has "snapshot", a memory-mapped
+    DatasetSnapshot that worker processes share page-for-page.
+    """
     # print(f"🔍 System: Loading datasets from {DATA_DIR}...")
     
     main = load_json(PATH_MAIN, required_keys=["meta", "data"])
@@ -70,15 +85,53 @@ def load_master_dataset():
     soil = load_json(PATH_SOIL, required_keys=["critical_levels", "soil_fertility_thresholds"])
     stcr_const = load_json(PATH_STCR_CONST, required_keys=["stcr_equations"])
 
+    # Compile every STCR equation once (served from cache afterwards)
+    precompile_dataset(main["data"])
+
     MASTER = {
         "main": main,
         "data": main["data"],
         "organic_rules": organic,
         "soil_thresholds": soil,
         "stcr_constants": stcr_const,
+        # Prebuilt NPK priority index: {state: {crop: index}}
+        "npk_index": build_npk_indexes(main["data"]),
+        # Organic source name/alias index with nutrient fractions
+        "organic_index": build_organic_index(organic),
     }
+
+    snapshot_path = snapshot_path or os.environ.get(SNAPSHOT_ENV)
+    if snapshot_path:
+        from engine.dataset_store import load_snapshot
+        MASTER["snapshot"] = load_snapshot(MASTER, snapshot_path, source_path=PATH_MAIN)
     return MASTER
 
+# ------------------------------------------------------------
+# PROCESS-WIDE SHARED DATASET
+# ------------------------------------------------------------
+_SHARED_MASTER = None
+_SHARED_LOCK = threading.Lock()
+
+
+def get_master_dataset():
+    """
+    Returns the process-wide master dataset, loading it on first use.
+    The top level is read-only; treat nested blocks as read-only too.
+    """
+    global _SHARED_MASTER
+    if _SHARED_MASTER is None:
+        with _SHARED_LOCK:
+            if _SHARED_MASTER is None:
+                _SHARED_MASTER = MappingProxyType(load_master_dataset())
+    return _SHARED_MASTER
+
+
+def reset_master_dataset():
+    """Drops the shared dataset (next get_master_dataset() reloads from disk)."""
+    global _SHARED_MASTER
+    with _SHARED_LOCK:
+        _SHARED_MASTER = None
+
 # Test block
 if __name__ == "__main__":
     try:
@@ -0,0 +1,273 @@
+# ============================================================
+# dataset_store.py — Compact Binary Snapshot of the Master Dataset
+# Packs the crop/state table, NPK rows and STCR equation
+# coefficients into one file that worker processes can mmap
+# (read-only pages are shared by the OS, not copied per worker).
+#
+# File layout:
+#   MAGIC (8 bytes) | header length (uint64) | JSON header | arrays
+# Every array block is 64-byte aligned; the header stores its
+# dtype, shape and absolute offset.
+# ============================================================
+
+import json
+import os
+import struct
+
+import numpy as np
+
+from engine.equation_compiler import compile_equation, STCR_VARIABLES
+from engine.normalizer import normalize_season, normalize_soil, normalize_condition, normalize_float
+
+MAGIC = b"SFSNAP01"
+SNAPSHOT_VERSION = 1
+_ALIGN = 64
+
+NUTRIENTS = ("N", "P2O5", "K2O")
+
+# One row per (state, crop)
+ENTRY_DTYPE = np.dtype([
+    ("state", "<i4"), ("crop", "<i4"),
+    ("stcr_available", "u1"), ("npk_available", "u1"),
+    ("stcr_start", "<i4"), ("stcr_count", "<i4"),
+    ("npk_start", "<i4"), ("npk_count", "<i4"),
+])
+
+# One row per STCR equation set: [nutrient, const + 7 coefficients]
+STCR_DTYPE = np.dtype([
+    ("soil", "<i4"), ("linear", "u1"),
+    ("coeffs", "<f8", (len(NUTRIENTS), 1 + len(STCR_VARIABLES))),
+])
+
+# One row per NPK record (strings normalized as in npk_engine)
+NPK_DTYPE = np.dtype([
+    ("season", "<i4"), ("soil", "<i4"), ("condition", "<i4"),
+    ("npk", "<f8", (len(NUTRIENTS),)),
+])
+
+
+def _pad(n):
+    return (-n) % _ALIGN
+
+
+# ------------------------------------------------------------
+# WRITE
+# ------------------------------------------------------------
+def write_snapshot(master, path):
+    """Serializes master["data"] into a compact mmap-able snapshot file."""
+    data = master["data"]
+    states = sorted(data.keys())
+    crops = sorted({c for s in states for c in data[s].keys()})
+    crop_ids = {c: i for i, c in enumerate(crops)}
+
+    strings, string_ids = [], {}
+    def sid(text):
+        if text not in string_ids:
+            string_ids[text] = len(strings)
+            strings.append(text)
+        return string_ids[text]
+
+    entries, stcr_rows, npk_rows, stcr_sources = [], [], [], []
+
+    for s_idx, state in enumerate(states):
+        for crop in sorted(data[state].keys()):
+            entry = data[state][crop]
+            stcr_start, npk_start = len(stcr_rows), len(npk_rows)
+
+            for row in entry.get("stcr", []):
+                eqs = row.get("equations", {})
+                compiled = [compile_equation(eqs.get(n)) for n in NUTRIENTS]
+                coeffs = [[c.const, *c.coeffs] for c in compiled]
+                linear = all(c.linear for c in compiled)
+                stcr_rows.append((sid(str(row.get("Soil_Type", ""))), linear, coeffs))
+                stcr_sources.append([eqs.get(n) for n in NUTRIENTS])
+
+            for row in entry.get("npk", []):
+                npk_rows.append((
+                    sid(normalize_season(row.get("Season"))),
+                    sid(normalize_soil(row.get("Soil_Type"))),
+                    sid(normalize_condition(row.get("Condition"))),
+                    [normalize_float(row.get(f"{n}_kg_ha")) for n in NUTRIENTS],
+                ))
+
+            entries.append((
+                s_idx, crop_ids[crop],
+                bool(entry.get("stcr_available")), bool(entry.get("npk_available")),
+                stcr_start, len(stcr_rows) - stcr_start,
+                npk_start, len(npk_rows) - npk_start,
+            ))
+
+    arrays = {
+        "entries": np.array(entries, dtype=ENTRY_DTYPE),
+        "stcr": np.array(stcr_rows, dtype=STCR_DTYPE),
+        "npk": np.array(npk_rows, dtype=NPK_DTYPE),
+    }
+
+    header = {
+        "version": SNAPSHOT_VERSION,
+        "states": states,
+        "crops": crops,
+        "strings": strings,
+        "stcr_sources": stcr_sources,
+        "arrays": {},
+    }
+
+    # Offsets depend on the header size, so lay out twice until stable
+    header_len = 0
+    while True:
+        offset = len(MAGIC) + 8 + header_len
+        offset += _pad(offset)
+        for name, arr in arrays.items():
+            header["arrays"][name] = {"dtype": arr.dtype.descr, "shape": list(arr.shape), "offset": offset}
+            offset += arr.nbytes + _pad(arr.nbytes)
+        header_bytes = json.dumps(header).encode("utf-8")
+        if len(header_bytes) == header_len:
+            break
+        header_len = len(header_bytes)
+
+    with open(path, "wb") as f:
+        f.write(MAGIC)
+        f.write(struct.pack("<Q", len(header_bytes)))
+        f.write(header_bytes)
+        for name, arr in arrays.items():
+            f.write(b"\0" * (header["arrays"][name]["offset"] - f.tell()))
+            f.write(arr.tobytes())
+
+    return path
+
+
+# ------------------------------------------------------------
+# READ (memory-mapped)
+# ------------------------------------------------------------
+def _descr(descr):
+    """JSON round-trips dtype descr tuples as lists; restore them."""
+    out = []
+    for field in descr:
+        name, fmt, *shape = field
+        out.append((name, fmt, tuple(shape[0])) if shape else (name, fmt))
+    return out
+
+
+class DatasetSnapshot:
+    """Read-only, mmap-backed view of a snapshot written by write_snapshot."""
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f"❌ DATA ERROR: {path} is not a SmartFert snapshot")
+            (header_len,) = struct.unpack("<Q", f.read(8))
+            header = json.loads(f.read(header_len).decode("utf-8"))
+
+        if header.get("version") != SNAPSHOT_VERSION:
+            raise ValueError(f"❌ DATA ERROR: Unsupported snapshot version in {path}")
+
+        self.states = header["states"]
+        self.crops = header["crops"]
+        self.strings = header["strings"]
+        self._stcr_sources = header["stcr_sources"]
+
+        for name, spec in header["arrays"].items():
+            shape = tuple(spec["shape"])
+            dtype = np.dtype(_descr(spec["dtype"]))
+            if shape[0] == 0:
+                arr = np.zeros(shape, dtype=dtype)
+            else:
+                arr = np.memmap(path, dtype=dtype, mode="r", offset=spec["offset"], shape=shape)
+            setattr(self, name, arr)
+
+        self._lookup = {
+            (self.states[e["state"]], self.crops[e["crop"]]): i
+            for i, e in enumerate(self.entries)
+        }
+
+    def has(self, state, crop):
+        return (state, crop) in self._lookup
+
+    def entry(self, state, crop):
+        """Packed entry row for (state, crop); KeyError if missing."""
+        return self.entries[self._lookup[(state, crop)]]
+
+    def _stcr_row(self, state, crop, i):
+        """Absolute STCR row of the i-th equation set of (state, crop)."""
+        e = self.entry(state, crop)
+        if not 0 <= i < e["stcr_count"]:
+            raise IndexError(f"No STCR equation #{i} for {crop} in {state}")
+        return int(e["stcr_start"]) + i
+
+    def stcr_coefficients(self, state, crop, i=0):
+        """
+        (3, 8) coefficient matrix of the i-th STCR equation set.
+        Rows: N, P2O5, K2O. Columns: const, then STCR_VARIABLES.
+        """
+        return self.stcr["coeffs"][self._stcr_row(state, crop, i)]
+
+    def stcr_entry(self, state, crop, i=0):
+        """Rebuilds an STCR entry dict usable by compute_stcr / compute_stcr_batch."""
+        row = self._stcr_row(state, crop, i)
+        return {
+            "Soil_Type": self.strings[self.stcr["soil"][row]],
+            "equations": dict(zip(NUTRIENTS, self._stcr_sources[row])),
+        }
+
+    def npk_rows(self, state, crop):
+        """NPK rows as dicts with normalized Season/Soil_Type/Condition."""
+        e = self.entry(state, crop)
+        rows = self.npk[e["npk_start"]: e["npk_start"] + e["npk_count"]]
+        return [
+            {
+                "Season": self.strings[r["season"]],
+                "Soil_Type": self.strings[r["soil"]],
+                "Condition": self.strings[r["condition"]],
+                "N_kg_ha": float(r["npk"][0]),
+                "P2O5_kg_ha": float(r["npk"][1]),
+                "K2O_kg_ha": float(r["npk"][2]),
+            }
+            for r in rows
+        ]
+
+    def evaluate_stcr(self, state, crop, X, i=0):
+        """
+        Evaluates the i-th STCR set for an (n, 7) matrix ordered as
+        STCR_VARIABLES. Returns {"N": array, "P2O5": array, "K2O": array} (raw).
+        """
+        row = self._stcr_row(state, crop, i)
+        X = np.asarray(X, dtype=float)
+        if self.stcr["linear"][row]:
+            coeffs = self.stcr["coeffs"][row]
+            values = X @ coeffs[:, 1:].T + coeffs[:, 0]
+            return {n: values[:, k] for k, n in enumerate(NUTRIENTS)}
+        sources = self._stcr_sources[row]
+        return {n: compile_equation(src).evaluate_matrix(X) for n, src in zip(NUTRIENTS, sources)}
+
+
+def open_snapshot(path):
+    """Opens a snapshot file as a memory-mapped DatasetSnapshot."""
+    return DatasetSnapshot(path)
+
+
+def load_snapshot(master, path, source_path=None):
+    """
+    Memory-mapped snapshot of `master` at `path`, (re)written first when the
+    file is missing or older than `source_path` (the master JSON).
+    """
+    stale = not os.path.exists(path) or (
+        source_path is not None and os.path.getmtime(path) < os.path.getmtime(source_path)
+    )
+    if stale:
+        # Write-then-rename so processes mapping the old file are unaffected
+        tmp = f"{path}.{os.getpid()}.tmp"
+        write_snapshot(master, tmp)
+        os.replace(tmp, path)
+    return open_snapshot(path)
+
+
+# Build block: python -m engine.dataset_store <output path>
+if __name__ == "__main__":
+    import sys
+    from engine.data_loader import get_master_dataset
+
+    out = sys.argv[1] if len(sys.argv) > 1 else "smartfert_snapshot.bin"
+    write_snapshot(get_master_dataset(), out)
+    snap = open_snapshot(out)
+    print(f"✅ SUCCESS: Wrote {len(snap.entries)} crop entries to {out}")
@@ -0,0 +1,313 @@
+# ============================================================
+# equation_compiler.py — Compile-once STCR Equation Layer
+# Parses each equation string a single time and reduces it to
+# a coefficient vector over T, SN, SP, SK, ON, OP, OK.
+# Compiled equations are cached by string (bounded LRU).
+# Shared by engine/stcr_engine.py, engine/smart_farmer_engine.py
+# and data/smart_fertilizer_engine.py.
+# ============================================================
+import ast
+import operator
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+# Variable order used by every coefficient vector
+STCR_VARIABLES = ("T", "SN", "SP", "SK", "ON", "OP", "OK")
+ORGANIC_VARIABLES = ("ON", "OP", "OK")
+_VAR_INDEX = {name: i for i, name in enumerate(STCR_VARIABLES)}
+
+# Allowed mathematical operations (Security whitelist)
+_ALLOWED_OPS = {
+    ast.Add: operator.add,
+    ast.Sub: operator.sub,
+    ast.Mult: operator.mul,
+    ast.Div: operator.truediv,
+    ast.USub: operator.neg,
+    ast.Pow: operator.pow,
+}
+
+DEFAULT_CACHE_SIZE = 1024
+
+
+class _Invalid(Exception):
+    """Raised while compiling when the equation can never evaluate."""
+
+
+# ------------------------------------------------------------
+# AFFINE FORM:  const + sum(coeffs[i] * VAR[i])
+# ------------------------------------------------------------
+def _const(value):
+    return (float(value), (0.0,) * len(STCR_VARIABLES))
+
+def _is_const(form):
+    return not any(form[1])
+
+def _add(a, b, sign=1.0):
+    return (a[0] + sign * b[0], tuple(x + sign * y for x, y in zip(a[1], b[1])))
+
+def _scale(form, k):
+    return (form[0] * k, tuple(c * k for c in form[1]))
+
+
+def _to_affine(node):
+    """
+    Reduces an AST node to an affine form.
+    Returns None if the expression is not linear in the variables.
+    """
+    # Number literal / Constant
+    if isinstance(node, ast.Constant):
+        if isinstance(node.value, (int, float)):
+            return _const(node.value)
+        raise _Invalid()
+
+    # Variable Name (T, SN, ON etc.) — unknown names evaluate to 0
+    if isinstance(node, ast.Name):
+        idx = _VAR_INDEX.get(node.id)
+        if idx is None:
+            return _const(0.0)
+        coeffs = [0.0] * len(STCR_VARIABLES)
+        coeffs[idx] = 1.0
+        return (0.0, tuple(coeffs))
+
+    # Unary Operation (-A)
+    if isinstance(node, ast.UnaryOp):
+        if type(node.op) not in _ALLOWED_OPS:
+            return _const(0.0)
+        inner = _to_affine(node.operand)
+        return None if inner is None else _scale(inner, -1.0)
+
+    # Binary Operation (A + B)
+    if isinstance(node, ast.BinOp):
+        if type(node.op) not in _ALLOWED_OPS:
+            return _const(0.0)
+        left = _to_affine(node.left)
+        right = _to_affine(node.right)
+        if left is None or right is None:
+            return None
+
+        if isinstance(node.op, ast.Add):
+            return _add(left, right)
+        if isinstance(node.op, ast.Sub):
+            return _add(left, right, sign=-1.0)
+        if isinstance(node.op, ast.Mult):
+            if _is_const(left):
+                return _scale(right, left[0])
+            if _is_const(right):
+                return _scale(left, right[0])
+            return None
+        if isinstance(node.op, ast.Div):
+            if _is_const(right):
+                if right[0] == 0:
+                    raise _Invalid()
+                return _scale(left, 1.0 / right[0])
+            return None
+        if isinstance(node.op, ast.Pow):
+            if _is_const(left) and _is_const(right):
+                try:
+                    return _const(left[0] ** right[0])
+                except (OverflowError, ZeroDivisionError):
+                    raise _Invalid()
+            return None
+
+    # Anything else (calls, attributes ...) evaluates to 0
+    return _const(0.0)
+
+
+def _to_closure(node):
+    """Fallback for non-linear equations: a pre-built closure tree."""
+    if isinstance(node, ast.Constant):
+        value = node.value
+        return lambda v: value
+    if isinstance(node, ast.Name):
+        name = node.id
+        return lambda v: v.get(name, 0.0)
+    if isinstance(node, ast.BinOp):
+        op = _ALLOWED_OPS.get(type(node.op))
+        if op:
+            left, right = _to_closure(node.left), _to_closure(node.right)
+            return lambda v: op(left(v), right(v))
+    if isinstance(node, ast.UnaryOp):
+        op = _ALLOWED_OPS.get(type(node.op))
+        if op:
+            operand = _to_closure(node.operand)
+            return lambda v: op(operand(v))
+    return lambda v: 0.0
+
+
+# ------------------------------------------------------------
+# COMPILED EQUATION
+# ------------------------------------------------------------
+class CompiledEquation:
+    """
+    A pre-validated equation.
+    Linear equations are evaluated as `const + coeffs · vars`.
+    Non-linear (rare) equations keep a closure tree; no re-parsing.
+    """
+    __slots__ = ("source", "const", "coeffs", "linear", "names", "_fn")
+
+    def __init__(self, source, const=0.0, coeffs=None, fn=None, names=()):
+        self.source = source
+        self.const = const
+        self.coeffs = coeffs if coeffs is not None else (0.0,) * len(STCR_VARIABLES)
+        self.linear = fn is None
+        self.names = frozenset(names)   # STCR variables referenced in the source
+        self._fn = fn
+
+    @property
+    def variables(self):
+        """Names of the variables with a non-zero coefficient."""
+        return tuple(n for n, c in zip(STCR_VARIABLES, self.coeffs) if c)
+
+    @property
+    def organic_terms(self):
+        """Organic variables (ON/OP/OK) the equation already accounts for."""
+        return self.names.intersection(ORGANIC_VARIABLES)
+
+    def evaluate(self, vars_dict):
+        """Evaluates against a dict like {"T": 30, "SN": 250, ...}."""
+        if not self.linear:
+            try:
+                return self._fn(vars_dict)
+            except Exception:
+                return 0.0
+        total = self.const
+        for name, c in zip(STCR_VARIABLES, self.coeffs):
+            if c:
+                total += c * vars_dict.get(name, 0.0)
+        return total
+
+    def evaluate_vector(self, values):
+        """Evaluates against values ordered as STCR_VARIABLES."""
+        if not self.linear:
+            return self.evaluate(dict(zip(STCR_VARIABLES, values)))
+        total = self.const
+        for c, x in zip(self.coeffs, values):
+            total += c * x
+        return total
+
+    def evaluate_matrix(self, X):
+        """
+        Evaluates many rows in one pass.
+        X: (n, 7) float array with columns ordered as STCR_VARIABLES.
+        """
+        X = np.asarray(X, dtype=float)
+        if self.linear:
+            return X @ np.asarray(self.coeffs) + self.const
+
+        cols = {name: X[:, i] for i, name in enumerate(STCR_VARIABLES)}
+        with np.errstate(all="ignore"):
+            try:
+                out = np.asarray(self._fn(cols), dtype=float)
+            except Exception:
+                return np.zeros(len(X))
+        out = np.broadcast_to(out, (len(X),)).astype(float)
+        # Rows that would raise (e.g. division by zero) fail safe to 0
+        return np.where(np.isfinite(out), out, 0.0)
+
+    def __repr__(self):
+        kind = "linear" if self.linear else "closure"
+        return f"CompiledEquation({self.source!r}, {kind})"
+
+
+def _compile(expr):
+    """Parses an equation string into a CompiledEquation (fail safe → 0)."""
+    if not expr or not isinstance(expr, str):
+        return CompiledEquation(expr)
+    try:
+        tree = ast.parse(expr, mode="eval")
+    except Exception:
+        return CompiledEquation(expr)
+
+    names = {n.id for n in ast.walk(tree) if isinstance(n, ast.Name) and n.id in _VAR_INDEX}
+    try:
+        form = _to_affine(tree.body)
+    except _Invalid:
+        return CompiledEquation(expr, names=names)
+
+    if form is None:
+        return CompiledEquation(expr, fn=_to_closure(tree.body), names=names)
+    return CompiledEquation(expr, const=form[0], coeffs=form[1], names=names)
+
+
+# ------------------------------------------------------------
+# BOUNDED LRU CACHE (thread-safe, with hit/miss counters)
+# ------------------------------------------------------------
+class EquationCache:
+    def __init__(self, maxsize=DEFAULT_CACHE_SIZE):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._store = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, expr):
+        with self._lock:
+            compiled = self._store.get(expr)
+            if compiled is not None:
+                self._store.move_to_end(expr)
+                self.hits += 1
+                return compiled
+            self.misses += 1
+
+        compiled = _compile(expr)
+
+        with self._lock:
+            self._store[expr] = compiled
+            self._store.move_to_end(expr)
+            while len(self._store) > self.maxsize:
+                self._store.popitem(last=False)
+        return compiled
+
+    def info(self):
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "size": len(self._store),
+                "maxsize": self.maxsize,
+            }
+
+    def clear(self):
+        with self._lock:
+            self._store.clear()
+            self.hits = 0
+            self.misses = 0
+
+
+_CACHE = EquationCache()
+
+
+def compile_equation(expr):
+    """Returns the cached CompiledEquation for an equation string."""
+    return _CACHE.get(expr)
+
+
+def cache_info():
+    """Hit/miss counters of the shared equation cache."""
+    return _CACHE.info()
+
+
+def clear_cache():
+    _CACHE.clear()
+
+
+def precompile_dataset(data):
+    """
+    Compiles every STCR equation in a master 'data' block
+    ({state: {crop: {"stcr": [{"equations": {...}}]}}}).
+    Returns the number of equations compiled.
+    """
+    count = 0
+    for crops in data.values():
+        if not isinstance(crops, dict):
+            continue
+        for entry in crops.values():
+            if not isinstance(entry, dict):
+                continue
+            for row in entry.get("stcr", []):
+                for expr in row.get("equations", {}).values():
+                    compile_equation(expr)
+                    count += 1
+    return count
@@ -3,7 +3,7 @@
 # Orchestrates all engines to produce final recommendation.
 # ============================================================
 
-from engine.data_loader import load_master_dataset
+from engine.data_loader import get_master_dataset
 from engine.normalizer import (
     normalize_state, normalize_crop, normalize_season, 
     normalize_soil, normalize_condition, normalize_float
@@ -34,9 +34,9 @@ def generate_fertilizer_recommendation(
     target_yield=None, mode="AUTO", master=None,
     tr=None       # <-- FIX: allow optional translation function
 ):
-    # 0. Load Data if not provided
+    # 0. Use the shared dataset if not provided
     if not master:
-        master = load_master_dataset()
+        master = get_master_dataset()
     
     # 1. Normalize & Validate User Inputs
     state = normalize_state(state)
@@ -48,6 +48,7 @@ def generate_fertilizer_recommendation(
         return {"error": err}
 
     entry = master["data"][state][crop]
+    npk_index = master.get("npk_index", {}).get(state, {}).get(crop)
     stcr_avail = entry.get("stcr_available", False)
     npk_avail = entry.get("npk_available", False)
 
@@ -84,7 +85,8 @@ def generate_fertilizer_recommendation(
             baseline = get_npk_recommendation(
                 entry.get("npk", []),
                 season,
-                soil_norm["Soil_Type"]
+                soil_norm["Soil_Type"],
+                index=npk_index
             )
             
             stcr_res = compute_stcr(entry["stcr"][0], soil_norm, target_yield, baseline)
@@ -117,7 +119,8 @@ def generate_fertilizer_recommendation(
             entry["npk"],
             season,
             soil_norm["Soil_Type"],
-            soil_norm["Condition"]
+            soil_norm["Condition"],
+            index=npk_index
         )
         
         corr_res = apply_all_corrections(
@@ -1,53 +1,81 @@
 # ============================================================
 # npk_engine.py — NPK Database Lookup Logic
-# Implements priority-based fallback for finding data
+# Implements priority-based fallback for finding data.
+# Rows are indexed once (at dataset load) so every priority
+# tier is a single dict lookup.
 # ============================================================
 from engine.normalizer import normalize_soil, normalize_condition, normalize_season, normalize_float
 
-def get_npk_recommendation(npk_list, season, soil_type=None, condition=None):
+_ZERO = {"N": 0, "P2O5": 0, "K2O": 0}
+
+
+def _extract(row):
+    return {
+        "N": normalize_float(row.get("N_kg_ha")),
+        "P2O5": normalize_float(row.get("P2O5_kg_ha")),
+        "K2O": normalize_float(row.get("K2O_kg_ha"))
+    }
+
+
+def build_npk_index(npk_list):
+    """
+    Pre-normalizes an 'npk' list into one dict per priority tier.
+    The first matching row wins in every tier (same as a linear scan).
+    """
+    index = {"exact": {}, "season_soil": {}, "season": {}, "any": None}
+
+    for row in npk_list or []:
+        season = normalize_season(row.get("Season"))
+        soil = normalize_soil(row.get("Soil_Type"))
+        cond = normalize_condition(row.get("Condition"))
+        values = _extract(row)
+
+        index["exact"].setdefault((season, soil, cond), values)
+        index["season_soil"].setdefault((season, soil), values)
+        index["season"].setdefault(season, values)
+        if season == "Any" and index["any"] is None:
+            index["any"] = values
+
+    return index
+
+
+def build_npk_indexes(data):
+    """Builds {state: {crop: npk_index}} for a master 'data' block."""
+    return {
+        state: {crop: build_npk_index(entry.get("npk", [])) for crop, entry in crops.items()}
+        for state, crops in data.items()
+    }
+
+
+def get_npk_recommendation(npk_list, season, soil_type=None, condition=None, index=None):
     """
-    Scans the 'npk' list from the dataset to find the best match.
+    Finds the best match in the 'npk' list from the dataset.
     Priority 1: Season + Soil + Condition
     Priority 2: Season + Soil
     Priority 3: Season Only
     Priority 4: Season = "Any"
+
+    Pass the prebuilt `index` (master["npk_index"][state][crop]) to skip
+    indexing the list on every call.
     """
-    if not npk_list: return {"N": 0, "P2O5": 0, "K2O": 0}
+    if index is None:
+        if not npk_list: return dict(_ZERO)
+        index = build_npk_index(npk_list)
 
     # Normalize inputs
     season = normalize_season(season)
     soil_type = normalize_soil(soil_type)
     condition = normalize_condition(condition)
 
-    def extract(row):
-        return {
-            "N": normalize_float(row.get("N_kg_ha")),
-            "P2O5": normalize_float(row.get("P2O5_kg_ha")),
-            "K2O": normalize_float(row.get("K2O_kg_ha"))
-        }
-
-    # Priority 1: Exact Match (Season + Soil + Cond)
-    for row in npk_list:
-        if (normalize_season(row.get("Season")) == season and 
-            normalize_soil(row.get("Soil_Type")) == soil_type and
-            normalize_condition(row.get("Condition")) == condition):
-            return extract(row)
-
-    # Priority 2: Season + Soil
-    for row in npk_list:
-        if (normalize_season(row.get("Season")) == season and 
-            normalize_soil(row.get("Soil_Type")) == soil_type):
-            return extract(row)
-
-    # Priority 3: Season Only (Condition assumed standard, Soil ignored)
-    for row in npk_list:
-        if normalize_season(row.get("Season")) == season:
-            return extract(row)
-
-    # Priority 4: Fallback "Any" season
-    for row in npk_list:
-        if normalize_season(row.get("Season")) == "Any":
-            return extract(row)
+    # Priority 1 → 4 (first hit wins)
+    match = (
+        index["exact"].get((season, soil_type, condition))
+        or index["season_soil"].get((season, soil_type))
+        or index["season"].get(season)
+        or index["any"]
+    )
+    if match is not None:
+        return dict(match)
 
     # No match found
-    return {"N": 0, "P2O5": 0, "K2O": 0}
\ No newline at end of file
+    return dict(_ZERO)
@@ -0,0 +1,114 @@
+# ============================================================
+# organic_index.py — Organic Source Name Index
+# Built once from organic_rules.json. Every manure / oilseed
+# cake gets normalized aliases ("Farm Yard Manure (FYM)" →
+# "farm yard manure (fym)", "farm yard manure", "fym") and a
+# nutrient-fraction row [N, P2O5, K2O] (percent / 100).
+# Multi-source credits are one dot product: qty_vector @ fractions.
+# ============================================================
+import functools
+import re
+
+import numpy as np
+
+NUTRIENTS = ("N", "P2O5", "K2O")
+_ZERO = {"N": 0, "P2O5": 0, "K2O": 0}
+
+# Distinct fuzzy queries remembered per index (queries are free user text)
+FUZZY_CACHE_SIZE = 1024
+
+
+def normalize_source_name(name):
+    """'  Farm Yard  Manure (FYM) ' -> 'farm yard manure (fym)'"""
+    return " ".join(str(name).lower().split())
+
+
+def _aliases(name):
+    base = normalize_source_name(name)
+    out = [base]
+    # Name without the bracketed abbreviation, and the abbreviation itself
+    m = re.match(r"^(.*?)\s*\(([^)]*)\)\s*$", base)
+    if m:
+        out += [m.group(1).strip(), m.group(2).strip()]
+    # Punctuation-free variant ("goat/sheep manure" -> "goat sheep manure")
+    out.append(" ".join(re.sub(r"[^a-z0-9]+", " ", base).split()))
+    return [a for a in out if a]
+
+
+def _percent(value):
+    try:
+        return float(value) / 100.0
+    except (TypeError, ValueError):
+        return 0.0
+
+
+class OrganicIndex:
+    def __init__(self, sources):
+        self.names = [s["name"] for s in sources]
+        self.fractions = np.array(
+            [[_percent(s.get(f"{n}_percent")) for n in NUTRIENTS] for s in sources],
+            dtype=float,
+        ).reshape(len(sources), len(NUTRIENTS))
+
+        # Alias -> row (first source wins, as with a linear scan)
+        self.lookup = {}
+        for i, name in enumerate(self.names):
+            for alias in _aliases(name):
+                self.lookup.setdefault(alias, i)
+
+        self._lower_names = [normalize_source_name(n) for n in self.names]
+        # Bounded, thread-safe memo of substring scans
+        self._fuzzy = functools.lru_cache(maxsize=FUZZY_CACHE_SIZE)(self._scan)
+
+    def find(self, name):
+        """Row index for a source name/alias, or None."""
+        if not name: return None
+        return self.lookup.get(normalize_source_name(name))
+
+    def find_fuzzy(self, name):
+        """
+        Row of the first source whose name contains `name`
+        (substring match, memoized per query), or None.
+        """
+        if not name: return None
+        return self._fuzzy(str(name).lower())
+
+    def _scan(self, key):
+        return next((i for i, n in enumerate(self.names) if key in n.lower()), None)
+
+    def credit_vector(self, applied, fuzzy=False):
+        """
+        applied: {source_name: kg} → np.array([N, P2O5, K2O]) in kg.
+        Unknown names and non-positive quantities are ignored.
+        """
+        qty = np.zeros(len(self.names))
+        find = self.find_fuzzy if fuzzy else self.find
+        for name, kg in applied.items():
+            try:
+                kg = float(kg)
+            except (TypeError, ValueError):
+                continue
+            if kg <= 0: continue
+            row = find(name)
+            if row is not None:
+                qty[row] += kg
+        return qty @ self.fractions
+
+    def credit(self, applied, fuzzy=False):
+        """Same as credit_vector, as {"N": .., "P2O5": .., "K2O": ..}."""
+        vec = self.credit_vector(applied, fuzzy=fuzzy)
+        return {n: float(v) for n, v in zip(NUTRIENTS, vec)}
+
+    def single_credit(self, name, qty, fuzzy=False):
+        """Credit for one source; zeros if unknown or qty is empty."""
+        row = self.find_fuzzy(name) if fuzzy else self.find(name)
+        if row is None or not qty:
+            return dict(_ZERO)
+        return {n: float(f) * qty for n, f in zip(NUTRIENTS, self.fractions[row])}
+
+
+def build_organic_index(organic_rules):
+    """Builds the index from organic_rules.json (whole file or its 'organic_inputs' block)."""
+    inputs = organic_rules.get("organic_inputs", organic_rules)
+    sources = list(inputs.get("manure", [])) + list(inputs.get("oilseed_cakes", []))
+    return OrganicIndex(sources)
@@ -4,10 +4,11 @@
 
 import json
 import os
-import ast
-import operator
 from pathlib import Path
 
+from engine.equation_compiler import compile_equation, precompile_dataset
+from engine.organic_index import build_organic_index
+
 # =============================================================================
 # 1. CONFIGURATION & DATA LOADING
 # =============================================================================
@@ -74,35 +75,15 @@ def safe_float(val):
         return 0.0
 
 # =============================================================================
-# 3. MATH ENGINE (AST EVALUATOR)
+# 3. MATH ENGINE (SHARED COMPILED EQUATIONS)
 # =============================================================================
 
-_ALLOWED_OPS = {
-    ast.Add: operator.add, ast.Sub: operator.sub,
-    ast.Mult: operator.mul, ast.Div: operator.truediv,
-    ast.USub: operator.neg
-}
-
 def solve_equation(equation_str, variables):
     """Safely solves equations like '4.38*T - 0.28*SN' using soil data."""
     if not equation_str or not isinstance(equation_str, str):
         return 0.0
-    try:
-        tree = ast.parse(equation_str, mode='eval')
-        
-        def _eval(node):
-            if isinstance(node, ast.Constant): return node.value
-            if isinstance(node, ast.Name): return variables.get(node.id, 0.0)
-            if isinstance(node, ast.BinOp):
-                return _ALLOWED_OPS[type(node.op)](_eval(node.left), _eval(node.right))
-            if isinstance(node, ast.UnaryOp):
-                return _ALLOWED_OPS[type(node.op)](_eval(node.operand))
-            return 0.0
-            
-        return max(0.0, _eval(tree.body)) # Never return negative fertilizer
-    except Exception as e:
-        # print(f"Math Error in '{equation_str}': {e}")
-        return 0.0
+    # Parsed once and cached by engine.equation_compiler
+    return max(0.0, compile_equation(equation_str).evaluate(variables)) # Never return negative fertilizer
 
 # =============================================================================
 # 4. CORE LOGIC COMPONENT
@@ -115,24 +96,18 @@ class SmartFarmerEngine:
         self.organic_data = load_json_safe(FILE_ORG)
         self.soil_data = load_json_safe(FILE_SOIL)
 
+        # Compile every STCR equation once
+        precompile_dataset(self.main_data)
+        # Manure / oilseed cake name index
+        self.organic_index = build_organic_index(self.organic_data)
+
     def get_organic_credit(self, manure_name, qty_kg):
         """Calculates NPK supplied by organic manure."""
         if not manure_name or qty_kg <= 0:
             return {"N": 0, "P2O5": 0, "K2O": 0}
         
-        # Search in manure and oilseed_cakes lists
-        sources = self.organic_data.get("organic_inputs", {}).get("manure", []) + \
-                  self.organic_data.get("organic_inputs", {}).get("oilseed_cakes", [])
-        
-        for source in sources:
-            # Fuzzy match name
-            if manure_name.lower() in source["name"].lower():
-                return {
-                    "N": (safe_float(source.get("N_percent")) / 100) * qty_kg,
-                    "P2O5": (safe_float(source.get("P2O5_percent")) / 100) * qty_kg,
-                    "K2O": (safe_float(source.get("K2O_percent")) / 100) * qty_kg
-                }
-        return {"N": 0, "P2O5": 0, "K2O": 0}
+        # Fuzzy (substring) name match, memoized in the organic index
+        return self.organic_index.single_credit(manure_name, qty_kg, fuzzy=True)
 
     def check_micronutrients(self, soil_test):
         """Checks thresholds from soil_fertility_thresholds.json."""
@@ -1,55 +1,21 @@
 # ============================================================
 # stcr_engine.py — Targeted Yield Equation Solver
-# Uses AST for safe evaluation of math strings.
+# Uses compiled (AST-validated) equations, cached by string.
 # Handles ON, OP, OK (Organic variables) correctly.
 # ============================================================
-import ast
-import operator
-from engine.normalizer import normalize_soil
+import numpy as np
 
-# Allowed mathematical operations (Security whitelist)
-_ALLOWED_OPS = {
-    ast.Add: operator.add,
-    ast.Sub: operator.sub,
-    ast.Mult: operator.mul,
-    ast.Div: operator.truediv,
-    ast.USub: operator.neg,
-    ast.Pow: operator.pow,
-}
+from engine.normalizer import normalize_soil
+from engine.equation_compiler import compile_equation, STCR_VARIABLES
 
 def safe_eval_expr(expr, vars_dict):
     """
-    Parses and evaluates a math string safely without using eval().
+    Evaluates a math string safely without using eval().
     Example: "4.25*T - 0.5*SN" -> Result
+    The string is parsed once and served from the compiled-equation cache.
     """
     if not expr: return 0.0
-    try:
-        # Parse the expression into an Abstract Syntax Tree
-        tree = ast.parse(expr, mode='eval')
-        return _eval_node(tree.body, vars_dict)
-    except Exception as e:
-        # If parsing fails, return 0 (Fail safe)
-        return 0.0
-
-def _eval_node(node, vars_dict):
-    # Number literal
-    if isinstance(node, ast.Num): return node.n
-    # Constant (Python 3.8+)
-    if isinstance(node, ast.Constant): return node.value
-    # Variable Name (T, SN, ON etc.)
-    if isinstance(node, ast.Name): return vars_dict.get(node.id, 0.0)
-    
-    # Binary Operation (A + B)
-    if isinstance(node, ast.BinOp):
-        op = _ALLOWED_OPS.get(type(node.op))
-        if op: return op(_eval_node(node.left, vars_dict), _eval_node(node.right, vars_dict))
-        
-    # Unary Operation (-A)
-    if isinstance(node, ast.UnaryOp):
-        op = _ALLOWED_OPS.get(type(node.op))
-        if op: return op(_eval_node(node.operand, vars_dict))
-        
-    return 0.0
+    return compile_equation(expr).evaluate(vars_dict)
 
 def compute_stcr(stcr_entry, soil, T, npk_baseline):
     """
@@ -88,4 +54,74 @@ def compute_stcr(stcr_entry, soil, T, npk_baseline):
             final["N"] = npk_baseline["N"] * 1.5
             warnings.append("STCR yield target too high for soil. N clamped to safe limit.")
 
-    return {"raw": raw, "final": final, "warnings": warnings}
\ No newline at end of file
+    return {"raw": raw, "final": final, "warnings": warnings}
+
+
+# ============================================================
+# BATCH SOLVER — thousands of soil tests in one pass
+# ============================================================
+def _column(values, n):
+    """Float column of length n; None/NaN/missing -> 0."""
+    if values is None:
+        return np.zeros(n)
+    col = np.broadcast_to(np.asarray(values, dtype=float), (n,))
+    return np.nan_to_num(col, nan=0.0, posinf=0.0, neginf=0.0)
+
+
+def compute_stcr_batch(stcr_entry, soil_array, T_array, npk_baseline=None):
+    """
+    Vectorized compute_stcr.
+
+    soil_array   : column mapping (dict of arrays / DataFrame) with SN, SP, SK,
+                   ON, OP, OK — or an (n, 6) array in that column order.
+    T_array      : target yields, length n (or a scalar for every row).
+    npk_baseline : optional {"N": ...} with a scalar or per-row array.
+
+    Returns {"raw": {...}, "final": {...}, "n_clamped": bool array, "warnings": [...]}
+    with one float array per nutrient.
+    """
+    eq = stcr_entry.get("equations", {})
+    soil_cols = STCR_VARIABLES[1:]
+
+    if hasattr(soil_array, "keys"):
+        # Longest input sets the row count; scalars broadcast to it
+        sizes = [np.size(T_array)] + [np.size(soil_array[k]) for k in soil_cols if k in soil_array]
+        n = max(sizes)
+    else:
+        soil_matrix = np.atleast_2d(np.asarray(soil_array, dtype=float))
+        n = soil_matrix.shape[0]
+        sizes = [np.size(T_array), n]
+
+    if any(size not in (1, n) for size in sizes):
+        raise ValueError(f"STCR batch inputs must have length {n} or 1, got lengths {sorted(set(sizes))}.")
+
+    if hasattr(soil_array, "keys"):
+        columns = [_column(soil_array[k] if k in soil_array else None, n) for k in soil_cols]
+    else:
+        columns = [_column(soil_matrix[:, i], n) for i in range(len(soil_cols))]
+
+    # Columns ordered as STCR_VARIABLES (T first)
+    X = np.column_stack([_column(T_array, n)] + columns)
+
+    raw = {
+        "N": compile_equation(eq.get("N")).evaluate_matrix(X),
+        "P2O5": compile_equation(eq.get("P2O5")).evaluate_matrix(X),
+        "K2O": compile_equation(eq.get("K2O")).evaluate_matrix(X),
+    }
+
+    # Clamp to 0 (Cannot recommend negative fertilizer)
+    final = {k: np.maximum(v, 0.0) for k, v in raw.items()}
+
+    # Stability Check (element-wise, same rule as compute_stcr)
+    n_clamped = np.zeros(n, dtype=bool)
+    warnings = []
+    if npk_baseline:
+        base_n = _column(npk_baseline.get("N"), n)
+        n_clamped = (final["N"] > 3.0 * base_n) & (base_n > 10)
+        final["N"] = np.where(n_clamped, base_n * 1.5, final["N"])
+        if n_clamped.any():
+            warnings.append(
+                f"STCR yield target too high for soil in {int(n_clamped.sum())} rows. N clamped to safe limit."
+            )
+
+    return {"raw": raw, "final": final, "n_clamped": n_clamped, "warnings": warnings}
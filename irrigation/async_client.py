@@ -0,0 +1,221 @@
+"""
+async_client.py — Concurrent Open-Meteo Client
+----------------------------------------------
+asyncio / aiohttp client used to fill the local weather stores before an
+irrigation plan runs, instead of three sequential blocking requests.
+
+  • One pooled aiohttp session, living on a background event loop so that
+    synchronous callers (Streamlit, engine, batch planner) share it.
+  • Identical in-flight URLs are coalesced into one request.
+  • A semaphore bounds the number of concurrent requests.
+  • Timeouts, connection errors, HTTP 429 and 5xx are retried with
+    exponential backoff and jitter.
+
+prefetch_plan_inputs() fetches, for every grid cell of the requested
+locations and concurrently, whatever is missing from
+  - the weather cache  (current hourly weather, 4-day forecast drivers),
+  - the history store  (missing archive date runs, elevation),
+after which the normal synchronous code paths find everything locally.
+
+For tests and offline runs, point the OPEN_METEO_*_URL variables at the
+stand-in server in irrigation/fixture_server.py.
+"""
+
+import asyncio
+import atexit
+import random
+import threading
+from datetime import datetime, timedelta
+
+import aiohttp
+
+from irrigation.weather import weather_url, parse_weather
+from irrigation.forecast import future_weather_url, parse_future_weather
+from irrigation.weather_cache import get_weather_cache, grid_cell
+from irrigation.history_store import (
+    archive_url, parse_archive, elevation_url, parse_elevation, get_history_store
+)
+
+DEFAULT_CONCURRENCY = 8
+DEFAULT_RETRIES = 3
+DEFAULT_BACKOFF_SECONDS = 0.5
+DEFAULT_TIMEOUT_SECONDS = 20
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+# Points per elevation request (keeps URLs short)
+ELEVATION_BATCH = 100
+
+
+class _RetryableStatus(Exception):
+    pass
+
+
+class AsyncWeatherClient:
+    """Pooled, coalescing, bounded, retrying JSON GET client."""
+
+    def __init__(self, max_concurrency=DEFAULT_CONCURRENCY, retries=DEFAULT_RETRIES,
+                 backoff_seconds=DEFAULT_BACKOFF_SECONDS, timeout_seconds=DEFAULT_TIMEOUT_SECONDS):
+        self.max_concurrency = max_concurrency
+        self.retries = retries
+        self.backoff_seconds = backoff_seconds
+        self.timeout_seconds = timeout_seconds
+        self.stats = {"requests": 0, "coalesced": 0, "retries": 0, "errors": 0}
+
+        self._session = None
+        self._semaphore = None
+        self._inflight = {}
+
+    async def _get_session(self):
+        # Created lazily so the session belongs to the loop that uses it
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self.max_concurrency, ttl_dns_cache=300),
+                timeout=aiohttp.ClientTimeout(total=self.timeout_seconds),
+            )
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._session
+
+    async def get_json(self, url):
+        """
+        Decoded JSON body of GET `url`. Concurrent calls for the same URL
+        share one request. API error payloads (HTTP 4xx) are returned as-is
+        for the caller's parser; transport failures raise RuntimeError.
+        """
+        task = self._inflight.get(url)
+        if task is not None:
+            self.stats["coalesced"] += 1
+        else:
+            task = asyncio.ensure_future(self._fetch(url))
+            self._inflight[url] = task
+            task.add_done_callback(lambda _t, url=url: self._inflight.pop(url, None))
+        # shield: one cancelled waiter must not cancel the shared request
+        return await asyncio.shield(task)
+
+    async def _fetch(self, url):
+        session = await self._get_session()
+        for attempt in range(self.retries + 1):
+            try:
+                async with self._semaphore:
+                    self.stats["requests"] += 1
+                    async with session.get(url) as resp:
+                        if resp.status in RETRY_STATUS:
+                            raise _RetryableStatus(f"HTTP {resp.status}")
+                        return await resp.json(content_type=None)
+            except (aiohttp.ClientError, asyncio.TimeoutError, _RetryableStatus) as e:
+                if attempt == self.retries:
+                    self.stats["errors"] += 1
+                    raise RuntimeError(f"Failed to fetch {url}: {e}")
+                self.stats["retries"] += 1
+                delay = self.backoff_seconds * (2 ** attempt)
+                await asyncio.sleep(delay * (0.5 + random.random() / 2))
+
+    async def close(self):
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+
+
+# ------------------------------------------------------------
+# SHARED CLIENT ON A BACKGROUND LOOP
+# ------------------------------------------------------------
+_LOOP = None
+_CLIENT = None
+_LOCK = threading.Lock()
+
+
+def _background_loop():
+    global _LOOP
+    if _LOOP is None:
+        with _LOCK:
+            if _LOOP is None:
+                loop = asyncio.new_event_loop()
+                threading.Thread(target=loop.run_forever, name="weather-io", daemon=True).start()
+                _LOOP = loop
+                atexit.register(_shutdown)
+    return _LOOP
+
+
+def _shutdown():
+    """Closes the shared session and stops the background loop at exit."""
+    if _CLIENT is not None:
+        try:
+            run_sync(_CLIENT.close(), timeout=5)
+        except Exception:
+            pass
+    _LOOP.call_soon_threadsafe(_LOOP.stop)
+
+
+def get_async_client():
+    """Process-wide client (its session lives on the background loop)."""
+    global _CLIENT
+    if _CLIENT is None:
+        with _LOCK:
+            if _CLIENT is None:
+                _CLIENT = AsyncWeatherClient()
+    return _CLIENT
+
+
+def run_sync(coro, timeout=None):
+    """Runs a coroutine on the background loop and waits for its result."""
+    return asyncio.run_coroutine_threadsafe(coro, _background_loop()).result(timeout)
+
+
+# ------------------------------------------------------------
+# PLAN INPUT PREFETCH
+# ------------------------------------------------------------
+async def prefetch_plan_inputs_async(locations, client=None, cache=None, store=None,
+                                     days=60, with_forecast=True):
+    """
+    Concurrently fills the weather cache and history store for every grid
+    cell of `locations`. Individual failures are reported, not raised: the
+    synchronous fetchers will retry whatever is still missing.
+
+    Returns:
+        dict: requests (jobs started), errors (failed jobs)
+    """
+    client = client or get_async_client()
+    cache = cache or get_weather_cache()
+    store = store or get_history_store()
+
+    end = datetime.utcnow().date()
+    start = end - timedelta(days=days)
+
+    async def cache_job(kind, lat, lon, url, parse):
+        cache.put(cache.key(kind, lat, lon), parse(await client.get_json(url)))
+
+    async def history_job(lat, lon, first, last):
+        raw = await client.get_json(archive_url(lat, lon, first, last))
+        store.merge_hourly(lat, lon, parse_archive(raw))
+
+    async def elevation_job(cells):
+        raw = await client.get_json(elevation_url([c[0] for c in cells], [c[1] for c in cells]))
+        store.store_elevations(cells, parse_elevation(raw))
+
+    jobs = []
+    for lat, lon in dict.fromkeys(grid_cell(lat, lon, cache.grid_deg) for lat, lon in locations):
+        if not cache.contains(cache.key("hourly", lat, lon)):
+            jobs.append(cache_job("hourly", lat, lon, weather_url(lat, lon), parse_weather))
+        if with_forecast and not cache.contains(cache.key("forecast", lat, lon)):
+            jobs.append(cache_job("forecast", lat, lon, future_weather_url(lat, lon), parse_future_weather))
+
+    if with_forecast:
+        for lat, lon in dict.fromkeys(grid_cell(lat, lon, store.grid_deg) for lat, lon in locations):
+            for first, last in store.pending_ranges(lat, lon, start, end):
+                jobs.append(history_job(lat, lon, first, last))
+
+        todo = store.missing_elevations(locations)
+        for i in range(0, len(todo), ELEVATION_BATCH):
+            jobs.append(elevation_job(todo[i:i + ELEVATION_BATCH]))
+
+    results = await asyncio.gather(*jobs, return_exceptions=True)
+    errors = [r for r in results if isinstance(r, Exception)]
+    for e in errors[:3]:
+        print(f"[Prefetch] {e}")
+    return {"requests": len(jobs), "errors": len(errors)}
+
+
+def prefetch_plan_inputs(locations, days=60, with_forecast=True, timeout=None):
+    """Synchronous wrapper around prefetch_plan_inputs_async using the shared client."""
+    return run_sync(
+        prefetch_plan_inputs_async(locations, days=days, with_forecast=with_forecast),
+        timeout=timeout,
+    )
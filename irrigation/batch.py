@@ -0,0 +1,228 @@
+"""
+batch.py — Multi-Field Batch Irrigation Planner
+-----------------------------------------------
+Plans irrigation for many registered plots at once.
+
+Fields are grouped by weather grid cell (lat/lon rounded to `grid_deg`).
+Whatever weather is missing locally is fetched for all cells concurrently
+up front, weather is read once per cell, the 3-day ET0 forecast is one
+batched call over all cells (pooled regional model), and the FAO-56 water
+balance runs for every field of a cell in one vectorized pass
+(fields × days). Total work therefore scales with the number of distinct
+grid cells, not the number of fields.
+
+Returns a columnar pandas DataFrame, one row per field.
+"""
+
+import numpy as np
+import pandas as pd
+
+from irrigation.weather import fetch_weather
+from irrigation.weather_cache import DEFAULT_GRID_DEG, grid_cell
+from irrigation.forecast import predict_et0_batch
+from irrigation.async_client import prefetch_plan_inputs
+from irrigation.engine import field_parameters, aggregate_daily_weather
+from irrigation.water_balance import effective_rain_usda, deficit_balance, forecast_rollout
+from irrigation.helpers import pump_flow, area_conversion
+
+FIELD_COLUMNS = [
+    "lat", "lon", "crop", "stage", "soil", "area_value", "area_unit",
+    "pump_hp", "pump_efficiency", "application_efficiency",
+]
+
+RESULT_COLUMNS = [
+    "field_id", "cell_lat", "cell_lon", "crop", "stage", "soil",
+    "kc", "root_depth_m", "taw_mm", "raw_mm", "area_m2",
+    "initial_deficit_mm", "current_deficit_mm", "is_stressed",
+    "net_irrigation_mm", "gross_irrigation_mm", "water_volume_L", "pump_hours",
+    "forecast_deficit_mm", "predicted_trigger_date", "error",
+]
+
+
+def _is_missing(value):
+    """None, or NaN as produced by an empty DataFrame cell."""
+    return value is None or (isinstance(value, float) and np.isnan(value))
+
+
+def irrigation_requirement(final_deficit_mm, raw_mm, application_efficiency, area_m2, pump_hp, pump_efficiency):
+    """
+    Vectorized version of the hydraulic output step of get_irrigation_plan:
+    refill to field capacity when depletion has reached RAW.
+
+    Returns:
+        dict of arrays: net_irrigation_mm, gross_irrigation_mm, water_volume_L, pump_hours
+    """
+    deficit = np.asarray(final_deficit_mm, dtype=float)
+    stressed = deficit >= np.asarray(raw_mm, dtype=float)
+
+    net = np.where(stressed, deficit, 0.0)
+    gross = net / np.asarray(application_efficiency, dtype=float)
+    liters = (gross / 1000.0) * np.asarray(area_m2, dtype=float) * 1000.0
+
+    flow = np.vectorize(lambda hp: pump_flow.get(hp, 0), otypes=[float])(pump_hp)
+    effective_flow = flow * np.asarray(pump_efficiency, dtype=float)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        hours = np.where(effective_flow > 0, liters / effective_flow, 0.0)
+
+    return {
+        "net_irrigation_mm": net,
+        "gross_irrigation_mm": gross,
+        "water_volume_L": liters,
+        "pump_hours": hours,
+    }
+
+
+def _plan_cell(cell, fields, daily, forecast):
+    """Water balance for all (already validated) fields of one grid cell."""
+    n = len(fields)
+    kc = np.array([f["params"]["kc"] for f in fields])
+    taw = np.array([f["params"]["taw_mm"] for f in fields])
+    raw = np.array([f["params"]["raw_mm"] for f in fields])
+
+    et0 = daily["et0"].to_numpy(dtype=float)
+    eff = effective_rain_usda(daily["rain"].to_numpy(dtype=float))
+    etc = kc[:, None] * et0[None, :]
+    eff_2d = np.broadcast_to(eff, etc.shape)
+
+    # Initial deficit: user input, else ETc - Peff over the first 3 days
+    auto = etc[:, :3].sum(axis=1) - eff[:3].sum()
+    user = np.array([np.nan if f["initial_deficit_mm"] is None else f["initial_deficit_mm"] for f in fields], dtype=float)
+    d0 = np.clip(np.where(np.isnan(user), auto, user), 0.0, taw)
+
+    _, deficit_end = deficit_balance(etc, eff_2d, d0)
+    current = deficit_end[:, -1] if deficit_end.shape[1] else d0
+
+    out = irrigation_requirement(
+        current, raw,
+        [f["application_efficiency"] for f in fields],
+        [f["area_m2"] for f in fields],
+        [f["pump_hp"] for f in fields],
+        [f["pump_efficiency"] for f in fields],
+    )
+
+    forecast_deficit = np.full(n, np.nan)
+    trigger = [None] * n
+    if forecast is not None and len(forecast):
+        rollout = forecast_rollout(
+            forecast["et0_pred"].to_numpy(dtype=float),
+            forecast["precipitation"].to_numpy(dtype=float),
+            kc, current, raw
+        )
+        forecast_deficit = rollout["deficit"][:, -1]
+        dates = forecast["date"].astype(str).to_numpy()
+        trigger = [dates[d] if d >= 0 else None for d in rollout["trigger_day"]]
+
+    rows = []
+    for i, f in enumerate(fields):
+        rows.append({
+            "field_id": f["field_id"],
+            "cell_lat": cell[0], "cell_lon": cell[1],
+            "crop": f["crop"], "stage": f["stage"], "soil": f["soil"],
+            "kc": kc[i],
+            "root_depth_m": f["params"]["zr_current"],
+            "taw_mm": round(taw[i], 2),
+            "raw_mm": round(raw[i], 2),
+            "area_m2": f["area_m2"],
+            "initial_deficit_mm": round(d0[i], 2),
+            "current_deficit_mm": round(current[i], 2),
+            "is_stressed": bool(current[i] >= raw[i]),
+            "net_irrigation_mm": round(out["net_irrigation_mm"][i], 2),
+            "gross_irrigation_mm": round(out["gross_irrigation_mm"][i], 2),
+            "water_volume_L": round(out["water_volume_L"][i], 0),
+            "pump_hours": round(out["pump_hours"][i], 2),
+            "forecast_deficit_mm": round(forecast_deficit[i], 2),
+            "predicted_trigger_date": trigger[i],
+            "error": None,
+        })
+    return rows
+
+
+def plan_fields(fields, grid_deg=DEFAULT_GRID_DEG, with_forecast=True,
+                weather_fetcher=fetch_weather, forecaster=predict_et0_batch, prefetch=True):
+    """
+    Batch irrigation planner.
+
+    Args:
+        fields (DataFrame | list[dict]): One row per plot with the
+            get_irrigation_plan arguments (lat, lon, crop, stage, soil,
+            area_value, area_unit, pump_hp, pump_efficiency,
+            application_efficiency) plus optional initial_deficit_mm and field_id.
+        grid_deg (float): Weather grid size in degrees.
+        with_forecast (bool): Also roll the 3-day ET0 forecast forward per cell.
+        weather_fetcher (callable): (lat, lon) -> hourly frame (time, et0, rain).
+        forecaster (callable): [(lat, lon), ...] -> [(forecast_df, metrics), ...].
+        prefetch (bool): Fill the weather stores for all cells concurrently
+            first (irrigation/async_client.py); disable with custom fetchers.
+
+    Returns:
+        pandas.DataFrame: RESULT_COLUMNS, in input order. Fields that fail
+        validation, or whose cell has no weather, carry a message in 'error'.
+    """
+    records = fields.to_dict("records") if isinstance(fields, pd.DataFrame) else list(fields)
+
+    results = [None] * len(records)
+    cells = {}
+
+    # 1. Validate every field and group by grid cell
+    for i, rec in enumerate(records):
+        field_id = rec.get("field_id")
+        if _is_missing(field_id):
+            field_id = i
+        try:
+            missing = [c for c in FIELD_COLUMNS if _is_missing(rec.get(c))]
+            if missing:
+                raise ValueError(f"Missing field inputs: {', '.join(missing)}")
+            if rec["pump_hp"] not in pump_flow:
+                raise ValueError(f"Unknown pump rating '{rec['pump_hp']}'.")
+            if rec["area_unit"] not in area_conversion:
+                raise ValueError(f"Unknown area unit '{rec['area_unit']}'.")
+            params = field_parameters(
+                rec["crop"], rec["stage"], rec["soil"],
+                rec["pump_efficiency"], rec["application_efficiency"]
+            )
+            init = rec.get("initial_deficit_mm")
+            init = None if _is_missing(init) else float(init)
+            field = {
+                **{c: rec[c] for c in FIELD_COLUMNS},
+                "field_id": field_id,
+                "params": params,
+                "initial_deficit_mm": init,
+                "area_m2": rec["area_value"] * area_conversion[rec["area_unit"]],
+            }
+        except Exception as e:
+            results[i] = {**{c: None for c in RESULT_COLUMNS}, "field_id": field_id, "error": str(e)}
+            continue
+
+        cell = grid_cell(rec["lat"], rec["lon"], grid_deg)
+        cells.setdefault(cell, []).append((i, field))
+
+    # 2. Concurrent fetch of everything missing locally, then one batched forecast
+    if prefetch and cells:
+        try:
+            prefetch_plan_inputs(list(cells), with_forecast=with_forecast)
+        except Exception as e:
+            print(f"[Batch] Weather prefetch failed: {e}")
+
+    forecasts = {}
+    if with_forecast and cells:
+        try:
+            forecasts = {cell: f_df for cell, (f_df, _) in zip(cells, forecaster(list(cells)))}
+        except Exception as e:
+            print(f"[Batch] Forecast failed: {e}")
+
+    # 3. One weather fetch per cell, one balance per cell
+    for cell, members in cells.items():
+        idx = [i for i, _ in members]
+        group = [f for _, f in members]
+        try:
+            daily = aggregate_daily_weather(weather_fetcher(*cell))
+        except Exception as e:
+            for i, f in members:
+                results[i] = {**{c: None for c in RESULT_COLUMNS}, "field_id": f["field_id"],
+                              "cell_lat": cell[0], "cell_lon": cell[1], "error": str(e)}
+            continue
+
+        for i, row in zip(idx, _plan_cell(cell, group, daily, forecasts.get(cell))):
+            results[i] = row
+
+    return pd.DataFrame(results, columns=RESULT_COLUMNS)
@@ -4,52 +4,39 @@ from datetime import datetime
 
 from irrigation.weather import fetch_weather
 from irrigation.forecast import predict_et0_next_3_days
+from irrigation.async_client import prefetch_plan_inputs
+from irrigation.water_balance import effective_rain_usda, deficit_balance, forecast_rollout
 from irrigation.helpers import (
     crop_params, 
     soil_params, 
     pump_flow, 
     area_conversion,
+    root_depth_factors,
     METADATA
 )
 
 def calculate_effective_rain_usda(rain_mm):
-    """
-    Research Grade: USDA Soil Conservation Service Method.
-    P_eff = P_tot * (125 - 0.2 * P_tot) / 125  for P_tot < 250mm
-    P_eff = 125 + 0.1 * P_tot                  for P_tot > 250mm
-    """
-    if rain_mm <= 0:
-        return 0.0
-    elif rain_mm < 250:
-        return rain_mm * (125 - 0.2 * rain_mm) / 125.0
-    else:
-        return 125.0 + 0.1 * rain_mm
+    """Scalar USDA-SCS effective rain (see water_balance.effective_rain_usda)."""
+    return float(effective_rain_usda(rain_mm))
 
-def get_irrigation_plan(
-    lat, 
-    lon, 
-    crop, 
-    stage, 
-    soil, 
-    area_value, 
-    area_unit, 
-    pump_hp, 
-    pump_efficiency, 
-    application_efficiency,
-    initial_deficit_mm=None  # [NEW] Optional Input
-):
-    """
-    FAO-56 COMPLIANT IRRIGATION ENGINE (Research Grade)
-    ---------------------------------------------------
-    Performs daily soil water balance accounting (Dual Kc methodology simplified).
-    Updated to handle Initial Soil Water Deficit initialization.
+# Root Depth Growth Model (Sigmoidal approximation for stages)
+STAGE_ROOT_FACTORS = root_depth_factors
+
+def field_parameters(crop, stage, soil, pump_efficiency, application_efficiency):
     """
+    Validates inputs and derives the crop/soil physics for one field.
 
+    Returns:
+        dict: kc, zr_current, p_fraction, fc_vol, pwp_vol, taw_mm, raw_mm
+    """
     # ======================================================
     # 1. SCIENTIFIC INPUT VALIDATION
     # ======================================================
     if crop not in crop_params:
         raise ValueError(f"Crop '{crop}' parameters missing in physics DB.")
+
+    if stage not in crop_params[crop]["kc"]:
+        raise ValueError(f"Stage '{stage}' missing for crop '{crop}' (expected one of {', '.join(crop_params[crop]['kc'])}).")
     
     if soil not in soil_params:
         raise ValueError(f"Soil '{soil}' hydraulic properties missing.")
@@ -68,13 +55,8 @@ def get_irrigation_plan(
     max_root_depth = crop_params[crop]["Zr_max"]
     p_fraction = crop_params[crop]["p"]
     
-    # Root Depth Growth Model (Sigmoidal approximation for stages)
-    stage_factors = {
-        "initial": 0.3,
-        "mid": 0.8, 
-        "late": 1.0
-    }
-    current_stage_factor = stage_factors.get(stage, 0.7)
+    # Root Depth Growth Model
+    current_stage_factor = STAGE_ROOT_FACTORS.get(stage, 0.7)
     zr_current = max_root_depth * current_stage_factor
 
     # Soil Params (Volumetric)
@@ -84,15 +66,24 @@ def get_irrigation_plan(
     # RAW Calculation (Readily Available Water)
     # TAW = 1000 * (FC - PWP) * Zr
     taw_mm = 1000.0 * (fc_vol - pwp_vol) * zr_current 
-    raw_mm = taw_mm * p_fraction                      
+    raw_mm = taw_mm * p_fraction
 
-    # ======================================================
-    # 3. WEATHER DATA INGESTION
-    # ======================================================
-    df = fetch_weather(lat, lon)
+    return {
+        "kc": kc_value,
+        "zr_current": zr_current,
+        "p_fraction": p_fraction,
+        "fc_vol": fc_vol,
+        "pwp_vol": pwp_vol,
+        "taw_mm": taw_mm,
+        "raw_mm": raw_mm,
+    }
+
+def aggregate_daily_weather(df):
+    """Hourly (time, et0, rain) frame -> daily totals with a physics sanity check."""
     if df is None or df.empty:
         raise RuntimeError("Weather data acquisition failed.")
 
+    df = df.copy()
     df["date"] = pd.to_datetime(df["time"]).dt.date
     
     # Aggregation: Hourly -> Daily
@@ -105,14 +96,75 @@ def get_irrigation_plan(
     if daily["et0"].mean() > 25:
         raise ValueError("ET0 input detected as excessively high (>25mm/day). Check source units.")
 
+    return daily
+
+def forecast_log_records(f_df, rollout, row=0):
+    """
+    Forecast table of one field of a forecast_rollout() as a list of dicts
+    (date, et0_pred, etc_pred, rain_pred, deficit_pred, stress_flag).
+    """
+    log = pd.DataFrame({
+        "date": f_df["date"].astype(str).to_numpy(),
+        "et0_pred": f_df["et0_pred"].to_numpy(dtype=float).round(2),
+        "etc_pred": rollout["etc"][row].round(2),
+        "rain_pred": f_df["precipitation"].to_numpy(dtype=float).round(2),
+        "deficit_pred": rollout["deficit"][row].round(2),
+        "stress_flag": rollout["stress"][row],
+    })
+    return log.to_dict("records")
+
+def get_irrigation_plan(
+    lat, 
+    lon, 
+    crop, 
+    stage, 
+    soil, 
+    area_value, 
+    area_unit, 
+    pump_hp, 
+    pump_efficiency, 
+    application_efficiency,
+    initial_deficit_mm=None  # [NEW] Optional Input
+):
+    """
+    FAO-56 COMPLIANT IRRIGATION ENGINE (Research Grade)
+    ---------------------------------------------------
+    Performs daily soil water balance accounting (Dual Kc methodology simplified).
+    Updated to handle Initial Soil Water Deficit initialization.
+    """
+
+    # ======================================================
+    # 1-2. VALIDATION & PARAMETER INITIALIZATION
+    # ======================================================
+    params = field_parameters(crop, stage, soil, pump_efficiency, application_efficiency)
+    kc_value = params["kc"]
+    zr_current = params["zr_current"]
+    p_fraction = params["p_fraction"]
+    fc_vol = params["fc_vol"]
+    pwp_vol = params["pwp_vol"]
+    taw_mm = params["taw_mm"]
+    raw_mm = params["raw_mm"]
+
+    # ======================================================
+    # 3. WEATHER DATA INGESTION
+    # ======================================================
+    # Current weather, archive history and forecast drivers are fetched
+    # concurrently into the local stores; the reads below are then local.
+    try:
+        prefetch_plan_inputs([(lat, lon)])
+    except Exception as e:
+        print(f"[Engine] Weather prefetch failed: {e}")
+
+    daily = aggregate_daily_weather(fetch_weather(lat, lon))
+
     # ======================================================
     # 4. SOIL WATER BALANCE SIMULATION
     # ======================================================
     
     daily["ETc"] = daily["et0"] * kc_value
     
-    # USDA SCS Method for Effective Rainfall
-    daily["eff_rain"] = daily["rain"].apply(calculate_effective_rain_usda)
+    # USDA SCS Method for Effective Rainfall (vectorized)
+    daily["eff_rain"] = effective_rain_usda(daily["rain"].to_numpy())
 
     # [UPGRADE] INITIAL DEFICIT SYSTEM ---------------------
     # Logic: Determines starting soil moisture based on input or history.
@@ -141,35 +193,23 @@ def get_irrigation_plan(
     start_deficit_val = max(0.0, start_deficit_val)
     start_deficit_val = min(start_deficit_val, taw_mm)
 
-    current_deficit = start_deficit_val
     # ------------------------------------------------------
-    
-    daily["deficit_start"] = 0.0
-    daily["deficit_end"] = 0.0
-    daily["irrigation_needed"] = False
-    
+
     # [Image of soil water balance diagram]
 
-    for i in daily.index:
-        et_out = daily.at[i, "ETc"]
-        rain_in = daily.at[i, "eff_rain"]
-        
-        daily.at[i, "deficit_start"] = current_deficit
-        
-        # Water Balance Equation: Dr,i = Dr,i-1 - (P - RO) - I - CR + ETc + DP
-        # Simplified: New = Old + Out - In
-        new_deficit = current_deficit + et_out - rain_in
-        
-        # Boundary Condition: Deficit cannot be negative (Drainage/Runoff occurs)
-        if new_deficit < 0:
-            new_deficit = 0.0
-            
-        daily.at[i, "deficit_end"] = new_deficit
-        current_deficit = new_deficit
-        
-        # Stress Trigger
-        if current_deficit >= raw_mm:
-            daily.at[i, "irrigation_needed"] = True
+    # Water Balance Equation: Dr,i = Dr,i-1 - (P - RO) - I - CR + ETc + DP
+    # Simplified: New = Old + Out - In, clipped at 0 (Drainage/Runoff occurs)
+    # Solved for all days at once (see irrigation/water_balance.py)
+    deficit_start, deficit_end = deficit_balance(
+        daily["ETc"].to_numpy(), daily["eff_rain"].to_numpy(), start_deficit_val
+    )
+    daily["deficit_start"] = deficit_start
+    daily["deficit_end"] = deficit_end
+
+    # Stress Trigger
+    daily["irrigation_needed"] = deficit_end >= raw_mm
+
+    current_deficit = float(deficit_end[-1]) if len(deficit_end) else start_deficit_val
 
     # ======================================================
     # 5. FORECASTING & IRRIGATION SCHEDULING
@@ -183,32 +223,18 @@ def get_irrigation_plan(
         f_df, metrics = predict_et0_next_3_days(lat, lon)
         forecast_metrics = metrics
         
-        if f_df is not None:
-            future_deficit = current_deficit
-            
-            for _, row in f_df.iterrows():
-                et0_pred = row["et0_pred"]
-                etc_pred = max(0.0, et0_pred * kc_value)
-
-                # USDA Method for Forecast Rain
-                rain_pred = calculate_effective_rain_usda(row["precipitation"])
-                
-                future_deficit = future_deficit + etc_pred - rain_pred
-                if future_deficit < 0: future_deficit = 0
-                
-                is_stress = future_deficit >= raw_mm
-                
-                forecast_log.append({
-                    "date": str(row["date"]),
-                    "et0_pred": round(et0_pred, 2),
-                    "etc_pred": round(etc_pred, 2),
-                    "rain_pred": round(row["precipitation"], 2),
-                    "deficit_pred": round(future_deficit, 2),
-                    "stress_flag": is_stress
-                })
-                
-                if is_stress and predicted_trigger_date is None:
-                    predicted_trigger_date = str(row["date"])
+        if f_df is not None and len(f_df):
+            # Whole forecast window in one array pass (irrigation/water_balance.py)
+            rollout = forecast_rollout(
+                f_df["et0_pred"].to_numpy(dtype=float),
+                f_df["precipitation"].to_numpy(dtype=float),
+                kc_value, current_deficit, raw_mm
+            )
+            forecast_log = forecast_log_records(f_df, rollout)
+
+            trigger_day = rollout["trigger_day"][0]
+            if trigger_day >= 0:
+                predicted_trigger_date = forecast_log[trigger_day]["date"]
                     
     except Exception as e:
         print(f"[Engine] Forecast sub-system error: {e}")
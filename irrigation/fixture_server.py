@@ -0,0 +1,147 @@
+"""
+fixture_server.py — Local Stand-in for the Open-Meteo API
+---------------------------------------------------------
+Serves deterministic, physically plausible synthetic responses for the
+three Open-Meteo endpoints the irrigation module uses:
+
+  /v1/forecast   hourly et0 / precipitation / drivers (forecast_days, default 7)
+  /v1/archive    hourly training variables for start_date..end_date
+  /v1/elevation  elevation for comma-separated latitude / longitude lists
+
+Values depend only on (lat, lon, timestamp), so repeated runs give the same
+plans. `flaky=N` answers the first N requests of every URL with HTTP 503 to
+exercise retry/backoff.
+
+Usage:
+  python -m irrigation.fixture_server --port 8765
+  (then export the printed OPEN_METEO_*_URL variables)
+"""
+
+import argparse
+import json
+import threading
+from collections import Counter
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlparse
+
+import numpy as np
+import pandas as pd
+
+
+def _synthetic_hourly(lat, lon, times):
+    hour = times.hour.to_numpy()
+    doy = times.dayofyear.to_numpy()
+
+    temp = 18.0 + 0.3 * abs(lat) + 8.0 * np.sin((hour - 9) / 24.0 * 2 * np.pi) + 2.0 * np.sin(doy / 7.0)
+    rad = np.clip(850.0 * np.sin((hour - 6) / 12.0 * np.pi), 0.0, None) * (1.0 + 0.1 * np.cos(doy / 5.0))
+    rh = 60.0 + 20.0 * np.cos(doy / 3.0 + lon)
+    wind = 3.0 + np.sin(doy / 2.0 + lat)
+    et0 = 0.0003 * rad * (temp / 25.0) * (1.0 + wind / 10.0) * (1.0 - rh / 200.0)
+    rain = np.where(np.cos(doy * 1.7 + lat + lon) > 0.85, 1.5, 0.0) * (hour % 6 == 0)
+
+    return {
+        "time": [t.strftime("%Y-%m-%dT%H:%M") for t in times],
+        "temperature_2m": np.round(temp, 2).tolist(),
+        "relative_humidity_2m": np.round(rh, 1).tolist(),
+        "windspeed_10m": np.round(wind, 2).tolist(),
+        "shortwave_radiation": np.round(rad, 1).tolist(),
+        "et0_fao_evapotranspiration": np.round(et0, 4).tolist(),
+        "precipitation": rain.tolist(),
+    }
+
+
+def fixture_response(path, query):
+    """JSON body for one request path + query dict."""
+    if path.endswith("/elevation"):
+        lats = [float(v) for v in query["latitude"].split(",")]
+        lons = [float(v) for v in query["longitude"].split(",")]
+        return {"elevation": [round(200.0 + 15.0 * abs(a) + 3.0 * abs(b), 1) for a, b in zip(lats, lons)]}
+
+    lat, lon = float(query["latitude"]), float(query["longitude"])
+    if path.endswith("/archive"):
+        start = pd.Timestamp(query["start_date"])
+        end = pd.Timestamp(query["end_date"]) + pd.Timedelta(days=1)
+        times = pd.date_range(start, end, freq="h", inclusive="left")
+    else:
+        start = pd.Timestamp(datetime.utcnow().date())
+        times = pd.date_range(start, periods=24 * int(query.get("forecast_days", 7)), freq="h")
+
+    hourly = _synthetic_hourly(lat, lon, times)
+    wanted = query.get("hourly", "").split(",")
+    return {
+        "latitude": lat,
+        "longitude": lon,
+        "hourly": {k: v for k, v in hourly.items() if k == "time" or k in wanted},
+    }
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        server = self.server
+        with server.lock:
+            server.hits[self.path] += 1
+            n = server.hits[self.path]
+
+        if n <= server.flaky:
+            self.send_response(503)
+            self.end_headers()
+            return
+
+        parsed = urlparse(self.path)
+        try:
+            body, status = fixture_response(parsed.path, dict(parse_qsl(parsed.query))), 200
+        except (KeyError, ValueError) as e:
+            body, status = {"error": True, "reason": f"Invalid request: {e}"}, 400
+
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+def start_fixture_server(host="127.0.0.1", port=0, flaky=0):
+    """
+    Starts the stand-in server on a daemon thread.
+
+    Returns:
+        tuple: (server, base_url). server.hits counts requests per URL;
+               call server.shutdown() to stop.
+    """
+    server = ThreadingHTTPServer((host, port), _Handler)
+    server.hits = Counter()
+    server.lock = threading.Lock()
+    server.flaky = flaky
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}"
+
+
+def fixture_env(base_url):
+    """Environment variables pointing the irrigation fetchers at the server."""
+    return {
+        "OPEN_METEO_FORECAST_URL": f"{base_url}/v1/forecast",
+        "OPEN_METEO_ARCHIVE_URL": f"{base_url}/v1/archive",
+        "OPEN_METEO_ELEVATION_URL": f"{base_url}/v1/elevation",
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local stand-in for the Open-Meteo API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--flaky", type=int, default=0, help="503 the first N requests of each URL")
+    args = parser.parse_args()
+
+    server, base_url = start_fixture_server(args.host, args.port, args.flaky)
+    for key, value in fixture_env(base_url).items():
+        print(f"export {key}={value}")
+    print(f"✅ Fixture server on {base_url} (Ctrl+C to stop)")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
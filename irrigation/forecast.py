@@ -7,70 +7,43 @@ PHYSICS UPDATE:
   - ML Model now predicts atmospheric demand solely based on weather.
   - [PATCH 5] Added RMSE + MAE Validation for Research Compliance.
   - [PATCH 6] Added Caching for Performance Optimization.
+  - History fetches use the persistent weather cache instead of st.cache_data.
+  - Training features come from the incremental daily history store.
+  - Trained models are persisted by the ET0 model registry (no Streamlit dependency).
+  - One pooled regional model (lat/lon/elevation features) serves all
+    locations; forecasts for many locations are a single batched predict.
+  - The pooled model retrains on a weekly cadence (or when a cell joins),
+    not on every daily history update.
 """
 
+import hashlib
+
 import requests
 import pandas as pd
 import numpy as np
-import streamlit as st
-from datetime import datetime, timedelta
 from xgboost import XGBRegressor
 from sklearn.model_selection import train_test_split
 from sklearn.metrics import mean_squared_error, mean_absolute_error
 
-# ============================================================
-# 1) HISTORICAL WEATHER FETCH (Training Data)
-# ============================================================
-
-# Cache data fetch to avoid API spamming on re-runs
-@st.cache_data(ttl=3600) 
-def fetch_training_data(lat, lon, days=60):
-    """Fetches historical ET0 for model training (Open-Meteo Archive)."""
-    
-    end_date = datetime.utcnow().date()
-    start_date = end_date - timedelta(days=days)
-
-    url = (
-        f"https://archive-api.open-meteo.com/v1/archive?"
-        f"latitude={lat}&longitude={lon}"
-        f"&start_date={start_date}&end_date={end_date}"
-        "&hourly=temperature_2m,relative_humidity_2m,windspeed_10m,"
-        "shortwave_radiation,et0_fao_evapotranspiration,precipitation"
-        "&timezone=auto"
-    )
-
-    try:
-        raw = requests.get(url, timeout=20).json()
-        if "error" in raw:
-            raise RuntimeError(f"API Error: {raw.get('reason')}")
-    except Exception as e:
-        print(f"[Forecast] History fetch failed: {e}")
-        return None
-
-    df = pd.DataFrame(raw["hourly"])
-    df["time"] = pd.to_datetime(df["time"])
-    df["date"] = df["time"].dt.date
-    
-    # Validation: Remove partial days or NaNs
-    df = df.dropna()
-    return df
+from irrigation.weather import FORECAST_URL
+from irrigation.weather_cache import get_weather_cache, grid_cell
+from irrigation.history_store import DAILY_AGGREGATION, get_history_store
+from irrigation.model_registry import get_et0_registry
 
 # ============================================================
-# 2) FEATURE ENGINEERING (Daily Aggregation)
+# 1) FEATURE ENGINEERING (Daily Aggregation)
 # ============================================================
 
 def prepare_features(hourly_df):
     """Aggregates hourly physics data into daily training features."""
     
-    daily = hourly_df.groupby("date", as_index=False).agg({
-        "temperature_2m": "mean",
-        "relative_humidity_2m": "mean",
-        "windspeed_10m": "mean",
-        "shortwave_radiation": "sum",
-        "et0_fao_evapotranspiration": "sum", # TARGET VARIABLE
-        "precipitation": "sum"
-    })
+    daily = hourly_df.groupby("date", as_index=False).agg(DAILY_AGGREGATION)
+    return finalize_features(daily)
+
+def finalize_features(daily):
+    """Adds day-of-year and drops physically invalid days (daily rows in, features out)."""
 
+    daily = daily.drop(columns=["n_hours"], errors="ignore").copy()
     daily["doy"] = pd.to_datetime(daily["date"]).dt.dayofyear
     
     # Physics Sanity Check: ET0 cannot be negative
@@ -79,20 +52,23 @@ def prepare_features(hourly_df):
     return daily.sort_values("date")
 
 # ============================================================
-# 3) ML MODEL (ET0 PREDICTOR)
+# 2) ML MODEL (ET0 PREDICTOR)
 # ============================================================
 
-# Cache the trained model! Retraining on every click is redundant.
-@st.cache_resource
-def train_et0_model(daily_df):
+FEATURES = ["temperature_2m", "relative_humidity_2m", "windspeed_10m", 
+            "shortwave_radiation", "doy", "precipitation"]
+TARGET = "et0_fao_evapotranspiration"
+
+# Trained models are persisted and reused by irrigation/model_registry.py;
+# retraining on every click is redundant.
+def train_et0_model(daily_df, features=None):
     """
     Trains XGBoost on atmospheric variables to predict ET0.
     [PATCH 5] Computes and returns RMSE and MAE validation metrics.
     """
     
-    features = ["temperature_2m", "relative_humidity_2m", "windspeed_10m", 
-                "shortwave_radiation", "doy", "precipitation"]
-    target = "et0_fao_evapotranspiration"
+    features = list(features or FEATURES)
+    target = TARGET
 
     X = daily_df[features]
     y = daily_df[target]
@@ -127,49 +103,33 @@ def train_et0_model(daily_df):
     return model, features, metrics
 
 # ============================================================
-# 4) FORECAST GENERATION
+# 3) FORECAST GENERATION
 # ============================================================
 
-def predict_et0_next_3_days(lat, lon):
-    """
-    Orchestrates the forecast pipeline:
-    1. Fetch History -> 2. Train Model -> 3. Fetch Forecast Weather -> 4. Predict ET0
-    
-    Returns:
-        tuple: (forecast_dataframe, metrics_dictionary)
-    """
-    
-    # A. Get Training Data
-    hist_df = fetch_training_data(lat, lon)
-    if hist_df is None or len(hist_df) < 14:
-        print("[Forecast] Insufficient history for training.")
-        return None, None
-        
-    training_data = prepare_features(hist_df)
-    
-    # B. Train Model & Get Validation Metrics
-    # (Cached via decorators on the function itself)
-    model, feature_names, metrics = train_et0_model(training_data)
-    
-    # C. Get Future Atmospheric Conditions
-    url = (
-        f"https://api.open-meteo.com/v1/forecast?"
+def future_weather_url(lat, lon):
+    """Open-Meteo request for the hourly forecast drivers of the next 4 days."""
+    return (
+        f"{FORECAST_URL}?"
         f"latitude={lat}&longitude={lon}"
         "&hourly=temperature_2m,relative_humidity_2m,windspeed_10m,"
         "shortwave_radiation,precipitation"
         "&timezone=auto&forecast_days=4"
     )
-    
-    try:
-        resp = requests.get(url, timeout=10).json()
-        future_hourly = pd.DataFrame(resp["hourly"])
-        future_hourly["time"] = pd.to_datetime(future_hourly["time"])
-        future_hourly["date"] = future_hourly["time"].dt.date
-    except Exception as e:
-        print(f"[Forecast] Future weather fetch failed: {e}")
-        return None, metrics
-
-    # D. Aggregate Future Data
+
+def parse_future_weather(resp):
+    return pd.DataFrame(resp["hourly"])
+
+def fetch_future_weather_live(lat, lon):
+    """Hourly forecast drivers for the next 4 days from Open-Meteo (no cache)."""
+    resp = requests.get(future_weather_url(lat, lon), timeout=10).json()
+    return parse_future_weather(resp)
+
+def aggregate_future_weather(future_hourly):
+    """Hourly forecast drivers -> the next 3 daily feature rows (without location features)."""
+    future_hourly = future_hourly.copy()
+    future_hourly["time"] = pd.to_datetime(future_hourly["time"])
+    future_hourly["date"] = future_hourly["time"].dt.date
+
     future_daily = future_hourly.groupby("date", as_index=False).agg({
         "temperature_2m": "mean",
         "relative_humidity_2m": "mean",
@@ -179,13 +139,125 @@ def predict_et0_next_3_days(lat, lon):
     })
     
     future_daily["doy"] = pd.to_datetime(future_daily["date"]).dt.dayofyear
-    future_daily = future_daily.head(3) # Strict 3-day window
+    return future_daily.head(3) # Strict 3-day window
 
-    # E. Predict ET0
-    X_future = future_daily[feature_names]
-    et0_pred = model.predict(X_future)
-    
-    # Apply Physics Constraints (ET0 >= 0)
-    future_daily["et0_pred"] = np.maximum(et0_pred, 0.0)
+def predict_et0_next_3_days(lat, lon):
+    """
+    Orchestrates the forecast pipeline for one location
+    (see predict_et0_batch):
+    1. Update History -> 2. Pooled Regional Model -> 3. Fetch Forecast Weather -> 4. Predict ET0
     
-    return future_daily[["date", "et0_pred", "precipitation"]], metrics
\ No newline at end of file
+    Returns:
+        tuple: (forecast_dataframe, metrics_dictionary)
+    """
+    return predict_et0_batch([(lat, lon)])[0]
+
+# ============================================================
+# 4) REGIONAL POOLED MODEL (BATCHED FORECAST)
+# ============================================================
+# One XGBoost model is trained over the stored history of every grid cell,
+# with location features, instead of one ~60-row model per (lat, lon).
+
+LOCATION_FEATURES = ["lat", "lon", "elevation"]
+REGIONAL_FEATURES = FEATURES + LOCATION_FEATURES
+REGIONAL_MODEL_KEY = "regional"
+
+# The pooled window slides every day; retrain at most once per this many
+# days of new history (or when a cell joins the pool)
+REGIONAL_RETRAIN_DAYS = 7
+
+def regional_training_set(store, days=60):
+    """Daily features of all stored cells + lat / lon / elevation, in date order."""
+    daily = store.regional_daily(days=days)
+    if daily.empty:
+        return None
+
+    cells = list(dict.fromkeys(zip(daily["cell_lat"], daily["cell_lon"])))
+    elevation = dict(zip(cells, store.elevations(cells)))
+
+    daily = daily.rename(columns={"cell_lat": "lat", "cell_lon": "lon"})
+    daily["elevation"] = [elevation[c] for c in zip(daily["lat"], daily["lon"])]
+    features = finalize_features(daily)
+
+    # Temporal order across cells so the validation split holds out the latest days
+    return features.sort_values(["date", "lat", "lon"], kind="stable").reset_index(drop=True)
+
+def regional_fingerprint(cells, latest, cadence_days=REGIONAL_RETRAIN_DAYS):
+    """
+    Retrain key of the pooled model from the store's metadata
+    (HistoryStore.regional_summary): the set of cells plus the latest history
+    day bucketed to `cadence_days`. Daily window updates within a bucket keep
+    serving the current model.
+    """
+    h = hashlib.sha1()
+    h.update(repr(sorted(cells)).encode())
+    h.update(str(latest.toordinal() // cadence_days).encode())
+    return h.hexdigest()
+
+def predict_et0_batch(locations, store=None, registry=None):
+    """
+    3-day ET0 forecast for many locations with one pooled model and one
+    batched predict call.
+
+    Args:
+        locations (list): [(lat, lon), ...]
+
+    Returns:
+        list: (forecast_dataframe, metrics_dictionary) per location, in order;
+              (None, metrics) where the location's future weather is unavailable.
+    """
+    store = store or get_history_store()
+    registry = registry or get_et0_registry()
+    cells = list(dict.fromkeys(grid_cell(lat, lon, store.grid_deg) for lat, lon in locations))
+
+    # A. Bring the requested cells' history up to date (incremental)
+    for lat, lon in cells:
+        try:
+            store.daily(lat, lon)
+        except Exception as e:
+            print(f"[Forecast] History update failed for {lat}, {lon}: {e}")
+
+    # Store metadata only; the pooled frame is built when a (re)train runs
+    pooled_cells, latest, n_rows = store.regional_summary()
+    if n_rows < 14:
+        print("[Forecast] Insufficient history for training.")
+        return [(None, None)] * len(locations)
+
+    # B. Pooled model (registry: loaded from disk, (re)trained in the background)
+    found = registry.get_named(
+        REGIONAL_MODEL_KEY, lambda: regional_training_set(store), REGIONAL_FEATURES, TARGET,
+        fingerprint=regional_fingerprint(pooled_cells, latest)
+    )
+    if found is None:
+        print("[Forecast] Regional ET0 model is training in the background; no forecast yet.")
+        return [(None, None)] * len(locations)
+    model, feature_names, metrics = found
+
+    # C. Future atmospheric conditions per cell (persistent weather cache)
+    elevation = dict(zip(cells, store.elevations(cells)))
+    frames = {}
+    for lat, lon in cells:
+        try:
+            hourly = get_weather_cache().get_or_fetch("forecast", lat, lon, fetch_future_weather_live)
+            frames[(lat, lon)] = aggregate_future_weather(hourly).assign(
+                lat=lat, lon=lon, elevation=elevation[(lat, lon)]
+            )
+        except Exception as e:
+            print(f"[Forecast] Future weather fetch failed for {lat}, {lon}: {e}")
+
+    # D. One predict over every location-day
+    if frames:
+        future = pd.concat(frames.values(), ignore_index=True)
+        # Apply Physics Constraints (ET0 >= 0)
+        future["et0_pred"] = np.maximum(model.predict(future[feature_names]), 0.0)
+        by_cell = {cell: g[["date", "et0_pred", "precipitation"]].reset_index(drop=True)
+                   for cell, g in future.groupby(["lat", "lon"], sort=False)}
+    else:
+        by_cell = {}
+
+    results = []
+    for lat, lon in locations:
+        cell = grid_cell(lat, lon, store.grid_deg)
+        f_df = by_cell.get(cell)
+        results.append((None if f_df is None else f_df.copy(), metrics))
+    return results
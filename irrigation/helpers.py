@@ -32,6 +32,25 @@ crop_params = {
 # Compatibility alias for legacy lookups (if any)
 kc_table = {k: v["kc"] for k, v in crop_params.items()}
 
+# Growth stage lengths (days): initial, development, mid-season, late season
+# Source: FAO 56 Table 11 (tropical / Indian sowing windows where listed)
+crop_stage_lengths = {
+    "wheat":     {"initial": 20, "development": 25, "mid": 60,  "late": 30},
+    "rice":      {"initial": 30, "development": 30, "mid": 60,  "late": 30},
+    "maize":     {"initial": 30, "development": 40, "mid": 50,  "late": 30},
+    "sugarcane": {"initial": 35, "development": 60, "mid": 190, "late": 120},
+    "soybean":   {"initial": 20, "development": 30, "mid": 60,  "late": 25},
+    "mustard":   {"initial": 25, "development": 35, "mid": 55,  "late": 30},
+    "potato":    {"initial": 25, "development": 30, "mid": 45,  "late": 30}
+}
+
+# Root depth as a fraction of Zr_max per stage (sigmoidal approximation)
+root_depth_factors = {
+    "initial": 0.3,
+    "mid": 0.8,
+    "late": 1.0
+}
+
 
 # ==============================================================================
 # 2. SOIL HYDRAULIC PROPERTIES
@@ -65,6 +84,17 @@ pump_flow = {
     "5_hp":   45000
 }
 
+# Rated pump power (kW), 1 hp = 0.746 kW
+pump_power_kw = {k: float(k.split("_")[0]) * 0.746 for k in pump_flow}
+
+# Typical field application efficiency by method (FAO Irrigation Water Management)
+application_methods = {
+    "flood":     0.60,
+    "furrow":    0.65,
+    "sprinkler": 0.75,
+    "drip":      0.90
+}
+
 # Area Conversions (to Square Meters)
 area_conversion = {
     "acre": 4046.86,
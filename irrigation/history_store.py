@@ -0,0 +1,399 @@
+"""
+history_store.py — Incremental ET0 Training History
+---------------------------------------------------
+Append-only, per-location store of the daily weather rows used to train the
+ET0 forecaster (irrigation/forecast.py).
+
+Instead of pulling the whole 60-day hourly archive (~1,440 rows) on every
+call, the store:
+  • keeps one pre-aggregated daily row per (grid cell, date) in SQLite,
+  • fetches only the dates it does not have yet (normally the last day or
+    two, one small archive request),
+  • re-fetches days that were incomplete when stored (archive lag / today).
+
+Daily rows use exactly the aggregation of forecast.prepare_features, so the
+model sees the same features whether they come from here or from a fresh
+hourly pull.
+
+Configuration (environment):
+  SMARTFARMER_HISTORY_STORE   SQLite file path (default ~/.cache/smart-farmer/history.sqlite)
+"""
+
+import os
+import sqlite3
+import threading
+import time
+from datetime import date, datetime, timedelta
+
+import pandas as pd
+import requests
+
+from irrigation.weather_cache import DEFAULT_GRID_DEG, grid_cell
+
+ARCHIVE_URL = os.environ.get("OPEN_METEO_ARCHIVE_URL", "https://archive-api.open-meteo.com/v1/archive")
+ELEVATION_URL = os.environ.get("OPEN_METEO_ELEVATION_URL", "https://api.open-meteo.com/v1/elevation")
+
+ARCHIVE_VARIABLES = [
+    "temperature_2m", "relative_humidity_2m", "windspeed_10m",
+    "shortwave_radiation", "et0_fao_evapotranspiration", "precipitation",
+]
+
+# Hourly -> daily aggregation (same as forecast.prepare_features)
+DAILY_AGGREGATION = {
+    "temperature_2m": "mean",
+    "relative_humidity_2m": "mean",
+    "windspeed_10m": "mean",
+    "shortwave_radiation": "sum",
+    "et0_fao_evapotranspiration": "sum",  # TARGET VARIABLE
+    "precipitation": "sum",
+}
+
+# A stored day with fewer valid hours is fetched again (23 allows DST days)
+COMPLETE_DAY_HOURS = 23
+
+# Minimum time between archive requests for one location, for gaps that
+# only cover the last TAIL_DAYS (archive lag); older gaps are always filled
+DEFAULT_REFRESH_SECONDS = 3600
+TAIL_DAYS = 7
+
+DEFAULT_HISTORY_PATH = os.path.join(
+    os.path.expanduser("~"), ".cache", "smart-farmer", "history.sqlite"
+)
+
+_SCHEMA = [
+    f"""
+    CREATE TABLE IF NOT EXISTS daily (
+        cell    TEXT NOT NULL,
+        date    TEXT NOT NULL,
+        {", ".join(f"{c} REAL" for c in DAILY_AGGREGATION)},
+        n_hours INTEGER NOT NULL,
+        PRIMARY KEY (cell, date)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS locations (
+        cell       TEXT PRIMARY KEY,
+        last_fetch REAL NOT NULL
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS elevations (
+        cell   TEXT PRIMARY KEY,
+        meters REAL
+    )
+    """,
+]
+
+
+# ------------------------------------------------------------
+# ARCHIVE FETCH + AGGREGATION
+# ------------------------------------------------------------
+def archive_url(lat, lon, start_date, end_date):
+    """Open-Meteo archive request for the hourly training variables."""
+    return (
+        f"{ARCHIVE_URL}?"
+        f"latitude={lat}&longitude={lon}"
+        f"&start_date={start_date}&end_date={end_date}"
+        f"&hourly={','.join(ARCHIVE_VARIABLES)}"
+        "&timezone=auto"
+    )
+
+
+def parse_archive(raw):
+    """Archive JSON -> hourly frame. Raises on an API error payload."""
+    if "error" in raw:
+        raise RuntimeError(f"API Error: {raw.get('reason')}")
+    return pd.DataFrame(raw["hourly"])
+
+
+def fetch_archive_range_live(lat, lon, start_date, end_date):
+    """Hourly archive frame for [start_date, end_date] (no cache). Raises on failure."""
+    raw = requests.get(archive_url(lat, lon, start_date, end_date), timeout=20).json()
+    return parse_archive(raw)
+
+
+def elevation_url(lats, lons):
+    """Open-Meteo elevation request for many points."""
+    return (
+        f"{ELEVATION_URL}?"
+        f"latitude={','.join(str(v) for v in lats)}"
+        f"&longitude={','.join(str(v) for v in lons)}"
+    )
+
+
+def parse_elevation(raw):
+    if "elevation" not in raw:
+        raise RuntimeError(f"API Error: {raw.get('reason')}")
+    return [float(v) for v in raw["elevation"]]
+
+
+def fetch_elevation_live(lats, lons):
+    """Terrain elevation (m) for many points in one Open-Meteo request."""
+    return parse_elevation(requests.get(elevation_url(lats, lons), timeout=10).json())
+
+
+def aggregate_hourly(hourly_df):
+    """
+    Hourly archive rows -> one row per date (DAILY_AGGREGATION) plus
+    n_hours, the number of complete hourly rows behind each day.
+    Hourly rows with any missing value are dropped first.
+    """
+    df = hourly_df.dropna().copy()
+    if "date" not in df.columns:
+        df["date"] = pd.to_datetime(df["time"]).dt.date
+
+    daily = df.groupby("date", as_index=False).agg(DAILY_AGGREGATION)
+    daily["n_hours"] = df.groupby("date").size().to_numpy()
+    return daily
+
+
+# ------------------------------------------------------------
+# STORE
+# ------------------------------------------------------------
+class HistoryStore:
+    """SQLite store of daily training rows per weather grid cell."""
+
+    def __init__(self, path=None, grid_deg=DEFAULT_GRID_DEG, refresh_seconds=DEFAULT_REFRESH_SECONDS):
+        self.path = path or DEFAULT_HISTORY_PATH
+        self.grid_deg = grid_deg
+        self.refresh_seconds = refresh_seconds
+        self.fetches = 0
+        self._lock = threading.Lock()
+        self._revision = 0           # bumped on every merge (regional_summary cache)
+        self._summary = None         # ((revision, start, end), summary)
+
+        if self.path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, timeout=30)
+        if self.path != ":memory:":
+            self._conn.execute("PRAGMA journal_mode=WAL")
+        for stmt in _SCHEMA:
+            self._conn.execute(stmt)
+        self._conn.commit()
+
+    def _cell(self, lat, lon):
+        cell_lat, cell_lon = grid_cell(lat, lon, self.grid_deg)
+        return f"{cell_lat:.6f}:{cell_lon:.6f}", cell_lat, cell_lon
+
+    def _complete_dates(self, cell, start, end):
+        rows = self._conn.execute(
+            "SELECT date FROM daily WHERE cell = ? AND date BETWEEN ? AND ? AND n_hours >= ?",
+            (cell, start.isoformat(), end.isoformat(), COMPLETE_DAY_HOURS),
+        ).fetchall()
+        return {r[0] for r in rows}
+
+    def missing_ranges(self, lat, lon, start, end):
+        """Contiguous (first, last) runs of dates in [start, end] not yet stored complete."""
+        cell, _, _ = self._cell(lat, lon)
+        with self._lock:
+            have = self._complete_dates(cell, start, end)
+
+        runs = []
+        for i in range((end - start).days + 1):
+            day = start + timedelta(days=i)
+            if day.isoformat() in have:
+                continue
+            if runs and runs[-1][1] == day - timedelta(days=1):
+                runs[-1][1] = day
+            else:
+                runs.append([day, day])
+        return [tuple(r) for r in runs]
+
+    def merge(self, lat, lon, daily_df):
+        """Upserts aggregated daily rows (output of aggregate_hourly) and marks the location fetched."""
+        cell, _, _ = self._cell(lat, lon)
+        cols = list(DAILY_AGGREGATION)
+        records = daily_df.to_dict("records") if daily_df is not None else []
+        rows = [
+            (cell, str(r["date"]), *(float(r[c]) for c in cols), int(r["n_hours"]))
+            for r in records
+        ]
+        with self._lock:
+            self._conn.executemany(
+                f"INSERT OR REPLACE INTO daily (cell, date, {', '.join(cols)}, n_hours) "
+                f"VALUES (?, ?, {', '.join('?' for _ in cols)}, ?)",
+                rows,
+            )
+            self._conn.execute(
+                "INSERT OR REPLACE INTO locations (cell, last_fetch) VALUES (?, ?)", (cell, time.time())
+            )
+            self._conn.commit()
+            self._revision += 1
+
+    def pending_ranges(self, lat, lon, start, end):
+        """
+        Date runs update() would request for [start, end]: the missing runs,
+        minus a gap in the last TAIL_DAYS if fetched within refresh_seconds.
+        """
+        cell, _, _ = self._cell(lat, lon)
+        with self._lock:
+            row = self._conn.execute("SELECT last_fetch FROM locations WHERE cell = ?", (cell,)).fetchone()
+        recently_fetched = bool(row and self.refresh_seconds and time.time() - row[0] < self.refresh_seconds)
+
+        return [
+            (first, last) for first, last in self.missing_ranges(lat, lon, start, end)
+            if not (recently_fetched and first >= end - timedelta(days=TAIL_DAYS))
+        ]
+
+    def merge_hourly(self, lat, lon, hourly):
+        """Aggregates a fetched hourly archive frame and merges it; returns rows merged."""
+        self.fetches += 1
+        daily = aggregate_hourly(hourly) if hourly is not None and not hourly.empty else None
+        self.merge(lat, lon, daily)
+        return 0 if daily is None else len(daily)
+
+    def update(self, lat, lon, start, end, fetcher=fetch_archive_range_live):
+        """
+        Fetches and merges only the missing part of [start, end] (see pending_ranges).
+
+        Returns:
+            int: number of daily rows merged
+        """
+        _, cell_lat, cell_lon = self._cell(lat, lon)
+        merged = 0
+        for first, last in self.pending_ranges(lat, lon, start, end):
+            merged += self.merge_hourly(lat, lon, fetcher(cell_lat, cell_lon, first, last))
+        return merged
+
+    def daily(self, lat, lon, days=60, fetcher=fetch_archive_range_live, today=None):
+        """
+        Daily training rows for the last `days` days (same window as the
+        original 60-day archive pull), updated incrementally first. If the
+        update fails, the rows already stored are returned.
+
+        Returns:
+            pandas.DataFrame: date + DAILY_AGGREGATION columns + n_hours, sorted by date
+        """
+        end = today or datetime.utcnow().date()
+        start = end - timedelta(days=days)
+        try:
+            self.update(lat, lon, start, end, fetcher=fetcher)
+        except Exception as e:
+            print(f"[History] Archive update failed, serving stored rows: {e}")
+
+        cell, _, _ = self._cell(lat, lon)
+        cols = list(DAILY_AGGREGATION)
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT date, {', '.join(cols)}, n_hours FROM daily "
+                "WHERE cell = ? AND date BETWEEN ? AND ? ORDER BY date",
+                (cell, start.isoformat(), end.isoformat()),
+            ).fetchall()
+
+        df = pd.DataFrame(rows, columns=["date", *cols, "n_hours"])
+        df["date"] = [date.fromisoformat(d) for d in df["date"]]
+        return df
+
+    def elevations(self, locations, fetcher=fetch_elevation_live):
+        """
+        Elevation (m) per (lat, lon), from the store or one request for the
+        unknown cells. Cells whose lookup fails get NaN (not stored).
+        """
+        keys = [self._cell(lat, lon)[0] for lat, lon in locations]
+        todo = self.missing_elevations(locations)
+        if todo:
+            try:
+                self.store_elevations(todo, fetcher([c[0] for c in todo], [c[1] for c in todo]))
+            except Exception as e:
+                print(f"[History] Elevation lookup failed: {e}")
+
+        known = self._known_elevations(keys)
+        return [float("nan") if known.get(k) is None else known[k] for k in keys]
+
+    def _known_elevations(self, keys):
+        if not keys:
+            return {}
+        with self._lock:
+            return dict(self._conn.execute(
+                f"SELECT cell, meters FROM elevations WHERE cell IN ({', '.join('?' for _ in keys)})", keys
+            ).fetchall())
+
+    def missing_elevations(self, locations):
+        """Grid cells (cell_lat, cell_lon) among `locations` with no stored elevation."""
+        cells = {}
+        for lat, lon in locations:
+            key, cell_lat, cell_lon = self._cell(lat, lon)
+            cells.setdefault(key, (cell_lat, cell_lon))
+        known = self._known_elevations(list(cells))
+        return [c for k, c in cells.items() if k not in known]
+
+    def store_elevations(self, cells, values):
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO elevations (cell, meters) VALUES (?, ?)",
+                [(self._cell(lat, lon)[0], v) for (lat, lon), v in zip(cells, values)],
+            )
+            self._conn.commit()
+
+    def regional_summary(self, days=60, today=None):
+        """
+        Metadata of the pooled training window without reading its rows:
+        (cells, latest_date, n_rows), cells as sorted (cell_lat, cell_lon).
+        Kept in memory until this store merges new rows or the window moves.
+        """
+        end = today or datetime.utcnow().date()
+        start = end - timedelta(days=days)
+        with self._lock:
+            key = (self._revision, start, end)
+            if self._summary is not None and self._summary[0] == key:
+                return self._summary[1]
+            rows = self._conn.execute(
+                "SELECT cell, MAX(date), COUNT(*) FROM daily WHERE date BETWEEN ? AND ? GROUP BY cell",
+                (start.isoformat(), end.isoformat()),
+            ).fetchall()
+
+            cells = sorted(tuple(float(v) for v in cell.split(":")) for cell, _, _ in rows)
+            latest = max((date.fromisoformat(d) for _, d, _ in rows), default=None)
+            summary = (cells, latest, sum(n for _, _, n in rows))
+            self._summary = (key, summary)
+        return summary
+
+    def regional_daily(self, days=60, today=None):
+        """
+        Stored daily rows of every cell for the last `days` days (no fetching),
+        with cell_lat / cell_lon columns — the pooled regional training set.
+        """
+        end = today or datetime.utcnow().date()
+        start = end - timedelta(days=days)
+        cols = list(DAILY_AGGREGATION)
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT cell, date, {', '.join(cols)}, n_hours FROM daily "
+                "WHERE date BETWEEN ? AND ? ORDER BY cell, date",
+                (start.isoformat(), end.isoformat()),
+            ).fetchall()
+
+        df = pd.DataFrame(rows, columns=["cell", "date", *cols, "n_hours"])
+        latlon = df["cell"].str.split(":", expand=True) if len(df) else pd.DataFrame(columns=[0, 1])
+        df.insert(1, "cell_lat", latlon[0].astype(float))
+        df.insert(2, "cell_lon", latlon[1].astype(float))
+        df["date"] = [date.fromisoformat(d) for d in df["date"]]
+        return df.drop(columns="cell")
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+# ------------------------------------------------------------
+# PROCESS-WIDE DEFAULT
+# ------------------------------------------------------------
+_DEFAULT_STORE = None
+_DEFAULT_LOCK = threading.Lock()
+
+
+def get_history_store():
+    """Shared HistoryStore configured from the environment (created on first use)."""
+    global _DEFAULT_STORE
+    if _DEFAULT_STORE is None:
+        with _DEFAULT_LOCK:
+            if _DEFAULT_STORE is None:
+                _DEFAULT_STORE = HistoryStore(path=os.environ.get("SMARTFARMER_HISTORY_STORE") or None)
+    return _DEFAULT_STORE
+
+
+def set_history_store(store):
+    """Replaces the shared store (e.g. HistoryStore(':memory:') in tests)."""
+    global _DEFAULT_STORE
+    with _DEFAULT_LOCK:
+        _DEFAULT_STORE = store
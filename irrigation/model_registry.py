@@ -0,0 +1,295 @@
+"""
+model_registry.py — ET0 Forecaster Model Registry
+-------------------------------------------------
+Keeps trained ET0 XGBoost models (irrigation/forecast.py) on disk, one per
+location cluster (weather grid cell), so forecasts work the same from
+Streamlit, batch jobs and the CLI.
+
+  • Each cluster stores the booster in XGBoost's own format (<cluster>.ubj,
+    no pickle) plus a JSON sidecar with the features, validation metrics and
+    a fingerprint of the training rows.
+  • Models are loaded lazily on first use and then kept in memory.
+  • When new history arrives (fingerprint changes), the current model keeps
+    serving and a retrain is queued on a background worker.
+  • A key with no model at all is also trained in the background; until it
+    is ready get_model / get_named return None ("no forecast yet"). Batch
+    jobs pre-train with the CLI below (or background=False).
+  • One thread at a time loads or trains a key (per-key lock); files are
+    written under unique temporary names and renamed into place.
+
+Configuration (environment):
+  SMARTFARMER_ET0_MODELS   Model directory (default ~/.cache/smart-farmer/et0_models)
+
+CLI (pre-train the regional model ahead of a batch run):
+  python -m irrigation.model_registry 20.0,75.0 21.1,79.0
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from xgboost import XGBRegressor
+
+from irrigation.weather_cache import DEFAULT_GRID_DEG, grid_cell
+
+DEFAULT_MODEL_DIR = os.path.join(
+    os.path.expanduser("~"), ".cache", "smart-farmer", "et0_models"
+)
+
+
+def training_fingerprint(daily_df, features, target):
+    """Stable hash of the training rows (feature + target values, in order)."""
+    values = np.ascontiguousarray(daily_df[features + [target]].to_numpy(dtype=float))
+    h = hashlib.sha1()
+    h.update(",".join(features + [target]).encode())
+    h.update(str(values.shape).encode())
+    h.update(values.tobytes())
+    return h.hexdigest()
+
+
+def _rows(daily_df):
+    """Training frame, or the frame returned by a loader callable."""
+    return daily_df() if callable(daily_df) else daily_df
+
+
+class ET0ModelRegistry:
+    """
+    Disk-backed store of ET0 models keyed by location cluster.
+
+    `trainer(daily_df, features) -> (model, features, metrics)` does the
+    actual fit (forecast.train_et0_model); the registry only decides when
+    to call it. Besides per-cluster models it holds named ones such as the
+    pooled "regional" model (forecast.predict_et0_batch).
+    """
+
+    def __init__(self, trainer, root=None, grid_deg=DEFAULT_GRID_DEG, background=True):
+        # grid_deg must match the history store's grid so one cluster
+        # always sees one training series
+        self.trainer = trainer
+        self.root = root or DEFAULT_MODEL_DIR
+        self.grid_deg = grid_deg
+        self.background = background
+        self.stats = {"memory_hits": 0, "disk_loads": 0, "trained": 0, "scheduled": 0}
+
+        os.makedirs(self.root, exist_ok=True)
+        self._models = {}        # cluster -> (model, features, metrics, fingerprint)
+        self._pending = set()
+        self._lock = threading.Lock()
+        self._key_locks = {}     # (purpose, cluster) -> RLock; "load" and "train" are
+                                 # separate so a training key never blocks readers
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="et0-retrain")
+
+    # --------------------------------------------------------
+    def cluster(self, lat, lon):
+        cell_lat, cell_lon = grid_cell(lat, lon, self.grid_deg)
+        return f"{cell_lat:.4f}_{cell_lon:.4f}"
+
+    def _key_lock(self, name, purpose="train"):
+        with self._lock:
+            return self._key_locks.setdefault((purpose, name), threading.RLock())
+
+    def _paths(self, cluster):
+        base = os.path.join(self.root, cluster)
+        return base + ".ubj", base + ".json"
+
+    def _load(self, cluster):
+        """Model tuple from disk, or None."""
+        model_path, meta_path = self._paths(cluster)
+        if not (os.path.exists(model_path) and os.path.exists(meta_path)):
+            return None
+        try:
+            with open(meta_path, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            model = XGBRegressor()
+            model.load_model(model_path)
+        except Exception as e:
+            print(f"[Registry] Could not load model {cluster}: {e}")
+            return None
+        self.stats["disk_loads"] += 1
+        return model, meta["features"], meta["metrics"], meta["fingerprint"]
+
+    def _save(self, cluster, entry, n_rows):
+        model, features, metrics, fingerprint = entry
+        model_path, meta_path = self._paths(cluster)
+        meta = {
+            "fingerprint": fingerprint,
+            "features": features,
+            "metrics": metrics,
+            "n_rows": n_rows,
+            "trained_at": time.time(),
+        }
+        # Unique temporary files, then rename: readers never see a half-written
+        # file and concurrent writers never share a temporary name
+        fd, tmp_model = tempfile.mkstemp(dir=self.root, prefix=f".{cluster}.", suffix=".ubj")
+        os.close(fd)
+        try:
+            model.save_model(tmp_model)
+            with tempfile.NamedTemporaryFile("w", dir=self.root, prefix=f".{cluster}.", suffix=".json",
+                                             delete=False, encoding="utf-8") as f:
+                json.dump(meta, f, indent=2)
+                tmp_meta = f.name
+        except Exception:
+            os.remove(tmp_model)
+            raise
+        os.replace(tmp_model, model_path)
+        os.replace(tmp_meta, meta_path)
+
+    def _train(self, cluster, daily_df, features, fingerprint):
+        with self._key_lock(cluster):
+            daily_df = _rows(daily_df)
+            if daily_df is None or daily_df.empty:
+                raise ValueError(f"No training rows for {cluster}.")
+            model, features, metrics = self.trainer(daily_df, features)
+            entry = (model, features, metrics, fingerprint)
+            self._save(cluster, entry, len(daily_df))
+            with self._lock:
+                self._models[cluster] = entry
+                self._pending.discard(cluster)
+            self.stats["trained"] += 1
+        return entry
+
+    def _train_background(self, cluster, daily_df, features, fingerprint):
+        try:
+            self._train(cluster, daily_df, features, fingerprint)
+        except Exception as e:
+            print(f"[Registry] Background retrain failed for {cluster}: {e}")
+            with self._lock:
+                self._pending.discard(cluster)
+
+    # --------------------------------------------------------
+    def get_model(self, lat, lon, daily_df, features, target):
+        """
+        Model for the cluster of (lat, lon) trained on `daily_df`.
+
+        Returns:
+            tuple: (model, feature_names, metrics) — possibly from the previous
+            history while a retrain runs in the background — or None while a
+            cluster without any model is trained in the background.
+        """
+        return self.get_named(self.cluster(lat, lon), daily_df, features, target)
+
+    def _cached(self, name):
+        """Entry from memory, else from disk (one loader per key), else None."""
+        with self._lock:
+            entry = self._models.get(name)
+        if entry is not None:
+            self.stats["memory_hits"] += 1
+            return entry
+        with self._key_lock(name, "load"):
+            with self._lock:
+                entry = self._models.get(name)
+            if entry is None:
+                entry = self._load(name)
+                if entry is not None:
+                    with self._lock:
+                        self._models[name] = entry
+        return entry
+
+    def get_named(self, name, daily_df, features, target, fingerprint=None):
+        """
+        Same as get_model for an explicit registry key (e.g. "regional").
+        `fingerprint` overrides the row hash as the retrain trigger, e.g. a
+        coarser key for a training set whose rows change on every call. With
+        a fingerprint, `daily_df` may be a loader callable, which then only
+        runs when a (re)train actually happens.
+        """
+        if fingerprint is None:
+            daily_df = _rows(daily_df)
+            fingerprint = training_fingerprint(daily_df, features, target)
+        entry = self._cached(name)
+
+        if entry is None:
+            if self.background:
+                # Cold start: never train on the request path
+                self.schedule_retrain(name, daily_df, features, fingerprint)
+                return None
+            with self._key_lock(name):
+                entry = self._cached(name) or self._train(name, daily_df, features, fingerprint)
+        elif entry[3] != fingerprint:
+            if self.background:
+                self.schedule_retrain(name, daily_df, features, fingerprint)
+            else:
+                entry = self._train(name, daily_df, features, fingerprint)
+
+        model, feature_names, metrics, _ = entry
+        return model, feature_names, metrics
+
+    def schedule_retrain(self, name, daily_df, features, fingerprint):
+        """Queues a background retrain unless one is already pending for the key."""
+        with self._lock:
+            if name in self._pending:
+                return None
+            self._pending.add(name)
+        self.stats["scheduled"] += 1
+        if not callable(daily_df):
+            daily_df = daily_df.copy()
+        return self._executor.submit(self._train_background, name, daily_df, features, fingerprint)
+
+    def wait(self):
+        """Blocks until queued retrains have finished (batch jobs, tests)."""
+        self._executor.submit(lambda: None).result()
+
+    def info(self):
+        with self._lock:
+            return {**self.stats, "loaded": len(self._models), "pending": len(self._pending), "root": self.root}
+
+
+# ------------------------------------------------------------
+# PROCESS-WIDE DEFAULT
+# ------------------------------------------------------------
+_DEFAULT_REGISTRY = None
+_DEFAULT_LOCK = threading.Lock()
+
+
+def get_et0_registry():
+    """Shared registry using forecast.train_et0_model (created on first use)."""
+    global _DEFAULT_REGISTRY
+    if _DEFAULT_REGISTRY is None:
+        with _DEFAULT_LOCK:
+            if _DEFAULT_REGISTRY is None:
+                from irrigation.forecast import train_et0_model
+                _DEFAULT_REGISTRY = ET0ModelRegistry(
+                    train_et0_model, root=os.environ.get("SMARTFARMER_ET0_MODELS") or None
+                )
+    return _DEFAULT_REGISTRY
+
+
+def set_et0_registry(registry):
+    """Replaces the shared registry (e.g. a temporary directory in tests)."""
+    global _DEFAULT_REGISTRY
+    with _DEFAULT_LOCK:
+        _DEFAULT_REGISTRY = registry
+
+
+if __name__ == "__main__":
+    from irrigation.forecast import (
+        REGIONAL_FEATURES, REGIONAL_MODEL_KEY, TARGET, regional_fingerprint, regional_training_set
+    )
+    from irrigation.history_store import get_history_store
+
+    parser = argparse.ArgumentParser(description="Pre-train the pooled regional ET0 model")
+    parser.add_argument("locations", nargs="*", help="lat,lon pairs to add to the history first, e.g. 20.0,75.0")
+    args = parser.parse_args()
+
+    store = get_history_store()
+    for loc in args.locations:
+        lat, lon = (float(v) for v in loc.split(","))
+        print(f"📥 {loc}: {len(store.daily(lat, lon))} daily rows")
+
+    training_data = regional_training_set(store)
+    if training_data is None or len(training_data) < 14:
+        raise SystemExit("⚠️ Insufficient history for training.")
+
+    registry = get_et0_registry()
+    registry.background = False
+    _, _, metrics = registry.get_named(
+        REGIONAL_MODEL_KEY, training_data, REGIONAL_FEATURES, TARGET,
+        fingerprint=regional_fingerprint(*store.regional_summary()[:2])
+    )
+    print(f"✅ regional model: {len(training_data)} rows, RMSE {metrics['rmse_et0']:.3f}, MAE {metrics['mae_et0']:.3f}")
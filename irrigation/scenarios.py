@@ -0,0 +1,186 @@
+"""
+scenarios.py — Pump & Efficiency Sizing Sweep
+---------------------------------------------
+Answers "which pump and which irrigation method?" in one call instead of
+resubmitting the Irrigation page form.
+
+All combinations of
+  pump_hp × pump_efficiency × application_efficiency × area × initial deficit
+are evaluated in one vectorized pass over a single shared daily weather
+frame: the water balance runs once per distinct initial deficit, the
+hydraulics once for the whole grid.
+
+Returns a comparison table with pump hours, water volume, energy and cost.
+"""
+
+import numpy as np
+import pandas as pd
+
+from irrigation.weather import fetch_weather
+from irrigation.engine import field_parameters, aggregate_daily_weather
+from irrigation.water_balance import effective_rain_usda, deficit_balance
+from irrigation.batch import irrigation_requirement
+from irrigation.helpers import (
+    pump_flow,
+    pump_power_kw,
+    application_methods,
+    area_conversion
+)
+
+# Default electricity tariff for agricultural connections (₹/kWh)
+DEFAULT_TARIFF_PER_KWH = 6.0
+
+# Hours of three-phase supply a farm typically gets per day
+DEFAULT_SUPPLY_HOURS_PER_DAY = 8.0
+
+SCENARIO_COLUMNS = [
+    "pump_hp", "pump_efficiency", "application_method", "application_efficiency",
+    "area_value", "area_m2", "initial_deficit_mm", "current_deficit_mm", "is_stressed",
+    "net_irrigation_mm", "gross_irrigation_mm", "water_volume_L", "pump_hours",
+    "supply_days", "energy_kwh", "cost",
+]
+
+
+def _as_list(value):
+    if isinstance(value, (list, tuple, np.ndarray, pd.Series)):
+        return list(value)
+    return [value]
+
+
+def _application_grid(values):
+    """Method names and/or numbers -> (names, efficiencies)."""
+    names, effs = [], []
+    for v in _as_list(values):
+        if isinstance(v, str):
+            if v not in application_methods:
+                raise ValueError(f"Unknown application method '{v}'.")
+            names.append(v)
+            effs.append(application_methods[v])
+        else:
+            names.append(None)
+            effs.append(float(v))
+    return names, np.array(effs, dtype=float)
+
+
+def current_deficits(daily, kc, taw_mm, initial_deficits):
+    """
+    End-of-record depletion for several starting deficits (None = automatic
+    3-day estimate, as in get_irrigation_plan), from one 2-D balance.
+
+    Returns:
+        tuple: (initial_deficit_mm, current_deficit_mm) arrays
+    """
+    et0 = daily["et0"].to_numpy(dtype=float)
+    eff = effective_rain_usda(daily["rain"].to_numpy(dtype=float))
+    etc = kc * et0
+
+    auto = etc[:3].sum() - eff[:3].sum()
+    d0 = np.array([auto if d is None else float(d) for d in initial_deficits], dtype=float)
+    d0 = np.clip(d0, 0.0, taw_mm)
+
+    if len(et0) == 0:
+        return d0, d0.copy()
+    _, end = deficit_balance(
+        np.broadcast_to(etc, (len(d0), len(etc))), np.broadcast_to(eff, (len(d0), len(eff))), d0
+    )
+    return d0, end[:, -1]
+
+
+def sweep_irrigation_scenarios(daily, crop, stage, soil,
+                               pump_hp=None, pump_efficiency=0.7,
+                               application_efficiency=("flood", "drip"),
+                               area_value=1.0, area_unit="acre", initial_deficit_mm=None,
+                               tariff_per_kwh=DEFAULT_TARIFF_PER_KWH, water_cost_per_kl=0.0,
+                               supply_hours_per_day=DEFAULT_SUPPLY_HOURS_PER_DAY, always_refill=False):
+    """
+    Evaluates every combination of the given grids for one crop/stage/soil.
+
+    Args:
+        daily (DataFrame): daily et0 / rain (aggregate_daily_weather output).
+        pump_hp (str | list): pump_flow keys (default: all ratings).
+        pump_efficiency (float | list)
+        application_efficiency (float | str | list): numbers or
+            application_methods names ("flood", "furrow", "sprinkler", "drip").
+        area_value (float | list), area_unit (str)
+        initial_deficit_mm (float | None | list): None = automatic estimate.
+        tariff_per_kwh (float): electricity price per kWh.
+        water_cost_per_kl (float): water charge per 1000 L (0 for own well).
+        supply_hours_per_day (float): daily power availability for supply_days.
+        always_refill (bool): size a full refill to field capacity even where
+            depletion has not reached RAW yet (default: engine rule).
+
+    Returns:
+        pandas.DataFrame: SCENARIO_COLUMNS, cheapest (then shortest) first.
+    """
+    pumps = _as_list(pump_hp) if pump_hp is not None else list(pump_flow)
+    unknown = [p for p in pumps if p not in pump_flow]
+    if unknown:
+        raise ValueError(f"Unknown pump rating '{unknown[0]}'.")
+    if area_unit not in area_conversion:
+        raise ValueError(f"Unknown area unit '{area_unit}'.")
+
+    pump_effs = np.array(_as_list(pump_efficiency), dtype=float)
+    method_names, app_effs = _application_grid(application_efficiency)
+    areas = np.array(_as_list(area_value), dtype=float)
+    deficits = _as_list(initial_deficit_mm)
+
+    grids = {"pump_hp": pumps, "pump_efficiency": pump_effs, "application_efficiency": app_effs,
+             "area_value": areas, "initial_deficit_mm": deficits}
+    empty = [name for name, values in grids.items() if len(values) == 0]
+    if empty:
+        raise ValueError(f"Scenario grid '{empty[0]}' is empty.")
+
+    # Crop / stage / soil physics (independent of the efficiencies)
+    params = field_parameters(crop, stage, soil, pump_effs[0], app_effs[0])
+
+    # Same validation as get_irrigation_plan, for every efficiency in the grid
+    for pe in pump_effs[1:]:
+        field_parameters(crop, stage, soil, pe, app_effs[0])
+    for ae in app_effs[1:]:
+        field_parameters(crop, stage, soil, pump_effs[0], ae)
+
+    d0, current = current_deficits(daily, params["kc"], params["taw_mm"], deficits)
+    trigger_mm = 0.0 if always_refill else params["raw_mm"]
+
+    # Full grid as flat index arrays (pump, pump_eff, app_eff, area, deficit)
+    grid = np.meshgrid(
+        np.arange(len(pumps)), np.arange(len(pump_effs)), np.arange(len(app_effs)),
+        np.arange(len(areas)), np.arange(len(d0)), indexing="ij",
+    )
+    ip, ipe, iae, ia, idf = (g.ravel() for g in grid)
+
+    pump_keys = np.array(pumps, dtype=object)[ip]
+    area_m2 = areas[ia] * area_conversion[area_unit]
+    out = irrigation_requirement(
+        current[idf], trigger_mm, app_effs[iae], area_m2, pump_keys, pump_effs[ipe]
+    )
+
+    energy_kwh = out["pump_hours"] * np.array([pump_power_kw[p] for p in pumps])[ip]
+    cost = energy_kwh * tariff_per_kwh + out["water_volume_L"] / 1000.0 * water_cost_per_kl
+
+    table = pd.DataFrame({
+        "pump_hp": pump_keys,
+        "pump_efficiency": pump_effs[ipe],
+        "application_method": np.array(method_names, dtype=object)[iae],
+        "application_efficiency": app_effs[iae],
+        "area_value": areas[ia],
+        "area_m2": area_m2,
+        "initial_deficit_mm": d0[idf].round(2),
+        "current_deficit_mm": current[idf].round(2),
+        "is_stressed": current[idf] >= params["raw_mm"],
+        "net_irrigation_mm": out["net_irrigation_mm"].round(2),
+        "gross_irrigation_mm": out["gross_irrigation_mm"].round(2),
+        "water_volume_L": out["water_volume_L"].round(0),
+        "pump_hours": out["pump_hours"].round(2),
+        "supply_days": np.ceil(out["pump_hours"] / supply_hours_per_day),
+        "energy_kwh": energy_kwh.round(2),
+        "cost": cost.round(2),
+    }, columns=SCENARIO_COLUMNS)
+
+    return table.sort_values(["cost", "pump_hours"], kind="stable").reset_index(drop=True)
+
+
+def sweep_for_location(lat, lon, crop, stage, soil, **grids):
+    """sweep_irrigation_scenarios on the (cached) weather of one location."""
+    daily = aggregate_daily_weather(fetch_weather(lat, lon))
+    return sweep_irrigation_scenarios(daily, crop, stage, soil, **grids)
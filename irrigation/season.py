@@ -0,0 +1,273 @@
+"""
+season.py — Season-Long Irrigation Simulator
+--------------------------------------------
+Simulates a whole crop season day by day instead of one fixed stage:
+
+  • Kc follows the FAO-56 crop coefficient curve (Kc_ini flat, linear rise
+    over development, Kc_mid flat, linear decline to Kc_end).
+  • Root depth (and with it TAW / RAW) grows across the stages using the
+    same stage factors as the single-day engine.
+  • Irrigation refills the root zone to field capacity whenever depletion
+    reaches RAW (irrigated_balance in irrigation/water_balance.py).
+
+Many sowing dates × soils run as one array batch per crop, so thousands of
+planning scenarios take milliseconds. Weather is a daily frame (date, et0,
+rain) — historical, e.g. from the history store, or synthetic_weather().
+"""
+
+import numpy as np
+import pandas as pd
+
+from irrigation.water_balance import effective_rain_usda, irrigated_balance
+from irrigation.helpers import (
+    crop_params,
+    soil_params,
+    crop_stage_lengths,
+    root_depth_factors,
+    pump_flow,
+    area_conversion
+)
+
+STAGES = ("initial", "development", "mid", "late")
+
+SUMMARY_COLUMNS = [
+    "crop", "soil", "sowing_date", "harvest_date", "season_days",
+    "etc_mm", "eff_rain_mm", "net_irrigation_mm", "gross_irrigation_mm",
+    "water_volume_L", "irrigation_events", "pump_hours", "first_irrigation_date",
+]
+
+
+# ------------------------------------------------------------
+# CROP CURVES
+# ------------------------------------------------------------
+def _stage_bounds(crop):
+    """Cumulative day numbers [0, end_ini, end_dev, end_mid, end_late]."""
+    if crop not in crop_params or crop not in crop_stage_lengths:
+        raise ValueError(f"Crop '{crop}' is not supported in the database.")
+    lengths = [crop_stage_lengths[crop][s] for s in STAGES]
+    if min(lengths) < 0 or sum(lengths) <= 0:
+        raise ValueError(f"Crop '{crop}' has invalid stage lengths {lengths}.")
+    return np.concatenate([[0], np.cumsum(lengths)])
+
+
+def season_length(crop):
+    return int(_stage_bounds(crop)[-1])
+
+
+def kc_curve(crop):
+    """Daily FAO-56 Kc for days 1..season_length (FAO 56 Eq. 66)."""
+    bounds = _stage_bounds(crop)
+    kc = crop_params[crop]["kc"]
+    anchors = [kc["initial"], kc["initial"], kc["mid"], kc["mid"], kc["late"]]
+    return np.interp(np.arange(1, bounds[-1] + 1), bounds, anchors)
+
+
+def root_depth_curve(crop):
+    """Daily root depth (m): initial factor through the initial stage, growing to full depth by the late stage."""
+    bounds = _stage_bounds(crop)
+    f = root_depth_factors
+    anchors = np.array([f["initial"], f["initial"], f["mid"], f["late"], f["late"]])
+    return np.interp(np.arange(1, bounds[-1] + 1), bounds, anchors * crop_params[crop]["Zr_max"])
+
+
+# ------------------------------------------------------------
+# WEATHER
+# ------------------------------------------------------------
+def synthetic_weather(start, days=730, et0_mean=4.5, et0_amplitude=1.5,
+                      annual_rain_mm=900.0, monsoon_peak_doy=205, monsoon_width_days=40, seed=0):
+    """
+    Reproducible synthetic daily weather with a seasonal ET0 cycle and a
+    monsoon-shaped rain distribution (Indian climate by default).
+
+    Returns:
+        pandas.DataFrame: date, et0 (mm/day), rain (mm/day)
+    """
+    rng = np.random.default_rng(seed)
+    dates = pd.date_range(pd.Timestamp(start), periods=days, freq="D")
+    doy = dates.dayofyear.to_numpy()
+
+    et0 = et0_mean + et0_amplitude * np.sin(2 * np.pi * (doy - 80) / 365.0)
+    et0 = np.maximum(et0 * rng.normal(1.0, 0.08, days), 0.0)
+
+    # Rain-day probability follows a Gaussian around the monsoon peak
+    def wet_probability(day_of_year):
+        dist = np.abs(day_of_year - monsoon_peak_doy)
+        dist = np.minimum(dist, 365 - dist)
+        return 0.05 + 0.65 * np.exp(-0.5 * (dist / monsoon_width_days) ** 2)
+
+    wet = rng.random(days) < wet_probability(doy)
+    # Mean event size from the expected rain days of a full calendar year,
+    # so annual_rain_mm holds whatever the series' start and length
+    mean_event = annual_rain_mm / max(wet_probability(np.arange(1, 366)).sum(), 1.0)
+    rain = np.where(wet, rng.exponential(mean_event, days), 0.0)
+
+    return pd.DataFrame({"date": dates.date, "et0": et0, "rain": rain})
+
+
+def _weather_arrays(weather):
+    """Daily frame -> (dates, et0, rain); accepts engine or archive column names."""
+    df = weather.reset_index() if "date" not in weather.columns else weather
+    et0_col = "et0" if "et0" in df.columns else "et0_fao_evapotranspiration"
+    rain_col = "rain" if "rain" in df.columns else "precipitation"
+    dates = pd.to_datetime(df["date"]).dt.date.to_numpy()
+    return dates, df[et0_col].to_numpy(dtype=float), df[rain_col].to_numpy(dtype=float)
+
+
+def _window_index(n_days, offsets, length, wrap):
+    idx = np.asarray(offsets)[:, None] + np.arange(length)[None, :]
+    if wrap:
+        return idx % n_days
+    if idx.size and idx.max() >= n_days:
+        raise ValueError(
+            f"Weather covers {n_days} days; a {length}-day season from the last sowing date needs more "
+            "(pass wrap=True to reuse a climatological year)."
+        )
+    return idx
+
+
+# ------------------------------------------------------------
+# SIMULATION
+# ------------------------------------------------------------
+def _simulate_crop(weather_arrays, crop, soils, sowing_dates, initial_deficit_mm, wrap):
+    """All soils × sowing dates of one crop. Returns per-scenario arrays (soil-major order)."""
+    dates, et0, rain = weather_arrays
+    for soil in soils:
+        if soil not in soil_params:
+            raise ValueError(f"Soil '{soil}' is not supported.")
+
+    position = {d: i for i, d in enumerate(dates)}
+    sowing = [pd.Timestamp(d).date() for d in sowing_dates]
+    missing = [str(d) for d in sowing if d not in position]
+    if missing:
+        raise ValueError(f"Sowing dates outside the weather record: {', '.join(missing[:5])}")
+    offsets = np.array([position[d] for d in sowing], dtype=int)
+
+    length = season_length(crop)
+    idx = _window_index(len(dates), offsets, length, wrap)           # (k, L)
+
+    kc = kc_curve(crop)
+    zr = root_depth_curve(crop)
+    etc = kc[None, :] * et0[idx]                                     # (k, L)
+    eff = effective_rain_usda(rain[idx])
+
+    awc = np.array([soil_params[s]["fc"] - soil_params[s]["pwp"] for s in soils])
+    taw = 1000.0 * awc[:, None, None] * zr[None, None, :]            # (s, 1, L)
+    raw = crop_params[crop]["p"] * taw
+
+    n_soils, k = len(soils), len(sowing)
+    etc_all = np.broadcast_to(etc, (n_soils, k, length)).reshape(-1, length)
+    eff_all = np.broadcast_to(eff, (n_soils, k, length)).reshape(-1, length)
+    raw_all = np.broadcast_to(raw, (n_soils, k, length)).reshape(-1, length)
+    taw_0 = np.broadcast_to(taw[:, :, 0], (n_soils, k)).reshape(-1)
+
+    d0 = np.clip(np.broadcast_to(np.asarray(initial_deficit_mm, dtype=float), taw_0.shape), 0.0, taw_0)
+    deficit, irrigation = irrigated_balance(etc_all, eff_all, raw_all, d0)
+
+    # Calendar days count on from sowing; with wrap only the weather index repeats
+    calendar = np.array(sowing, dtype="datetime64[D]")[:, None] + np.arange(length)
+
+    return {
+        "soil": np.repeat(np.asarray(soils, dtype=object), k),
+        "sowing_date": np.tile(np.asarray(sowing, dtype=object), n_soils),
+        "dates": np.tile(calendar, (n_soils, 1)),                    # datetime64[D]
+        "kc": kc, "zr": zr,
+        "etc": etc_all, "eff_rain": eff_all, "raw": raw_all,
+        "taw": np.broadcast_to(taw, (n_soils, k, length)).reshape(-1, length),
+        "deficit": deficit, "irrigation": irrigation,
+    }
+
+
+def _summarize(crop, sim, area_m2, pump_hp, pump_efficiency, application_efficiency):
+    if pump_hp not in pump_flow:
+        raise ValueError(f"Unknown pump rating '{pump_hp}'.")
+    irrigation = sim["irrigation"]
+    length = irrigation.shape[1]
+
+    net = irrigation.sum(axis=1)
+    gross = net / application_efficiency
+    liters = (gross / 1000.0) * area_m2 * 1000.0
+    effective_flow = pump_flow[pump_hp] * pump_efficiency
+    hours = liters / effective_flow if effective_flow > 0 else np.zeros_like(liters)
+
+    events = irrigation > 0
+    first = np.where(events.any(axis=1), events.argmax(axis=1), -1)
+    dates = sim["dates"]
+    rows = np.arange(len(first))
+
+    return pd.DataFrame({
+        "crop": crop,
+        "soil": sim["soil"],
+        "sowing_date": sim["sowing_date"],
+        "harvest_date": dates[:, -1].astype(object),
+        "season_days": length,
+        "etc_mm": sim["etc"].sum(axis=1).round(1),
+        "eff_rain_mm": sim["eff_rain"].sum(axis=1).round(1),
+        "net_irrigation_mm": net.round(1),
+        "gross_irrigation_mm": gross.round(1),
+        "water_volume_L": liters.round(0),
+        "irrigation_events": events.sum(axis=1),
+        "pump_hours": hours.round(2),
+        "first_irrigation_date": np.where(first >= 0, dates[rows, np.maximum(first, 0)].astype(object), None),
+    }, columns=SUMMARY_COLUMNS)
+
+
+def simulate_season(weather, crop, soils, sowing_dates=None, initial_deficit_mm=0.0,
+                    area_value=1.0, area_unit="acre", pump_hp="5_hp",
+                    pump_efficiency=0.7, application_efficiency=0.7, wrap=False):
+    """
+    Season totals for one crop over every soil × sowing date.
+
+    Args:
+        weather (DataFrame): daily date / et0 / rain (or archive column names).
+        crop (str): crop_params key.
+        soils (str | list): soil_params key(s).
+        sowing_dates (list): dates inside the weather record (default: its first day).
+        initial_deficit_mm (float): depletion at sowing (clipped to TAW).
+        wrap (bool): treat the weather as a repeating year (climatology).
+
+    Returns:
+        pandas.DataFrame: SUMMARY_COLUMNS, one row per (soil, sowing date).
+    """
+    soils = [soils] if isinstance(soils, str) else list(soils)
+    if area_unit not in area_conversion:
+        raise ValueError(f"Unknown area unit '{area_unit}'.")
+    arrays = _weather_arrays(weather)
+    if sowing_dates is None:
+        sowing_dates = [arrays[0][0]]
+
+    sim = _simulate_crop(arrays, crop, soils, sowing_dates, initial_deficit_mm, wrap)
+    return _summarize(crop, sim, area_value * area_conversion[area_unit],
+                      pump_hp, pump_efficiency, application_efficiency)
+
+
+def sweep_seasons(weather, crops, soils, sowing_dates, **kwargs):
+    """
+    simulate_season for every crop (one array batch per crop, since season
+    lengths differ). Extra keyword arguments are passed through.
+
+    Returns:
+        pandas.DataFrame: one row per (crop, soil, sowing date).
+    """
+    crops = [crops] if isinstance(crops, str) else list(crops)
+    frames = [simulate_season(weather, crop, soils, sowing_dates, **kwargs) for crop in crops]
+    return pd.concat(frames, ignore_index=True)
+
+
+def season_timeline(weather, crop, soil, sowing_date, initial_deficit_mm=0.0, wrap=False):
+    """
+    Day-by-day trace of one season: date, kc, root_depth_m, taw_mm, raw_mm,
+    etc_mm, eff_rain_mm, deficit_mm, irrigation_mm.
+    """
+    arrays = _weather_arrays(weather)
+    sim = _simulate_crop(arrays, crop, [soil], [sowing_date], initial_deficit_mm, wrap)
+    return pd.DataFrame({
+        "date": sim["dates"][0].astype(object),
+        "kc": sim["kc"],
+        "root_depth_m": sim["zr"],
+        "taw_mm": sim["taw"][0],
+        "raw_mm": sim["raw"][0],
+        "etc_mm": sim["etc"][0],
+        "eff_rain_mm": sim["eff_rain"][0],
+        "deficit_mm": sim["deficit"][0],
+        "irrigation_mm": sim["irrigation"][0],
+    })
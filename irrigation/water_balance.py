@@ -0,0 +1,196 @@
+"""
+water_balance.py — Vectorized Soil Water Balance Kernels
+--------------------------------------------------------
+Array versions of the FAO-56 daily root-zone depletion recursion and the
+USDA SCS effective-rainfall formula used by irrigation/engine.py.
+
+The depletion recursion
+
+    D[i] = max(0, D[i-1] + ETc[i] - Peff[i]),   D[-1] = D0
+
+is a clipped cumulative sum (Lindley recursion). With S = D0 + cumsum(ETc - Peff):
+
+    D[i] = S[i] - min(0, min(S[0..i]))
+
+so a whole season is one cumsum plus one running minimum. All kernels
+accept 1-D arrays (days) or 2-D arrays (fields × days) and work on plain
+NumPy arrays (no pandas).
+"""
+
+import numpy as np
+
+
+def effective_rain_usda(rain_mm):
+    """
+    USDA Soil Conservation Service effective rainfall, element-wise.
+    P_eff = P * (125 - 0.2 * P) / 125   for 0 < P < 250 mm
+    P_eff = 125 + 0.1 * P               for P >= 250 mm
+    P_eff = 0                           for P <= 0
+
+    Args:
+        rain_mm (array-like): Rainfall (mm), any shape.
+
+    Returns:
+        numpy.ndarray: Effective rainfall (mm), same shape.
+    """
+    p = np.asarray(rain_mm, dtype=float)
+    eff = np.where(p < 250.0, p * (125.0 - 0.2 * p) / 125.0, 125.0 + 0.1 * p)
+    return np.where(p > 0.0, eff, 0.0)
+
+
+def deficit_balance(etc_mm, eff_rain_mm, initial_deficit_mm=0.0):
+    """
+    Daily root-zone depletion for one field (1-D) or many fields (2-D, fields × days).
+
+    Args:
+        etc_mm (array-like): Crop evapotranspiration per day (mm).
+        eff_rain_mm (array-like): Effective rainfall per day (mm), same shape.
+        initial_deficit_mm (float or array-like): Starting depletion;
+            one value per field for 2-D input.
+
+    Returns:
+        tuple: (deficit_start, deficit_end) arrays with the input shape.
+    """
+    etc = np.asarray(etc_mm, dtype=float)
+    rain = np.asarray(eff_rain_mm, dtype=float)
+    net = etc - rain
+
+    d0 = np.asarray(initial_deficit_mm, dtype=float)
+    if net.ndim == 2:
+        d0 = np.broadcast_to(d0, (net.shape[0],))[:, None]
+
+    if net.shape[-1] == 0:
+        empty = np.zeros(net.shape)
+        return empty, empty.copy()
+
+    s = d0 + np.cumsum(net, axis=-1)
+    running_min = np.minimum.accumulate(s, axis=-1)
+    deficit_end = s - np.minimum(running_min, 0.0)
+
+    deficit_start = np.empty_like(deficit_end)
+    deficit_start[..., 0] = d0[..., 0] if net.ndim == 2 else d0
+    deficit_start[..., 1:] = deficit_end[..., :-1]
+    return deficit_start, deficit_end
+
+
+def irrigated_balance(etc_mm, eff_rain_mm, raw_mm, initial_deficit_mm=0.0):
+    """
+    Depletion with "refill to field capacity when depletion reaches RAW"
+    irrigation, for many scenarios at once (scenarios × days).
+
+    The refill resets the recursion, so there is no closed form: the loop
+    runs over days and every step is one vector operation over scenarios.
+
+    Args:
+        etc_mm, eff_rain_mm, raw_mm (array-like): (scenarios, days)
+        initial_deficit_mm (float or array-like): per scenario
+
+    Returns:
+        tuple: (deficit_end, irrigation_mm), both (scenarios, days);
+               deficit_end is after that day's irrigation.
+    """
+    net = np.atleast_2d(np.asarray(etc_mm, dtype=float) - np.asarray(eff_rain_mm, dtype=float))
+    raw = np.broadcast_to(np.asarray(raw_mm, dtype=float), net.shape)
+    n, days = net.shape
+
+    d = np.array(np.broadcast_to(np.asarray(initial_deficit_mm, dtype=float), (n,)))
+    deficit = np.empty((n, days))
+    irrigation = np.zeros((n, days))
+    for t in range(days):
+        d = np.maximum(d + net[:, t], 0.0)
+        trigger = d >= raw[:, t]
+        irrigation[trigger, t] = d[trigger]
+        d[trigger] = 0.0
+        deficit[:, t] = d
+    return deficit, irrigation
+
+
+def stress_flags(deficit_end_mm, raw_mm):
+    """True where depletion reaches Readily Available Water (per field if 2-D)."""
+    deficit = np.asarray(deficit_end_mm, dtype=float)
+    raw = np.asarray(raw_mm, dtype=float)
+    if deficit.ndim == 2 and raw.ndim == 1:
+        raw = raw[:, None]
+    return deficit >= raw
+
+
+def simulate_fields(et0_mm, rain_mm, kc, initial_deficit_mm, raw_mm):
+    """
+    Runs the balance for many fields sharing or not sharing weather.
+
+    Args:
+        et0_mm (array-like): Reference ET, (days,) or (fields, days).
+        rain_mm (array-like): Rainfall, (days,) or (fields, days).
+        kc (float or array-like): Crop coefficient per field (or per field-day).
+        initial_deficit_mm (float or array-like): Per-field starting depletion.
+        raw_mm (float or array-like): Per-field irrigation trigger (RAW).
+
+    Returns:
+        dict: etc, eff_rain, deficit_start, deficit_end, irrigation_needed
+              — each (fields, days).
+    """
+    kc = np.asarray(kc, dtype=float)
+    n_fields = max(np.size(initial_deficit_mm), np.size(raw_mm), kc.shape[0] if kc.ndim else 1)
+
+    et0 = np.atleast_2d(np.asarray(et0_mm, dtype=float))
+    rain = np.atleast_2d(np.asarray(rain_mm, dtype=float))
+    n_fields = max(n_fields, et0.shape[0], rain.shape[0])
+    days = et0.shape[1]
+
+    kc_2d = kc[:, None] if kc.ndim == 1 else kc
+    etc = np.broadcast_to(et0 * kc_2d, (n_fields, days))
+    eff = np.broadcast_to(effective_rain_usda(rain), (n_fields, days))
+
+    d0 = np.broadcast_to(np.asarray(initial_deficit_mm, dtype=float), (n_fields,))
+    raw = np.broadcast_to(np.asarray(raw_mm, dtype=float), (n_fields,))
+    start, end = deficit_balance(etc, eff, d0)
+
+    return {
+        "etc": np.array(etc),
+        "eff_rain": np.array(eff),
+        "deficit_start": start,
+        "deficit_end": end,
+        "irrigation_needed": stress_flags(end, raw),
+    }
+
+
+def forecast_rollout(et0_pred_mm, rain_pred_mm, kc, current_deficit_mm, raw_mm):
+    """
+    Rolls today's depletion forward over predicted weather for many fields
+    or scenarios at once (fields × forecast days). Predicted ETc is clipped
+    at zero, since a regression forecast can dip slightly negative.
+
+    Args:
+        et0_pred_mm (array-like): Predicted ET0, (days,) shared or (fields, days).
+        rain_pred_mm (array-like): Predicted rainfall, same convention.
+        kc (float or array-like): Crop coefficient per field.
+        current_deficit_mm (float or array-like): Depletion today, per field.
+        raw_mm (float or array-like): Irrigation trigger (RAW), per field.
+
+    Returns:
+        dict: etc, eff_rain, deficit, stress — each (fields, days) — and
+              trigger_day, the first stressed day index per field (-1 = none).
+    """
+    et0 = np.atleast_2d(np.asarray(et0_pred_mm, dtype=float))
+    rain = np.atleast_2d(np.asarray(rain_pred_mm, dtype=float))
+    kc = np.atleast_1d(np.asarray(kc, dtype=float))
+    d0 = np.atleast_1d(np.asarray(current_deficit_mm, dtype=float))
+    raw = np.atleast_1d(np.asarray(raw_mm, dtype=float))
+
+    n_fields = max(et0.shape[0], rain.shape[0], kc.size, d0.size, raw.size)
+    shape = (n_fields, et0.shape[1])
+
+    etc = np.maximum(np.broadcast_to(kc[:, None] * et0, shape), 0.0)
+    eff = np.broadcast_to(effective_rain_usda(rain), shape)
+    _, deficit = deficit_balance(etc, eff, np.broadcast_to(d0, (n_fields,)))
+
+    stress = deficit >= np.broadcast_to(raw, (n_fields,))[:, None]
+    trigger_day = np.where(stress.any(axis=1), stress.argmax(axis=1), -1)
+
+    return {
+        "etc": etc,
+        "eff_rain": np.array(eff),
+        "deficit": deficit,
+        "stress": stress,
+        "trigger_day": trigger_day,
+    }
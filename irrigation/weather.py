@@ -11,15 +11,49 @@ Returns:
       • rain  (mm)
 
 This weather source is reproducible and open-access without API key.
+Responses are kept in the on-disk grid-cell cache (irrigation/weather_cache.py);
+set OPEN_METEO_FORECAST_URL to point the live fetcher at a local fixture server.
 """
 
+import os
+
 import requests
 import pandas as pd
 
+from irrigation.weather_cache import get_weather_cache
+
+FORECAST_URL = os.environ.get("OPEN_METEO_FORECAST_URL", "https://api.open-meteo.com/v1/forecast")
+
+
+def weather_url(lat, lon):
+    """Open-Meteo request for hourly ET0 & precipitation at (lat, lon)."""
+    return (
+        f"{FORECAST_URL}?"
+        f"latitude={lat}&longitude={lon}"
+        "&hourly=et0_fao_evapotranspiration,precipitation"
+        "&timezone=auto"
+    )
+
+
+def parse_weather(data):
+    """Open-Meteo JSON -> hourly frame (time, et0, rain)."""
+    if "hourly" not in data:
+        raise RuntimeError("Weather API returned invalid format.")
+
+    hourly = data["hourly"]
+
+    df = pd.DataFrame({
+        "time": hourly["time"],
+        "et0": hourly["et0_fao_evapotranspiration"],  # mm/hour
+        "rain": hourly["precipitation"]               # mm
+    })
+
+    return df
+
 
-def fetch_weather(lat, lon):
+def fetch_weather_live(lat, lon):
     """
-    Fetch hourly FAO-56 ET0 & precipitation from Open-Meteo.
+    Fetch hourly FAO-56 ET0 & precipitation from Open-Meteo (no cache).
 
     Args:
         lat (float): Latitude
@@ -32,29 +66,29 @@ def fetch_weather(lat, lon):
         RuntimeError: If weather API fails
     """
 
-    url = (
-        f"https://api.open-meteo.com/v1/forecast?"
-        f"latitude={lat}&longitude={lon}"
-        "&hourly=et0_fao_evapotranspiration,precipitation"
-        "&timezone=auto"
-    )
-
     try:
-        response = requests.get(url, timeout=10)
+        response = requests.get(weather_url(lat, lon), timeout=10)
         response.raise_for_status()
         data = response.json()
     except Exception as e:
         raise RuntimeError(f"Failed to fetch weather data: {e}")
 
-    if "hourly" not in data:
-        raise RuntimeError("Weather API returned invalid format.")
+    return parse_weather(data)
 
-    hourly = data["hourly"]
 
-    df = pd.DataFrame({
-        "time": hourly["time"],
-        "et0": hourly["et0_fao_evapotranspiration"],  # mm/hour
-        "rain": hourly["precipitation"]               # mm
-    })
+def fetch_weather(lat, lon, fetcher=fetch_weather_live, cache=None):
+    """
+    Hourly weather for the grid cell containing (lat, lon), served from the
+    persistent weather cache when fresh.
 
-    return df
+    Args:
+        lat (float): Latitude
+        lon (float): Longitude
+        fetcher (callable): (lat, lon) -> hourly frame, called on a cache miss
+        cache (WeatherCache): Defaults to the shared, environment-configured cache
+
+    Returns:
+        pandas.DataFrame: Hourly weather data (time, et0, rain)
+    """
+    cache = cache or get_weather_cache()
+    return cache.get_or_fetch("hourly", lat, lon, fetcher)
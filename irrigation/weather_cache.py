@@ -0,0 +1,237 @@
+"""
+weather_cache.py — Persistent Grid-Cell Weather Cache
+-----------------------------------------------------
+Keeps Open-Meteo responses on local disk so repeated irrigation plans for
+nearby plots do not hit the network.
+
+  • Coordinates are snapped to a weather grid (default 0.1°, about the
+    resolution of the Open-Meteo models), so neighbouring plots share one entry.
+  • Frames are stored column-wise (one NumPy array per column, .npz blob)
+    in a single SQLite file — no server, no extra dependency.
+  • Entries expire after a TTL; the least recently used entries are evicted
+    once the store grows past a size limit.
+  • The fetcher is pluggable: any callable (lat, lon) -> DataFrame, e.g. a
+    client pointed at a local fixture server for tests and offline runs.
+
+Configuration (environment):
+  SMARTFARMER_WEATHER_CACHE      SQLite file path (default ~/.cache/smart-farmer/weather.sqlite)
+  SMARTFARMER_WEATHER_CACHE_TTL  Seconds before an entry is refetched (default 3600, 0 = never expire)
+"""
+
+import io
+import os
+import sqlite3
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_GRID_DEG = 0.1
+DEFAULT_TTL_SECONDS = 3600
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+DEFAULT_CACHE_PATH = os.path.join(
+    os.path.expanduser("~"), ".cache", "smart-farmer", "weather.sqlite"
+)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS frames (
+    key         TEXT PRIMARY KEY,
+    fetched_at  REAL NOT NULL,
+    last_access REAL NOT NULL,
+    nbytes      INTEGER NOT NULL,
+    payload     BLOB NOT NULL
+)
+"""
+
+
+def grid_cell(lat, lon, grid_deg=DEFAULT_GRID_DEG):
+    """Snaps a coordinate to the centre of its weather grid cell."""
+    return (
+        round(round(float(lat) / grid_deg) * grid_deg, 6),
+        round(round(float(lon) / grid_deg) * grid_deg, 6),
+    )
+
+
+# ------------------------------------------------------------
+# COLUMNAR SERIALIZATION
+# ------------------------------------------------------------
+def frame_to_bytes(df):
+    """DataFrame -> .npz bytes, one array per column (column order kept)."""
+    buf = io.BytesIO()
+    arrays = {}
+    for i, col in enumerate(df.columns):
+        values = df[col].to_numpy()
+        if values.dtype == object:
+            try:
+                values = pd.to_numeric(df[col]).to_numpy(dtype=float)
+            except (TypeError, ValueError):
+                values = values.astype(str)
+        elif not np.issubdtype(values.dtype, np.number):
+            values = values.astype(str)
+        arrays[f"{i:04d}_{col}"] = values
+    np.savez(buf, **arrays)
+    return buf.getvalue()
+
+
+def frame_from_bytes(blob):
+    """Inverse of frame_to_bytes."""
+    with np.load(io.BytesIO(blob), allow_pickle=False) as npz:
+        names = sorted(npz.files)
+        return pd.DataFrame({name.split("_", 1)[1]: npz[name] for name in names})
+
+
+# ------------------------------------------------------------
+# CACHE
+# ------------------------------------------------------------
+class WeatherCache:
+    """
+    SQLite-backed TTL + LRU cache of weather frames keyed by grid cell.
+
+    Safe to share between threads; several processes can use the same file
+    (SQLite WAL mode).
+    """
+
+    def __init__(self, path=None, grid_deg=DEFAULT_GRID_DEG,
+                 ttl_seconds=DEFAULT_TTL_SECONDS, max_bytes=DEFAULT_MAX_BYTES):
+        self.path = path or DEFAULT_CACHE_PATH
+        self.grid_deg = grid_deg
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        if self.path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, timeout=30)
+        if self.path != ":memory:":
+            self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(_SCHEMA)
+        self._conn.commit()
+
+    def key(self, kind, lat, lon, **params):
+        """'kind:lat:lon[:k=v...]' for the grid cell containing (lat, lon)."""
+        cell_lat, cell_lon = grid_cell(lat, lon, self.grid_deg)
+        extra = "".join(f":{k}={params[k]}" for k in sorted(params))
+        return f"{kind}:{cell_lat:.6f}:{cell_lon:.6f}{extra}"
+
+    # --------------------------------------------------------
+    def get(self, key):
+        """Cached frame for `key`, or None if absent or expired."""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT fetched_at, payload FROM frames WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            fetched_at, payload = row
+            if self.ttl_seconds and now - fetched_at > self.ttl_seconds:
+                self._conn.execute("DELETE FROM frames WHERE key = ?", (key,))
+                self._conn.commit()
+                return None
+            self._conn.execute("UPDATE frames SET last_access = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+        return frame_from_bytes(payload)
+
+    def contains(self, key):
+        """True if a fresh entry exists (does not count as an access)."""
+        with self._lock:
+            row = self._conn.execute("SELECT fetched_at FROM frames WHERE key = ?", (key,)).fetchone()
+        return row is not None and not (self.ttl_seconds and time.time() - row[0] > self.ttl_seconds)
+
+    def put(self, key, df):
+        blob = frame_to_bytes(df)
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO frames (key, fetched_at, last_access, nbytes, payload) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (key, now, now, len(blob), sqlite3.Binary(blob)),
+            )
+            self._evict(now)
+            self._conn.commit()
+
+    def _evict(self, now):
+        """Drops expired entries, then least recently used ones above max_bytes."""
+        if self.ttl_seconds:
+            self._conn.execute("DELETE FROM frames WHERE fetched_at < ?", (now - self.ttl_seconds,))
+        if not self.max_bytes:
+            return
+        total = self._conn.execute("SELECT COALESCE(SUM(nbytes), 0) FROM frames").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for key, nbytes in self._conn.execute(
+            "SELECT key, nbytes FROM frames ORDER BY last_access ASC"
+        ).fetchall():
+            self._conn.execute("DELETE FROM frames WHERE key = ?", (key,))
+            total -= nbytes
+            if total <= self.max_bytes:
+                break
+
+    # --------------------------------------------------------
+    def get_or_fetch(self, kind, lat, lon, fetcher, **params):
+        """
+        Cached frame for the grid cell of (lat, lon); on a miss calls
+        fetcher(cell_lat, cell_lon, **params) and stores the result.
+        Fetcher errors propagate and are not cached.
+        """
+        key = self.key(kind, lat, lon, **params)
+        df = self.get(key)
+        if df is not None:
+            self.hits += 1
+            return df
+
+        self.misses += 1
+        cell_lat, cell_lon = grid_cell(lat, lon, self.grid_deg)
+        df = fetcher(cell_lat, cell_lon, **params)
+        if df is not None and not df.empty:
+            self.put(key, df)
+        return df
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM frames")
+            self._conn.commit()
+        self.hits = self.misses = 0
+
+    def info(self):
+        with self._lock:
+            entries, total = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(nbytes), 0) FROM frames"
+            ).fetchone()
+        return {"entries": entries, "bytes": total, "hits": self.hits, "misses": self.misses,
+                "ttl_seconds": self.ttl_seconds, "max_bytes": self.max_bytes, "path": self.path}
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+# ------------------------------------------------------------
+# PROCESS-WIDE DEFAULT
+# ------------------------------------------------------------
+_DEFAULT_CACHE = None
+_DEFAULT_LOCK = threading.Lock()
+
+
+def get_weather_cache():
+    """Shared WeatherCache configured from the environment (created on first use)."""
+    global _DEFAULT_CACHE
+    if _DEFAULT_CACHE is None:
+        with _DEFAULT_LOCK:
+            if _DEFAULT_CACHE is None:
+                _DEFAULT_CACHE = WeatherCache(
+                    path=os.environ.get("SMARTFARMER_WEATHER_CACHE") or None,
+                    ttl_seconds=float(os.environ.get("SMARTFARMER_WEATHER_CACHE_TTL", DEFAULT_TTL_SECONDS)),
+                )
+    return _DEFAULT_CACHE
+
+
+def set_weather_cache(cache):
+    """Replaces the shared cache (e.g. WeatherCache(':memory:') in tests)."""
+    global _DEFAULT_CACHE
+    with _DEFAULT_LOCK:
+        _DEFAULT_CACHE = cache
@@ -1,12 +1,11 @@
 import streamlit as st
-from PIL import Image
-import base64
-from io import BytesIO
 
 from utils.theme import load_theme
 from utils.sidebar import render_sidebar
 from utils.language import get_text
-from router import predict_type
+from router import predict_type, load_router
+from utils.image_handoff import load_upload, model_input
+from utils.model_registry import get_model_registry
 
 # ----------------------------------------------------
 # LOAD THEME + SIDEBAR (Handles global language state)
@@ -33,6 +32,13 @@ st.markdown(f"""
 </div>
 """, unsafe_allow_html=True)
 
+# Classifier page per routed image type (anything else is background)
+ROUTES = {
+    "leaf": "pages/Plant_Disease.py",
+    "fruit": "pages/Fruit_Classification.py",
+    "pest": "pages/Pest_Detection.py",
+}
+
 # ----------------------------------------------------
 # SESSION VARIABLES
 # ----------------------------------------------------
@@ -40,6 +46,10 @@ st.session_state.setdefault("router_image", None)
 st.session_state.setdefault("processed_image", None)
 st.session_state.setdefault("from_router", False)
 
+# Load the router in the background while the user picks a photo
+if not get_model_registry().loaded("router"):
+    get_model_registry().warm_async(["router"])
+
 # ----------------------------------------------------
 # IMAGE INPUT
 # ----------------------------------------------------
@@ -55,9 +65,11 @@ elif file_input:
 # LOAD IMAGE
 # ----------------------------------------------------
 img = None
+img_key = None
 if st.session_state.router_image:
     try:
-        img = Image.open(st.session_state.router_image).convert("RGB")
+        # Decoded once per content; the target page reuses it by key
+        img_key, img = load_upload(st.session_state.router_image)
     except:
         st.error(tr("invalid_img"))
         st.session_state.router_image = None
@@ -73,7 +85,8 @@ if img:
 
         st.info(tr("processing"))
 
-        img_type, conf = predict_type(img)
+        # Router input resized once and kept for a classifier of the same size
+        img_type, conf = predict_type(model_input(img_key, load_router().input_size))
         img_type = img_type.lower().strip()
 
         # show predicted type
@@ -83,27 +96,16 @@ if img:
             st.warning(tr("low_conf"))
             st.stop()
 
-        # Encode image to pass to next page
-        buffer = BytesIO()
-        img.save(buffer, format="JPEG")
-        encoded = base64.b64encode(buffer.getvalue()).decode("utf-8")
-
-        st.session_state.processed_image = encoded
-        st.session_state.from_router = True
-
         # ROUTING
-        if img_type == "leaf":
-            st.switch_page("pages/Plant_Disease.py")
-
-        elif img_type == "fruit":
-            st.switch_page("pages/Fruit_Classification.py")
-
-        elif img_type == "pest":
-            st.switch_page("pages/Pest_Detection.py")
-
-        else:
+        target = ROUTES.get(img_type)
+        if target is None:
             st.error(tr("background_msg"))
             st.stop()
 
+        # Hand the decoded image to the next page by content key
+        st.session_state.processed_image = img_key
+        st.session_state.from_router = True
+        st.switch_page(target)
+
 else:
     st.info(tr("upload"))
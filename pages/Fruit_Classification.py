@@ -4,13 +4,8 @@ from utils.sidebar import render_sidebar
 from utils.language import get_text
 from utils.result_box import show_result
 from utils.loading import fancy_loader
-
-from PIL import Image
-import numpy as np
-import tensorflow as tf
-import json
-import base64
-from io import BytesIO
+from utils.model_registry import get_model
+from utils.image_handoff import load_upload, model_input, get_image
 
 
 # ----------------------------------------------------
@@ -27,22 +22,18 @@ tr = lambda k: T.get(k, k)
 # ----------------------------------------------------
 # ROUTER STATE CLEANUP
 # ----------------------------------------------------
-if not st.session_state.get("from_router", False):
+routed = st.session_state.get("from_router", False)
+if not routed:
     st.session_state.processed_image = None
 else:
     st.session_state.from_router = False
 
 
 # ----------------------------------------------------
-# RESTORE ROUTED IMAGE
+# RESTORE ROUTED IMAGE (decoded once, by content key)
 # ----------------------------------------------------
-uploaded_img = None
-if st.session_state.get("processed_image"):
-    try:
-        decoded = base64.b64decode(st.session_state["processed_image"])
-        uploaded_img = Image.open(BytesIO(decoded)).convert("RGB")
-    except:
-        uploaded_img = None
+routed_key = st.session_state.get("processed_image")
+uploaded_img = get_image(routed_key)
 
 
 # ----------------------------------------------------
@@ -57,23 +48,10 @@ st.markdown(f"""
 
 
 # ----------------------------------------------------
-# LOAD MODEL
+# MODEL (loaded on first prediction, shared across sessions)
 # ----------------------------------------------------
-@st.cache_resource
 def load_fruit_model():
-    interpreter = tf.lite.Interpreter(model_path="models/fruit_model.tflite")
-    interpreter.allocate_tensors()
-
-    with open("models/fruit_class_names.json", "r") as f:
-        classes = json.load(f)
-
-    inp = interpreter.get_input_details()[0]["index"]
-    out = interpreter.get_output_details()[0]["index"]
-    size = interpreter.get_input_details()[0]["shape"][1:3]
-
-    return interpreter, inp, out, size, classes
-
-interpreter, inp_idx, out_idx, IMG_SIZE, CLASS_NAMES = load_fruit_model()
+    return get_model("fruit")
 
 
 # ----------------------------------------------------
@@ -81,27 +59,21 @@ interpreter, inp_idx, out_idx, IMG_SIZE, CLASS_NAMES = load_fruit_model()
 # ----------------------------------------------------
 def load_uploaded_image(file):
     try:
-        return Image.open(BytesIO(file.read())).convert("RGB")
+        return load_upload(file)
     except:
         st.error(tr("invalid_fruit_image"))
-        return None
+        return None, None
 
 
 # ----------------------------------------------------
 # PREDICT FRUIT
 # ----------------------------------------------------
-def predict_fruit(img):
-    img = img.resize(IMG_SIZE)
-    arr = np.array(img, dtype=np.float32) / 255.0
-    arr = arr[np.newaxis, ...]
-
-    interpreter.set_tensor(inp_idx, arr)
-    interpreter.invoke()
-
-    pred = interpreter.get_tensor(out_idx)[0]
-    idx = int(np.argmax(pred))
-
-    return CLASS_NAMES[idx], float(pred[idx])
+def predict_fruit(img, key=None):
+    # Single-image case of the batched classifier (utils/model_registry.py);
+    # with a handoff key the cached resized input is reused
+    model = load_fruit_model()
+    src = model_input(key, model.input_size) if key else None
+    return model.classify_batch([src if src is not None else img], batch_size=1)[0]
 
 
 # ----------------------------------------------------
@@ -110,10 +82,13 @@ def predict_fruit(img):
 file = st.file_uploader(tr("upload"), type=["jpg", "jpeg", "png"])
 cam  = st.camera_input(tr("capture"))
 
-img = uploaded_img or (Image.open(cam).convert("RGB") if cam else None)
+img, img_key = uploaded_img, routed_key
+
+if not img and cam:
+    img_key, img = load_uploaded_image(cam)
 
 if not img and file:
-    img = load_uploaded_image(file)
+    img_key, img = load_uploaded_image(file)
 
 
 # ----------------------------------------------------
@@ -122,11 +97,12 @@ if not img and file:
 if img:
     st.image(img, use_container_width=True)
 
-    if st.button(tr("classify"), use_container_width=True):
+    # Routed images go straight into the model
+    if (routed and uploaded_img) or st.button(tr("classify"), use_container_width=True):
 
         fancy_loader(tr("fruit_loading"))
 
-        label, conf = predict_fruit(img)
+        label, conf = predict_fruit(img, img_key)
 
         translated = T.get("fruit_classes", {}).get(label, label)
 
@@ -1,9 +1,6 @@
 import streamlit as st
 import cv2
 import numpy as np
-from ultralytics import YOLO
-from PIL import Image
-import pandas as pd
 from io import BytesIO
 
 from utils.theme import load_theme
@@ -12,6 +9,8 @@ from utils.sidebar import render_sidebar
 from utils.result_box import show_result
 from utils.draw_boxes import draw_yolo_boxes
 from utils.loading import fancy_loader
+from utils.model_registry import get_model
+from utils.image_handoff import load_upload, get_image
 
 
 # ====================================================
@@ -42,16 +41,23 @@ st.markdown(
 
 
 # ====================================================
-# LOAD YOLO MODEL
+# YOLO MODEL (loaded on first detection, shared across sessions)
 # ====================================================
-@st.cache_resource
 def load_pest_model():
-    model = YOLO("models/pest_model.pt")
-    df = pd.read_csv("models/pest_classes.csv")
-    class_map = dict(zip(df["new_id"], df["class_name"]))
-    return model, class_map
+    return get_model("pest")
 
-model, CLASS_MAP = load_pest_model()
+
+# ====================================================
+# ROUTED IMAGE (decoded once by the Auto Routing page)
+# Consumed before live mode, whose st.stop() ends the run
+# ====================================================
+routed = st.session_state.get("from_router", False)
+if not routed:
+    st.session_state.processed_image = None
+else:
+    st.session_state.from_router = False
+
+img = get_image(st.session_state.get("processed_image"))
 
 
 # ====================================================
@@ -78,6 +84,8 @@ elif not live_mode and st.session_state.live_running:
 # ====================================================
 if st.session_state.live_running:
 
+    model, CLASS_MAP = load_pest_model()
+
     FRAME_WINDOW = st.image([])
     st.warning("")
 
@@ -128,13 +136,11 @@ if st.session_state.live_running:
 file = st.file_uploader(tr("upload"), type=["jpg", "jpeg", "png"])
 cam = st.camera_input(tr("capture"))
 
-img = None
-
-if cam:
-    img = Image.open(cam).convert("RGB")
-elif file:
+if img is None and cam:
+    _, img = load_upload(cam)
+elif img is None and file:
     try:
-        img = Image.open(file).convert("RGB")
+        _, img = load_upload(file)
     except:
         st.error("Invalid image")
 
@@ -142,9 +148,11 @@ elif file:
 if img:
     st.image(img, width="stretch")
 
-    if st.button(tr("detect"), use_container_width=True):
+    # Routed images go straight into the model
+    if (routed and img is not None) or st.button(tr("detect"), use_container_width=True):
         fancy_loader(tr("pest_loading"))
 
+        model, CLASS_MAP = load_pest_model()
         results = model(img, conf=0.45, imgsz=640, verbose=False)
         r = results[0]
         boxes = r.boxes
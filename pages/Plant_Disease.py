@@ -1,10 +1,4 @@
 import streamlit as st
-from PIL import Image
-import numpy as np
-import tensorflow as tf
-import pandas as pd
-import base64
-from io import BytesIO
 
 # ====================================================
 # MUST BE FIRST
@@ -16,6 +10,8 @@ from utils.sidebar import render_sidebar
 from utils.language import get_text
 from utils.result_box import show_result
 from utils.loading import fancy_loader
+from utils.model_registry import get_model
+from utils.image_handoff import load_upload, model_input, get_image
 
 
 # ====================================================
@@ -38,22 +34,18 @@ tr = lambda k: T.get(k, k)
 # ====================================================
 # ROUTER CLEANUP
 # ====================================================
-if not st.session_state.get("from_router", False):
+routed = st.session_state.get("from_router", False)
+if not routed:
     st.session_state.processed_image = None
 else:
     st.session_state.from_router = False
 
 
 # ====================================================
-# RESTORE ROUTER IMAGE
+# RESTORE ROUTER IMAGE (decoded once, by content key)
 # ====================================================
-uploaded_img = None
-if st.session_state.get("processed_image"):
-    try:
-        decoded = base64.b64decode(st.session_state["processed_image"])
-        uploaded_img = Image.open(BytesIO(decoded)).convert("RGB")
-    except:
-        uploaded_img = None
+routed_key = st.session_state.get("processed_image")
+uploaded_img = get_image(routed_key)
 
 
 # ====================================================
@@ -68,24 +60,10 @@ st.markdown(f"""
 
 
 # ====================================================
-# LOAD MODEL
+# MODEL (loaded on first prediction, shared across sessions)
 # ====================================================
-@st.cache_resource
 def load_plant_disease_model():
-    df = pd.read_csv("models/Plant Village Disease-class_dict.csv")
-    class_map = {int(i): c for i, c in zip(df["class_index"], df["class"])}
-
-    inter = tf.lite.Interpreter(model_path="models/plant_desease.tflite")
-    inter.allocate_tensors()
-
-    inp = inter.get_input_details()[0]["index"]
-    out = inter.get_output_details()[0]["index"]
-    size = (224, 224)
-
-    return inter, inp, out, size, class_map
-
-
-inter, inp_idx, out_idx, IMG_SIZE, CLASS_MAP = load_plant_disease_model()
+    return get_model("disease")
 
 
 # ====================================================
@@ -93,26 +71,21 @@ inter, inp_idx, out_idx, IMG_SIZE, CLASS_MAP = load_plant_disease_model()
 # ====================================================
 def safe_load_image(file):
     try:
-        return Image.open(file).convert("RGB")
+        return load_upload(file)
     except:
         st.error(tr("invalid_img"))
-        return None
+        return None, None
 
 
 # ====================================================
 # PREDICTION
 # ====================================================
-def predict(img):
-    img = img.resize(IMG_SIZE)
-    arr = np.array(img, dtype=np.float32) / 255.0
-    arr = arr[np.newaxis, ...]
-
-    inter.set_tensor(inp_idx, arr)
-    inter.invoke()
-
-    pred = inter.get_tensor(out_idx)[0]
-    idx = int(np.argmax(pred))
-    return CLASS_MAP[idx], float(pred[idx])
+def predict(img, key=None):
+    # Single-image case of the batched classifier (utils/model_registry.py);
+    # with a handoff key the cached resized input is reused
+    model = load_plant_disease_model()
+    src = model_input(key, model.input_size) if key else None
+    return model.classify_batch([src if src is not None else img], batch_size=1)[0]
 
 
 # ====================================================
@@ -121,14 +94,13 @@ def predict(img):
 file = st.file_uploader(tr("upload"), type=["jpg","jpeg","png"])
 cam  = st.camera_input(tr("capture"))
 
-img = (
-    uploaded_img
-    if uploaded_img else
-    (Image.open(cam).convert("RGB") if cam else None)
-)
+img, img_key = uploaded_img, routed_key
+
+if not img and cam:
+    img_key, img = safe_load_image(cam)
 
 if not img and file:
-    img = safe_load_image(file)
+    img_key, img = safe_load_image(file)
 
 
 # ====================================================
@@ -137,11 +109,12 @@ if not img and file:
 if img:
     st.image(img, use_container_width=True)
 
-    if st.button(tr("analyze"), use_container_width=True):
+    # Routed images go straight into the model
+    if (routed and uploaded_img) or st.button(tr("analyze"), use_container_width=True):
 
         fancy_loader(tr("processing_image"))
 
-        label, conf = predict(img)
+        label, conf = predict(img, img_key)
 
         translated = T.get("disease_classes", {}).get(label, label)
 
@@ -1,40 +1,14 @@
-import numpy as np
 from PIL import Image
-import tensorflow as tf
 
-# ----------------------------------------------------
-# LOAD ROUTER MODEL SAFELY (cached)
-# ----------------------------------------------------
-def load_router():
-    inter = tf.lite.Interpreter(model_path="models/router_model.tflite")
-    inter.allocate_tensors()
-
-    inp = inter.get_input_details()[0]["index"]
-    out = inter.get_output_details()[0]["index"]
-    size = inter.get_input_details()[0]["shape"][1:3]
-
-    return inter, inp, out, tuple(size)
-
-router_inter, router_inp, router_out, ROUTER_IMG_SIZE = load_router()
+from utils.model_registry import get_model, DEFAULT_BATCH_SIZE
 
 # ----------------------------------------------------
-# CLASS NAMES (must match training dataset)
+# ROUTER MODEL (loaded on first use, see utils/model_registry.py)
 # ----------------------------------------------------
-ROUTER_CLASSES = {
-    0: "background",
-    1: "fruit",
-    2: "leaf",
-    3: "pest"
-}
+def load_router():
+    return get_model("router")
 
-# ----------------------------------------------------
-# PREPROCESS
-# ----------------------------------------------------
-def preprocess_router(img: Image.Image):
-    img_resized = img.resize(ROUTER_IMG_SIZE)
-    arr = np.array(img_resized, dtype=np.float32) / 255.0
-    arr = np.expand_dims(arr, axis=0)
-    return arr
+# Class names come from models/router_class_map.json (load_router_model)
 
 # ----------------------------------------------------
 # PREDICT TYPE FUNCTION (CALLED FROM AUTO ROUTER PAGE)
@@ -45,14 +19,15 @@ def predict_type(img: Image.Image):
     type_name = 'leaf' / 'pest' / 'fruit' / 'background'
     """
 
-    arr = preprocess_router(img)
-
-    router_inter.set_tensor(router_inp, arr)
-    router_inter.invoke()
-
-    pred = router_inter.get_tensor(router_out)[0]
-
-    idx = int(np.argmax(pred))
-    conf = float(pred[idx])
+    # Single-image case of predict_types: pixels go straight into the input tensor
+    return predict_types([img], batch_size=1)[0]
 
-    return ROUTER_CLASSES[idx], conf
+# ----------------------------------------------------
+# BATCH VERSION (folders of photos, bulk routing)
+# ----------------------------------------------------
+def predict_types(images, batch_size=DEFAULT_BATCH_SIZE):
+    """
+    predict_type for many images, batch_size images per interpreter invoke.
+    Returns: list of (type_name, confidence) in input order.
+    """
+    return load_router().classify_batch(images, batch_size)
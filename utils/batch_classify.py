@@ -0,0 +1,99 @@
+"""
+batch_classify.py — Folder Classification
+-----------------------------------------
+Classifies a folder of photos (e.g. an extension officer's field visit)
+with the batched TFLite path: one interpreter invoke per batch of images
+instead of one per photo. Images are decoded lazily, one batch at a time,
+at the model's input size.
+
+  model = "disease" | "fruit" | "router"   one classifier for every photo
+  model = "auto"                            route first, then classify leaf
+                                            photos as disease, fruit as fruit
+
+CLI:
+  python -m utils.batch_classify photos/ --model auto --out results.csv
+"""
+
+import argparse
+import os
+
+import pandas as pd
+from PIL import Image
+
+from utils.model_registry import get_model, DEFAULT_BATCH_SIZE
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png")
+
+# Router type -> classifier for model="auto"
+ROUTE_TARGETS = {"leaf": "disease", "fruit": "fruit"}
+
+RESULT_COLUMNS = ["file", "type", "type_confidence", "label", "confidence", "error"]
+
+
+def list_images(folder):
+    return sorted(
+        os.path.join(root, name)
+        for root, _, files in os.walk(folder)
+        for name in files
+        if name.lower().endswith(IMAGE_EXTENSIONS)
+    )
+
+
+def _classify_paths(model_name, paths, batch_size):
+    # Paths go straight to the model: JPEGs are decoded at input size
+    return get_model(model_name).classify_batch(paths, batch_size)
+
+
+def classify_files(paths, model="auto", batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Returns:
+        pandas.DataFrame: RESULT_COLUMNS, one row per file in input order.
+        type / type_confidence are filled by the router (model="auto" or
+        "router"); unreadable files carry a message in 'error'.
+    """
+    rows = {p: {"file": p, "error": None} for p in paths}
+
+    readable = []
+    for p in paths:
+        try:
+            with Image.open(p) as img:
+                img.verify()
+            readable.append(p)
+        except Exception as e:
+            rows[p]["error"] = f"Invalid image: {e}"
+
+    if model in ("auto", "router"):
+        for p, (kind, conf) in zip(readable, _classify_paths("router", readable, batch_size)):
+            rows[p].update(type=kind, type_confidence=round(conf, 4))
+
+    if model == "auto":
+        for kind, target in ROUTE_TARGETS.items():
+            group = [p for p in readable if rows[p].get("type") == kind]
+            for p, (label, conf) in zip(group, _classify_paths(target, group, batch_size)):
+                rows[p].update(label=label, confidence=round(conf, 4))
+    elif model != "router":
+        for p, (label, conf) in zip(readable, _classify_paths(model, readable, batch_size)):
+            rows[p].update(label=label, confidence=round(conf, 4))
+
+    return pd.DataFrame([rows[p] for p in paths], columns=RESULT_COLUMNS)
+
+
+def classify_folder(folder, model="auto", batch_size=DEFAULT_BATCH_SIZE):
+    """classify_files for every jpg / jpeg / png below `folder`."""
+    return classify_files(list_images(folder), model, batch_size)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Classify a folder of crop photos in batches")
+    parser.add_argument("folder")
+    parser.add_argument("--model", default="auto", choices=["auto", "router", "disease", "fruit"])
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument("--out", help="CSV output path (default: print)")
+    args = parser.parse_args()
+
+    result = classify_folder(args.folder, args.model, args.batch_size)
+    if args.out:
+        result.to_csv(args.out, index=False)
+        print(f"✅ {len(result)} images -> {args.out}")
+    else:
+        print(result.to_string(index=False))
@@ -0,0 +1,79 @@
+import hashlib
+
+import streamlit as st
+
+from utils.preprocess import decode_image, load_resized
+
+# ----------------------------------------------------
+# SESSION IMAGE CACHE (router -> classifier handoff)
+# ----------------------------------------------------
+# Decoded uploads live in st.session_state keyed by a hash of the file
+# bytes. The router stores the decoded RGB image (and its resized input);
+# the target page looks it up by key instead of base64-decoding and
+# re-decoding a re-encoded JPEG. Reruns of the same upload reuse the decode.
+
+HANDOFF_STATE = "image_handoff"
+
+# Entries kept per session (least recently used dropped first)
+MAX_ENTRIES = 4
+
+
+def content_key(data):
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+def _entries():
+    return st.session_state.setdefault(HANDOFF_STATE, {})
+
+
+def get_entry(key):
+    """Cached entry ({"image", "inputs", ...}) for a content key, or None."""
+    if not key:
+        return None
+    entries = _entries()
+    entry = entries.pop(key, None)
+    if entry is not None:
+        entries[key] = entry          # mark as most recently used
+    return entry
+
+
+def put_entry(key, image, **extra):
+    entries = _entries()
+    entries.pop(key, None)
+    entries[key] = {"image": image, "inputs": {}, **extra}
+    while len(entries) > MAX_ENTRIES:
+        entries.pop(next(iter(entries)))
+    return entries[key]
+
+
+def load_upload(upload):
+    """
+    (key, RGB PIL image) for a Streamlit upload or camera frame; the bytes
+    are decoded once per session and content.
+    """
+    data = upload.getvalue()
+    key = content_key(data)
+    entry = get_entry(key)
+    if entry is None:
+        entry = put_entry(key, decode_image(data))
+    return key, entry["image"]
+
+
+def model_input(key, size):
+    """
+    The cached image resized to a model's (width, height) input; computed
+    once per size, so a classifier with the router's input size reuses the
+    router's resized image.
+    """
+    entry = get_entry(key)
+    if entry is None:
+        return None
+    size = tuple(size)
+    if size not in entry["inputs"]:
+        entry["inputs"][size] = load_resized(entry["image"], size)
+    return entry["inputs"][size]
+
+
+def get_image(key):
+    entry = get_entry(key)
+    return entry["image"] if entry is not None else None
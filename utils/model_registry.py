@@ -0,0 +1,404 @@
+"""
+model_registry.py — Lazy Image Model Registry
+---------------------------------------------
+The router, plant disease, fruit and pest models are loaded on first use
+instead of at import, so pages (and scripts) that never classify an image
+never import TensorFlow / Ultralytics or allocate tensors.
+
+  • get_model(name) loads once per process; concurrent first calls for the
+    same model wait for one load (per-model lock), other models load freely.
+  • warm(names) pre-loads explicitly (e.g. from a background thread).
+  • info() reports per-model load time and memory (process RSS growth
+    during the load, plus the model file size) and, for TFLite models,
+    interpreter pool usage and queue waits.
+  • TFLite models keep a bounded pool of interpreters, so concurrent
+    sessions run in parallel instead of racing on one shared interpreter.
+
+Configuration (environment):
+  SMARTFARMER_TFLITE_POOL_SIZE   Interpreters per model (default min(4, CPUs))
+  SMARTFARMER_TFLITE_THREADS     num_threads per interpreter (default CPUs / pool size)
+
+CLI (pre-warm and print the report):
+  python -m utils.model_registry router disease
+"""
+
+import argparse
+import contextlib
+import itertools
+import json
+import os
+import queue
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from utils.preprocess import load_resized, write_input
+
+MODEL_DIR = "models"
+
+ROUTER_MODEL = os.path.join(MODEL_DIR, "router_model.tflite")
+DISEASE_MODEL = os.path.join(MODEL_DIR, "plant_desease.tflite")
+FRUIT_MODEL = os.path.join(MODEL_DIR, "fruit_model.tflite")
+PEST_MODEL = os.path.join(MODEL_DIR, "pest_model.pt")
+
+# Images per invoke in classify_batch
+DEFAULT_BATCH_SIZE = 32
+
+# Interpreters per TFLite model (concurrent inferences) and threads per interpreter
+DEFAULT_POOL_SIZE = int(os.environ.get("SMARTFARMER_TFLITE_POOL_SIZE") or min(4, os.cpu_count() or 1))
+DEFAULT_NUM_THREADS = int(
+    os.environ.get("SMARTFARMER_TFLITE_THREADS") or max(1, (os.cpu_count() or 1) // DEFAULT_POOL_SIZE)
+)
+
+# ----------------------------------------------------
+# MEMORY PROBE
+# ----------------------------------------------------
+def _rss_bytes():
+    """Resident set size of this process, or None where unavailable."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import resource
+        # Peak, not current RSS (kB on Linux, bytes on macOS) — still a usable upper bound
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if os.uname().sysname == "Darwin" else peak * 1024
+    except Exception:
+        return None
+
+# ----------------------------------------------------
+# TFLITE MODEL (pool of interpreters)
+# ----------------------------------------------------
+class _PooledInterpreter:
+    """One allocated interpreter; used by one thread at a time (see TFLiteModel.checkout)."""
+
+    def __init__(self, path, num_threads):
+        import tensorflow as tf
+
+        self.path = path
+        self.interpreter = tf.lite.Interpreter(model_path=path, num_threads=num_threads)
+        self.interpreter.allocate_tensors()
+
+        inp = self.interpreter.get_input_details()[0]
+        self.input_index = inp["index"]
+        self.input_shape = tuple(int(v) for v in inp["shape"])
+        self.output_index = self.interpreter.get_output_details()[0]["index"]
+
+        self._batch = self.input_shape[0]
+        self._fixed_batch = False
+
+    def _set_batch(self, n, size):
+        """Resizes the input tensor to n images (re-allocates only on change)."""
+        if n == self._batch:
+            return True
+        if self._fixed_batch:
+            return False
+        w, h = size
+        try:
+            self.interpreter.resize_tensor_input(self.input_index, [n, h, w, 3], strict=False)
+            self.interpreter.allocate_tensors()
+        except (RuntimeError, ValueError) as e:
+            # Graph baked for batch 1: fall back to one invoke per image
+            print(f"[Models] {os.path.basename(self.path)} cannot batch ({e}); using batch 1")
+            self._fixed_batch = True
+            self.interpreter.resize_tensor_input(self.input_index, [1, h, w, 3], strict=False)
+            self.interpreter.allocate_tensors()
+            self._batch = 1
+            return False
+        self._batch = n
+        return True
+
+    def run(self, arr, size):
+        n = arr.shape[0]
+        if not self._set_batch(n, size):
+            return np.concatenate([self.run(arr[i:i + 1], size) for i in range(n)])
+        self.interpreter.set_tensor(self.input_index, arr)
+        self.interpreter.invoke()
+        return self.interpreter.get_tensor(self.output_index).copy()
+
+    def run_images(self, images, size):
+        """Like run(), but normalizes the images straight into the input tensor (no set_tensor copy)."""
+        n = len(images)
+        if not self._set_batch(n, size):
+            return np.concatenate([self.run_images(images[i:i + 1], size) for i in range(n)])
+        self._fill_input(images)
+        self.interpreter.invoke()
+        return self.interpreter.get_tensor(self.output_index).copy()
+
+    def _fill_input(self, images):
+        # The tensor view must not outlive this call: invoke() refuses to
+        # run while numpy references to its buffers exist
+        view = self.interpreter.tensor(self.input_index)()
+        for i, img in enumerate(images):
+            write_input(img, view[i])
+
+
+class TFLiteModel:
+    """
+    A TFLite classifier served from a bounded pool of interpreters.
+
+    A tf.lite.Interpreter is not safe to share between threads, so every
+    inference checks one out for exclusive use and returns it afterwards.
+    Interpreters are created on demand up to pool_size; further callers
+    wait in line, and the wait is recorded (pool_info).
+    """
+
+    def __init__(self, path, classes, input_size=None, pool_size=None, num_threads=None):
+        self.path = path
+        self.classes = classes
+        self.pool_size = max(1, int(pool_size or DEFAULT_POOL_SIZE))
+        self.num_threads = max(1, int(num_threads or DEFAULT_NUM_THREADS))
+
+        first = _PooledInterpreter(path, self.num_threads)
+        # PIL (width, height); the tensor is (N, height, width, 3)
+        self.input_size = tuple(int(v) for v in (input_size or first.input_shape[2:0:-1]))
+
+        self._idle = queue.LifoQueue()       # LIFO: reuse the warmest interpreter
+        self._idle.put(first)
+        self._created = 1
+        self._lock = threading.Lock()
+        self._stats = {"checkouts": 0, "waited": 0, "wait_seconds": 0.0, "max_wait_seconds": 0.0}
+
+    @contextlib.contextmanager
+    def checkout(self, timeout=None):
+        """Exclusive use of one pooled interpreter for the duration of the block."""
+        t0 = time.perf_counter()
+        try:
+            slot = self._idle.get_nowait()
+        except queue.Empty:
+            slot = None
+            with self._lock:
+                grow = self._created < self.pool_size
+                if grow:
+                    self._created += 1
+            if grow:
+                try:
+                    slot = _PooledInterpreter(self.path, self.num_threads)
+                except Exception:
+                    with self._lock:
+                        self._created -= 1
+                    raise
+            else:
+                try:
+                    slot = self._idle.get(timeout=timeout)
+                except queue.Empty:
+                    raise TimeoutError(f"No free interpreter for {os.path.basename(self.path)} after {timeout}s")
+
+        waited = time.perf_counter() - t0
+        with self._lock:
+            self._stats["checkouts"] += 1
+            if waited > 0.001:
+                self._stats["waited"] += 1
+            self._stats["wait_seconds"] += waited
+            self._stats["max_wait_seconds"] = max(self._stats["max_wait_seconds"], waited)
+
+        try:
+            yield slot
+        finally:
+            self._idle.put(slot)
+
+    def pool_info(self):
+        """Pool size / usage and queue-wait metrics."""
+        with self._lock:
+            stats = dict(self._stats)
+            created = self._created
+        n = stats["checkouts"]
+        return {
+            "pool_size": self.pool_size,
+            "num_threads": self.num_threads,
+            "interpreters": created,
+            "idle": self._idle.qsize(),
+            "checkouts": n,
+            "waited": stats["waited"],
+            "mean_wait_ms": round(1000.0 * stats["wait_seconds"] / n, 2) if n else 0.0,
+            "max_wait_ms": round(1000.0 * stats["max_wait_seconds"], 2),
+        }
+
+    def predict_batch(self, arr):
+        """Class probabilities (N, classes) for a preprocessed (N, H, W, 3) float32 batch."""
+        with self.checkout() as slot:
+            return slot.run(arr, self.input_size)
+
+    def predict(self, arr):
+        """Class probabilities for one preprocessed (1, H, W, 3) float32 batch."""
+        return self.predict_batch(arr)[0]
+
+    def classify_batch(self, images, batch_size=DEFAULT_BATCH_SIZE):
+        """
+        Labels and confidences for any number of images (PIL images, paths,
+        bytes or file objects), batch_size images per invoke. Sources are
+        decoded at input size (utils/preprocess.py) outside the interpreter
+        checkout, then normalized directly into its input tensor.
+
+        Returns:
+            list: (label, confidence) per image, in input order.
+        """
+        results = []
+        images = iter(images)
+        while True:
+            chunk = [load_resized(src, self.input_size) for src in itertools.islice(images, batch_size)]
+            if not chunk:
+                break
+            with self.checkout() as slot:
+                probs = slot.run_images(chunk, self.input_size)
+
+            idx = probs.argmax(axis=1)
+            conf = probs[np.arange(len(idx)), idx]
+            results.extend((self.classes[int(i)], float(c)) for i, c in zip(idx, conf))
+        return results
+
+# ----------------------------------------------------
+# LOADERS
+# ----------------------------------------------------
+def load_router_model():
+    with open(os.path.join(MODEL_DIR, "router_class_map.json")) as f:
+        classes = {int(k): v for k, v in json.load(f).items()}
+    return TFLiteModel(ROUTER_MODEL, classes)
+
+
+def load_disease_model():
+    df = pd.read_csv(os.path.join(MODEL_DIR, "Plant Village Disease-class_dict.csv"))
+    classes = {int(i): c for i, c in zip(df["class_index"], df["class"])}
+    return TFLiteModel(DISEASE_MODEL, classes, input_size=(224, 224))
+
+
+def load_fruit_model():
+    with open(os.path.join(MODEL_DIR, "fruit_class_names.json")) as f:
+        classes = json.load(f)
+    return TFLiteModel(FRUIT_MODEL, classes)
+
+
+def load_pest_model():
+    """(YOLO model, class map) — detection, so no TFLiteModel wrapper."""
+    from ultralytics import YOLO
+
+    df = pd.read_csv(os.path.join(MODEL_DIR, "pest_classes.csv"))
+    return YOLO(PEST_MODEL), dict(zip(df["new_id"], df["class_name"]))
+
+
+DEFAULT_MODELS = {
+    "router": (load_router_model, ROUTER_MODEL),
+    "disease": (load_disease_model, DISEASE_MODEL),
+    "fruit": (load_fruit_model, FRUIT_MODEL),
+    "pest": (load_pest_model, PEST_MODEL),
+}
+
+# ----------------------------------------------------
+# REGISTRY
+# ----------------------------------------------------
+class ModelRegistry:
+    """Name -> loader; each model is loaded at most once, on first use."""
+
+    def __init__(self):
+        self._loaders = {}
+        self._models = {}
+        self._stats = {}
+        self._locks = {}
+        self._lock = threading.Lock()
+
+    def register(self, name, loader, path=None):
+        """Adds (or replaces, unloading the old instance) a model loader."""
+        with self._lock:
+            self._loaders[name] = (loader, path)
+            self._locks.setdefault(name, threading.Lock())
+            self._models.pop(name, None)
+            self._stats.pop(name, None)
+
+    def get(self, name):
+        model = self._models.get(name)
+        if model is not None:
+            return model
+
+        if name not in self._loaders:
+            raise KeyError(f"Unknown model '{name}'.")
+
+        with self._locks[name]:
+            model = self._models.get(name)
+            if model is None:
+                loader, path = self._loaders[name]
+                rss_before = _rss_bytes()
+                t0 = time.perf_counter()
+                model = loader()
+                seconds = time.perf_counter() - t0
+                rss_after = _rss_bytes()
+
+                self._stats[name] = {
+                    "load_seconds": round(seconds, 3),
+                    "rss_delta_mb": (
+                        round((rss_after - rss_before) / 2**20, 1)
+                        if rss_before is not None and rss_after is not None else None
+                    ),
+                    "file_mb": (
+                        round(os.path.getsize(path) / 2**20, 1)
+                        if path and os.path.exists(path) else None
+                    ),
+                }
+                self._models[name] = model
+                print(f"[Models] {name} loaded in {seconds:.2f}s")
+        return model
+
+    def loaded(self, name):
+        return name in self._models
+
+    def warm(self, names=None):
+        """Loads the given models (default: all registered) now; returns info()."""
+        for name in names or list(self._loaders):
+            self.get(name)
+        return self.info()
+
+    def warm_async(self, names=None):
+        """warm() on a daemon thread, so the UI renders while models load."""
+        thread = threading.Thread(target=self.warm, args=(names,), name="model-warmup", daemon=True)
+        thread.start()
+        return thread
+
+    def info(self):
+        """Per-model report: loaded, load_seconds, rss_delta_mb, file_mb (+ pool for TFLite)."""
+        report = {}
+        for name in self._loaders:
+            model = self._models.get(name)
+            report[name] = {"loaded": model is not None, **self._stats.get(name, {})}
+            if isinstance(model, TFLiteModel):
+                report[name]["pool"] = model.pool_info()
+        return report
+
+# ----------------------------------------------------
+# PROCESS-WIDE DEFAULT
+# ----------------------------------------------------
+_REGISTRY = None
+_REGISTRY_LOCK = threading.Lock()
+
+
+def get_model_registry():
+    """Shared registry with the router, disease, fruit and pest models."""
+    global _REGISTRY
+    if _REGISTRY is None:
+        with _REGISTRY_LOCK:
+            if _REGISTRY is None:
+                registry = ModelRegistry()
+                for name, (loader, path) in DEFAULT_MODELS.items():
+                    registry.register(name, loader, path)
+                _REGISTRY = registry
+    return _REGISTRY
+
+
+def get_model(name):
+    return get_model_registry().get(name)
+
+
+def classify_images(name, images, batch_size=DEFAULT_BATCH_SIZE):
+    """Batched (label, confidence) list for a TFLite model of the registry."""
+    return get_model(name).classify_batch(images, batch_size)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Pre-load image models and report load cost")
+    parser.add_argument("models", nargs="*", help=f"subset of {', '.join(DEFAULT_MODELS)} (default: all)")
+    args = parser.parse_args()
+
+    for name, stats in get_model_registry().warm(args.models).items():
+        print(f"{name:8s} {stats}")
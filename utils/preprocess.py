@@ -1,6 +1,49 @@
+import io
+
 import numpy as np
+from PIL import Image
+
+# ----------------------------------------------------
+# SHARED IMAGE PREPROCESSING (router, disease, fruit)
+# ----------------------------------------------------
+# Decode -> resize -> /255 with as few full-size copies as possible:
+#   • JPEGs are decoded at reduced scale (draft mode, 1/2 .. 1/8) when the
+#     model input is much smaller than the photo.
+#   • Normalization is one uint8 -> float32 divide written straight into the
+#     interpreter's input tensor (TFLiteModel.classify_batch), never an
+#     intermediate float image or a per-call batch array.
+
+
+def decode_image(source, size=None):
+    """
+    PIL RGB image from a PIL image, path, bytes or file-like object. With
+    `size` (width, height), JPEGs are decoded at the smallest DCT scale that
+    is still at least `size`.
+    """
+    if isinstance(source, Image.Image):
+        return source if source.mode == "RGB" else source.convert("RGB")
+
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        source = io.BytesIO(source)
+    img = Image.open(source)
+    if size is not None and img.format == "JPEG":
+        img.draft("RGB", tuple(size))
+    return img.convert("RGB")
+
+
+def load_resized(source, size):
+    """decode_image at model input `size` (width, height), resized if needed."""
+    img = decode_image(source, size)
+    return img if img.size == tuple(size) else img.resize(tuple(size))
+
+
+def write_input(source, out):
+    """
+    Decodes / resizes `source` to out's (height, width) and writes the
+    normalized pixels into `out` (float32, (H, W, 3)) in place.
+    """
+    h, w = out.shape[:2]
+    img = load_resized(source, (w, h))
+    np.divide(np.asarray(img, dtype=np.uint8), np.float32(255.0), out=out)
+    return out
 
-def preprocess_tflite(img, size):
-    img = img.resize(size)
-    arr = np.array(img, dtype=np.float32) / 255.0
-    return arr[np.newaxis, ...]